@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+End-to-end ingestion benchmark, runs `get_logs` + `bridge_callback` over a
+synthetic chain against the Postgres and Redis configured in `.env`.
+
+NOTE: this WRITES to those databases (and `--truncate` empties `txs` and
+`lost_txs`), only point it at throwaway instances.
+
+    python -m benchmarks.ingestion --chain polygon --blocks 2000
+"""
+
+from gevent import monkey
+
+# Monkey patch stuff.
+monkey.patch_all()
+
+from typing import Any, Dict, List
+import subprocess
+import argparse
+import time
+import json
+import os
+
+from dotenv import load_dotenv, find_dotenv
+
+from benchmarks.synthetic_chain import SyntheticNode
+
+_results_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'results.jsonl')
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--chain', default='polygon')
+    parser.add_argument('--blocks', type=int, default=2000)
+    parser.add_argument('--events-per-block', type=int, default=1)
+    parser.add_argument('--max-blocks', type=int, default=512)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--truncate', action='store_true')
+    parser.add_argument('--output', default=_results_path)
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv('.env.sample'))
+    load_dotenv(override=True)
+    # Measure our code, not the throttling in front of real RPCs.
+    os.environ['RPC_RPS'] = '0'
+    os.environ.pop('RPC_CACHE_PATH', None)
+
+    node = SyntheticNode()
+    node.start()
+    node.install()
+
+    # Everything from here on imports `explorer.utils.data`, which talks to
+    # the RPCs we just pointed at the synthetic node.
+    from explorer.utils.data import SYN_DATA, TOKENS_INFO, CHAINS, \
+        CHAINS_REVERSED, PSQL
+    from explorer.utils.rpc import bridge_callback, get_logs
+    import psycopg
+
+    chain = node.chain_for(SYN_DATA[args.chain]['rpc'])
+    chain.configure(args.chain, CHAINS_REVERSED[args.chain],
+                    SYN_DATA[args.chain]['bridge'],
+                    list(TOKENS_INFO[args.chain]), list(CHAINS))
+    chain.events_per_block = args.events_per_block
+    chain.head = args.blocks
+    chain.seed = args.seed
+    chain.calls.clear()
+
+    if args.truncate:
+        with PSQL.connection() as conn:
+            conn.execute('TRUNCATE txs, lost_txs')
+
+    statements: Dict[str, int] = {'count': 0}
+    _execute = psycopg.Cursor.execute
+
+    def execute(self, *a: Any, **kw: Any) -> Any:
+        statements['count'] += 1
+        return _execute(self, *a, **kw)
+
+    psycopg.Cursor.execute = execute  # type: ignore
+
+    latencies: List[float] = []
+
+    def callback(*a: Any, **kw: Any) -> None:
+        start = time.perf_counter()
+        bridge_callback(*a, **kw)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    get_logs(args.chain,
+             callback,
+             SYN_DATA[args.chain]['bridge'],
+             start_block=1,
+             till_block=args.blocks,
+             max_blocks=args.max_blocks)
+    elapsed = time.perf_counter() - start
+
+    psycopg.Cursor.execute = _execute  # type: ignore
+    node.stop()
+
+    events = len(latencies) or 1
+    rpc_calls = sum(chain.calls.values())
+    result = {
+        'benchmark': 'ingestion',
+        'time': int(time.time()),
+        'revision': git_revision(),
+        'chain': args.chain,
+        'blocks': args.blocks,
+        'events_per_block': args.events_per_block,
+        'max_blocks': args.max_blocks,
+        'seed': args.seed,
+        'events': len(latencies),
+        'elapsed': elapsed,
+        'events_per_second': len(latencies) / elapsed,
+        'rpc_calls_per_event': rpc_calls / events,
+        'rpc_calls': dict(chain.calls),
+        'db_statements_per_event': statements['count'] / events,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+    print(json.dumps(result, indent=2))
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Row materialization benchmark, rows per second turning `txs` rows (as
+psycopg returns them) into `Transaction`s via `class_row` + `__post_init__`
+versus the compiled `fast_row` decoder.
+
+    python -m benchmarks.rows --rows 250 --repeat 200
+"""
+
+from gevent import monkey
+
+# Monkey patch stuff.
+monkey.patch_all()
+
+from typing import Any, Callable, List, Tuple
+import argparse
+import random
+import time
+import json
+import os
+
+from dotenv import load_dotenv, find_dotenv
+
+from benchmarks.synthetic_chain import SyntheticNode
+from benchmarks.ingestion import git_revision, _results_path
+
+# Column order of `txs` once `sql/migrations` are applied, 0004 moved the
+# values last.
+COLUMNS = ('from_tx_hash', 'to_tx_hash', 'from_address', 'to_address',
+           'pending', 'from_chain_id', 'to_chain_id', 'sent_time',
+           'received_time', 'sent_token', 'received_token', 'swap_success',
+           'kappa', 'sent_value', 'received_value')
+
+
+class Column:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class FakeCursor:
+    description = [Column(x) for x in COLUMNS]
+
+
+def make_rows(n: int, seed: int) -> List[Tuple[Any, ...]]:
+    from explorer.utils.data import TOKEN_DECIMALS, CHAINS_REVERSED
+
+    rand = random.Random(seed)
+    tokens = [(CHAINS_REVERSED[chain], bytes.fromhex(token[2:]))
+              for chain, v in TOKEN_DECIMALS.items() for token in v]
+    rows = []
+
+    for _ in range(n):
+        from_chain, sent_token = rand.choice(tokens)
+        to_chain, received_token = rand.choice(tokens)
+        pending = rand.random() < 0.1
+
+        rows.append((
+            rand.randbytes(32),
+            None if pending else rand.randbytes(32),
+            rand.randbytes(20),
+            rand.randbytes(20),
+            pending,
+            from_chain,
+            to_chain,
+            1640000000 + rand.getrandbits(24),
+            None if pending else 1640000000 + rand.getrandbits(24),
+            sent_token,
+            None if pending else received_token,
+            None if pending else rand.choice([True, False, None]),
+            rand.randbytes(32),
+            rand.getrandbits(80),
+            None if pending else rand.getrandbits(80),
+        ))
+
+    return rows
+
+
+def measure(maker: Callable[[Any], Any], rows: List[Tuple[Any, ...]],
+            repeat: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        for row in rows:
+            maker(row)
+
+    return len(rows) * repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--rows', type=int, default=250)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=_results_path)
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv('.env.sample'))
+    load_dotenv(override=True)
+    # No database needed, only the token info `explorer.utils.data` loads.
+    os.environ['TESTING'] = 'true'
+    os.environ['RPC_RPS'] = '0'
+    os.environ.pop('RPC_CACHE_PATH', None)
+
+    node = SyntheticNode()
+    node.start()
+    node.install()
+
+    from explorer.utils.database import Transaction, fast_row
+
+    rows = make_rows(args.rows, args.seed)
+
+    def before(row: Tuple[Any, ...]) -> Transaction:
+        # What `psycopg.rows.class_row` does per row.
+        return Transaction(**dict(zip(COLUMNS, row)))
+
+    after = fast_row(Transaction)(FakeCursor())  # type: ignore
+
+    for row in rows:
+        a, b = before(row), after(row)  # type: ignore
+        assert a == b, (a, b)
+        assert list(a.__dict__) == list(b.__dict__)
+
+    node.stop()
+
+    result = {
+        'benchmark': 'rows',
+        'time': int(time.time()),
+        'revision': git_revision(),
+        'rows': args.rows,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'class_row_rows_per_second': measure(before, rows, args.repeat),
+        'fast_row_rows_per_second': measure(after, rows, args.repeat),
+    }
+    result['speedup'] = (result['fast_row_rows_per_second'] /
+                         result['class_row_rows_per_second'])
+
+    print(json.dumps(result, indent=2))
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Serialization benchmark, rows per second turning `Transaction`s into JSON via
+`CustomJSONEncoder` versus the compiled encoders in `serialize.dumps`.
+
+    python -m benchmarks.serialize --rows 5000 --repeat 20
+"""
+
+from gevent import monkey
+
+# Monkey patch stuff.
+monkey.patch_all()
+
+from typing import Any, Callable, List
+import argparse
+import time
+import json
+import os
+
+from dotenv import load_dotenv, find_dotenv
+
+from benchmarks.synthetic_chain import SyntheticNode
+from benchmarks.ingestion import git_revision, _results_path
+from benchmarks.rows import FakeCursor, make_rows
+
+
+def measure(dumps: Callable[[Any], str], txs: List[Any],
+            repeat: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        dumps(txs)
+
+    return len(txs) * repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=_results_path)
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv('.env.sample'))
+    load_dotenv(override=True)
+    # No database needed, only the token info `explorer.utils.data` loads.
+    os.environ['TESTING'] = 'true'
+    os.environ['RPC_RPS'] = '0'
+    os.environ.pop('RPC_CACHE_PATH', None)
+
+    node = SyntheticNode()
+    node.start()
+    node.install()
+
+    from explorer.utils.serialize import CustomJSONEncoder, dumps
+    from explorer.utils.database import Transaction, fast_row
+    import simplejson
+
+    decode = fast_row(Transaction)(FakeCursor())  # type: ignore
+    txs = [decode(row) for row in make_rows(args.rows, args.seed)]
+    node.stop()
+
+    def before(txs: List[Any]) -> str:
+        # What `flask.jsonify` did with `app.json_encoder`.
+        return simplejson.dumps(txs,
+                                cls=CustomJSONEncoder,
+                                sort_keys=True,
+                                separators=(',', ':'))
+
+    assert before(txs) == dumps(txs)
+
+    result = {
+        'benchmark': 'serialize',
+        'time': int(time.time()),
+        'revision': git_revision(),
+        'rows': args.rows,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'encoder_rows_per_second': measure(before, txs, args.repeat),
+        'compiled_rows_per_second': measure(dumps, txs, args.repeat),
+    }
+    result['speedup'] = (result['compiled_rows_per_second'] /
+                         result['encoder_rows_per_second'])
+
+    print(json.dumps(result, indent=2))
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
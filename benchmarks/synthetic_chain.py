@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+A fake JSON-RPC node generating a deterministic chain full of bridge events,
+with the blocks, transactions and receipts `bridge_callback` needs to
+process them.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+import threading
+import random
+import json
+import os
+
+from hexbytes import HexBytes
+from web3 import Web3
+import eth_abi
+
+# eth_abi>=4 renamed `encode_abi` to `encode`.
+_encode: Callable[[List[str], List[Any]], bytes] = getattr(
+    eth_abi, 'encode', None) or eth_abi.encode_abi  # type: ignore
+
+_abis_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))), 'explorer', 'utils', 'abis')
+with open(os.path.join(_abis_path, 'bridge.json')) as f:
+    BRIDGE_ABI: List[Dict[str, Any]] = json.load(f)['abi']
+
+OUT_EVENTS = [
+    'TokenDeposit',
+    'TokenDepositAndSwap',
+    'TokenRedeem',
+    'TokenRedeemAndSwap',
+    'TokenRedeemAndRemove',
+]
+IN_EVENTS = [
+    'TokenMint',
+    'TokenMintAndSwap',
+    'TokenWithdraw',
+    'TokenWithdrawAndRemove',
+]
+# The function the relayer calls for the IN events which need the `pool`
+# decoded from the tx input.
+IN_FUNCTIONS = {
+    'TokenMintAndSwap': 'mintAndSwap',
+    'TokenWithdrawAndRemove': 'withdrawAndRemove',
+}
+
+TRANSFER_TOPIC = Web3.keccak(text='Transfer(address,address,uint256)')
+# `ethereum` has no nexus assets in its pool, `bridge_callback` hardcodes it.
+ETH_NUSD = '0x1b84765de8b7566e4ceaf4d0fd3c5af52d3dde4f'
+GENESIS_TIME = 1640000000
+BLOCK_TIME = 2
+
+
+def _selector(signature: str) -> str:
+    return Web3.keccak(text=signature)[:4].hex()
+
+
+SELECTORS = {
+    _selector('decimals()'): 'decimals',
+    _selector('name()'): 'name',
+    _selector('symbol()'): 'symbol',
+    _selector('getToken(uint8)'): 'getToken',
+}
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _abi_item(name: str, _type: str) -> Dict[str, Any]:
+    for item in BRIDGE_ABI:
+        if item.get('type') == _type and item.get('name') == name:
+            return item
+
+    raise RuntimeError(f'{_type} {name} not in the bridge ABI')
+
+
+def _signature(item: Dict[str, Any]) -> str:
+    types = ','.join(i['type'] for i in item['inputs'])
+    return f"{item['name']}({types})"
+
+
+EVENT_TOPICS = {
+    name: Web3.keccak(text=_signature(_abi_item(name, 'event'))).hex()
+    for name in OUT_EVENTS + IN_EVENTS
+}
+
+
+class MethodNotFound(Exception):
+    pass
+
+
+class SyntheticChain:
+    def __init__(self,
+                 events_per_block: int = 0,
+                 head: int = 0,
+                 seed: int = 0) -> None:
+        self.events_per_block = events_per_block
+        self.head = head
+        self.seed = seed
+        self.calls: Counter = Counter()
+
+        self.chain = ''
+        self.chain_id = 1
+        self.bridge = '0x' + '00' * 20
+        self.tokens: List[str] = ['0x' + f'{i:040x}' for i in range(1, 5)]
+        self.to_chain_ids: List[int] = [1]
+
+        self._txs: Dict[HexBytes, Tuple[int, int]] = {}
+
+    def configure(self, chain: str, chain_id: int, bridge: str,
+                  tokens: List[str], to_chain_ids: List[int]) -> None:
+        """
+        Called once `explorer.utils.data` is imported, the events we
+        generate have to reference tokens and chains it knows about.
+        """
+
+        self.chain = chain
+        self.chain_id = chain_id
+        self.bridge = bridge.lower()
+        self.tokens = [t.lower() for t in tokens]
+        self.to_chain_ids = [c for c in to_chain_ids if c != chain_id]
+
+    # Generation.
+
+    def _rng(self, block: int, idx: int) -> random.Random:
+        return random.Random(f'{self.seed}:{self.chain}:{block}:{idx}')
+
+    def tx_hash(self, block: int, idx: int) -> HexBytes:
+        return Web3.keccak(text=f'{self.seed}:{self.chain}:{block}:{idx}')
+
+    def block_hash(self, block: int) -> HexBytes:
+        return Web3.keccak(text=f'{self.seed}:{self.chain}:block:{block}')
+
+    def event(self, block: int, idx: int) -> Dict[str, Any]:
+        rng = self._rng(block, idx)
+        name = rng.choice(OUT_EVENTS + IN_EVENTS)
+        token = rng.choice(self.tokens)
+        amount = rng.randrange(10**6, 10**24)
+        fee = amount // 1000
+        user = '0x' + rng.getrandbits(160).to_bytes(20, 'big').hex()
+        token_idx = rng.randrange(0, min(len(self.tokens), 4))
+
+        # Complete the (potential) OUT tx from the same slot of the previous
+        # block, so the IN path hits both the UPDATE and the lost_txs INSERT.
+        kappa = Web3.keccak(text=self.tx_hash(block - 1, idx).hex())
+
+        args: Dict[str, Any] = {
+            'to': user,
+            'chainId': rng.choice(self.to_chain_ids),
+            'token': token,
+            'amount': amount,
+            'fee': fee,
+            'tokenIndexFrom': 0,
+            'tokenIndexTo': token_idx,
+            'swapTokenIndex': token_idx,
+            'minDy': 0,
+            'swapMinAmount': 0,
+            'deadline': GENESIS_TIME * 2,
+            'swapDeadline': GENESIS_TIME * 2,
+            'swapSuccess': rng.random() > 0.1,
+            'kappa': kappa,
+        }
+
+        if name in IN_EVENTS:
+            if name in IN_FUNCTIONS:
+                if not args['swapSuccess'] and self.chain == 'ethereum':
+                    received = ETH_NUSD
+                else:
+                    received = self.tokens[
+                        token_idx if args['swapSuccess'] else 0]
+
+                value = amount - fee
+            else:
+                received, value = token, amount
+        else:
+            received, value = token, amount
+
+        return {
+            'name': name,
+            'args': args,
+            'user': user,
+            'transfer': (received, value),
+        }
+
+    def _log(self, block: int, idx: int, log_idx: int, address: str,
+             topics: List[Any], data: bytes) -> Dict[str, Any]:
+        return {
+            'address': Web3.toChecksumAddress(address),
+            'topics': [HexBytes(t).hex() for t in topics],
+            'data': '0x' + data.hex(),
+            'blockNumber': _hex(block),
+            'blockHash': self.block_hash(block).hex(),
+            'transactionHash': self.tx_hash(block, idx).hex(),
+            'transactionIndex': _hex(idx),
+            'logIndex': _hex(log_idx),
+            'removed': False,
+        }
+
+    def bridge_log(self, block: int, idx: int,
+                   log_idx: int = 1) -> Dict[str, Any]:
+        event = self.event(block, idx)
+        item = _abi_item(event['name'], 'event')
+        args = event['args']
+
+        topics: List[Any] = [EVENT_TOPICS[event['name']]]
+        types, values = [], []
+
+        for i in item['inputs']:
+            value = args[i['name']]
+
+            if i.get('indexed'):
+                topics.append(_encode([i['type']], [value]))
+            else:
+                types.append(i['type'])
+                values.append(value)
+
+        return self._log(block, idx, log_idx, self.bridge, topics,
+                         _encode(types, values))
+
+    def transfer_log(self, block: int, idx: int) -> Dict[str, Any]:
+        event = self.event(block, idx)
+        token, value = event['transfer']
+        src, dst = (event['user'], self.bridge) \
+            if event['name'] in OUT_EVENTS else (self.bridge, event['user'])
+
+        return self._log(block, idx, 0, token, [
+            TRANSFER_TOPIC,
+            _encode(['address'], [src]),
+            _encode(['address'], [dst]),
+        ], _encode(['uint256'], [value]))
+
+    def tx_input(self, block: int, idx: int) -> str:
+        event = self.event(block, idx)
+
+        if event['name'] not in IN_FUNCTIONS:
+            return '0x'
+
+        item = _abi_item(IN_FUNCTIONS[event['name']], 'function')
+        args = {**event['args'], 'pool': self.bridge}
+        data = _encode([i['type'] for i in item['inputs']],
+                       [args[i['name']] for i in item['inputs']])
+
+        return _selector(_signature(item)) + data.hex()
+
+    # JSON-RPC.
+
+    def handle(self, method: str, params: List[Any]) -> Any:
+        self.calls[method] += 1
+
+        if method in ('web3_clientVersion', 'net_version'):
+            return 'synthetic/v0' if method == 'web3_clientVersion' \
+                else str(self.chain_id)
+        elif method == 'eth_chainId':
+            return _hex(self.chain_id)
+        elif method == 'eth_syncing':
+            return False
+        elif method == 'eth_blockNumber':
+            return _hex(self.head)
+        elif method == 'eth_getBlockByNumber':
+            return self.get_block(params[0])
+        elif method == 'eth_getLogs':
+            return self.get_logs(params[0])
+        elif method == 'eth_getTransactionByHash':
+            return self.get_transaction(HexBytes(params[0]))
+        elif method == 'eth_getTransactionReceipt':
+            return self.get_receipt(HexBytes(params[0]))
+        elif method == 'eth_call':
+            return self.call(params[0])
+        elif method == 'eth_getCode':
+            # Only asked for when a call came back empty.
+            return '0x'
+
+        raise MethodNotFound(method)
+
+    def get_block(self, block: Any) -> Dict[str, Any]:
+        number = self.head if block in ('latest', 'pending') else int(
+            block, 16)
+        zero = '0x' + '00' * 32
+
+        return {
+            'number': _hex(number),
+            'hash': self.block_hash(number).hex(),
+            'parentHash': self.block_hash(number - 1).hex(),
+            'timestamp': _hex(GENESIS_TIME + number * BLOCK_TIME),
+            'miner': '0x' + '00' * 20,
+            'extraData': '0x',
+            'gasLimit': _hex(30_000_000),
+            'gasUsed': _hex(0),
+            'difficulty': '0x0',
+            'totalDifficulty': '0x0',
+            'nonce': '0x' + '00' * 8,
+            'size': _hex(1024),
+            'logsBloom': '0x' + '00' * 256,
+            'sha3Uncles': zero,
+            'stateRoot': zero,
+            'receiptsRoot': zero,
+            'transactionsRoot': zero,
+            'uncles': [],
+            'transactions': [
+                self.tx_hash(number, i).hex()
+                for i in range(self.events_per_block)
+            ],
+        }
+
+    def get_logs(self, _filter: Dict[str, Any]) -> List[Dict[str, Any]]:
+        start = int(_filter['fromBlock'], 16)
+        end = min(int(_filter['toBlock'], 16), self.head)
+        topics = set(_filter.get('topics', [[]])[0] or EVENT_TOPICS.values())
+
+        address = _filter.get('address', [])
+        if isinstance(address, str):
+            address = [address]
+
+        if self.bridge not in (a.lower() for a in address):
+            return []
+
+        logs = []
+        for block in range(start, end + 1):
+            for idx in range(self.events_per_block):
+                log = self.bridge_log(block, idx)
+
+                if log['topics'][0] in topics:
+                    self._txs[self.tx_hash(block, idx)] = (block, idx)
+                    logs.append(log)
+
+        return logs
+
+    def _lookup(self, tx_hash: HexBytes) -> Optional[Tuple[int, int]]:
+        return self._txs.get(tx_hash)
+
+    def get_transaction(self, tx_hash: HexBytes) -> Optional[Dict[str, Any]]:
+        if (ret := self._lookup(tx_hash)) is None:
+            return None
+
+        block, idx = ret
+        return {
+            'hash': tx_hash.hex(),
+            'from': Web3.toChecksumAddress(self.event(block, idx)['user']),
+            'to': Web3.toChecksumAddress(self.bridge),
+            'input': self.tx_input(block, idx),
+            'blockNumber': _hex(block),
+            'blockHash': self.block_hash(block).hex(),
+            'transactionIndex': _hex(idx),
+            'nonce': _hex(idx),
+            'value': '0x0',
+            'gas': _hex(500_000),
+            'gasPrice': _hex(10**9),
+            'v': '0x1',
+            'r': '0x1',
+            's': '0x1',
+        }
+
+    def get_receipt(self, tx_hash: HexBytes) -> Optional[Dict[str, Any]]:
+        if (ret := self._lookup(tx_hash)) is None:
+            return None
+
+        block, idx = ret
+        return {
+            'transactionHash': tx_hash.hex(),
+            'transactionIndex': _hex(idx),
+            'blockNumber': _hex(block),
+            'blockHash': self.block_hash(block).hex(),
+            'from': Web3.toChecksumAddress(self.event(block, idx)['user']),
+            'to': Web3.toChecksumAddress(self.bridge),
+            'cumulativeGasUsed': _hex(100_000),
+            'gasUsed': _hex(100_000),
+            'contractAddress': None,
+            'status': '0x1',
+            'logsBloom': '0x' + '00' * 256,
+            'logs': [
+                self.transfer_log(block, idx),
+                self.bridge_log(block, idx),
+            ],
+        }
+
+    def call(self, tx: Dict[str, Any]) -> str:
+        data = tx.get('data') or tx.get('input') or '0x'
+        func = SELECTORS.get(data[:10])
+
+        if func == 'decimals':
+            return '0x' + _encode(['uint8'], [18]).hex()
+        elif func in ('name', 'symbol'):
+            return '0x' + _encode(['string'], ['SYNTH']).hex()
+        elif func == 'getToken':
+            idx = int(data[10:], 16)
+
+            if idx < min(len(self.tokens), 4):
+                return '0x' + _encode(['address'], [self.tokens[idx]]).hex()
+
+        # Empty return data makes web3 raise `BadFunctionCallOutput`, which
+        # is what the pool token iteration stops on.
+        return '0x'
+
+
+class Server(ThreadingHTTPServer):
+    # Every greenlet of the app can be connecting at once.
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class SyntheticNode:
+    """
+    Serves a :class:`SyntheticChain` per `*_RPC` env var, at
+    `http://127.0.0.1:<port>/<ENV_NAME>`.
+    """
+
+    def __init__(self) -> None:
+        self.chains: Dict[str, SyntheticChain] = {}
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, the RPC clients reuse their sessions.
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self) -> None:
+                request = json.loads(
+                    self.rfile.read(int(self.headers['Content-Length'])))
+                chain = node.chains.setdefault(self.path.strip('/'),
+                                               SyntheticChain())
+
+                try:
+                    response = {
+                        'result': chain.handle(request['method'],
+                                               request.get('params', []))
+                    }
+                except MethodNotFound as e:
+                    response = {
+                        'error': {
+                            'code': -32601,
+                            'message': f'the method {e} does not exist'
+                        }
+                    }
+                except Exception as e:
+                    response = {'error': {'code': -32000, 'message': str(e)}}
+
+                body = json.dumps({
+                    'jsonrpc': '2.0',
+                    'id': request.get('id'),
+                    **response
+                }).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._httpd = Server(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._httpd.server_address[1]}'
+
+    def start(self) -> None:
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+
+    def install(self) -> None:
+        """
+        Point every `*_RPC` env var at this node, has to happen before
+        `explorer` is imported.
+        """
+
+        for name in [k for k in os.environ if k.endswith('_RPC')]:
+            self.chains.setdefault(name, SyntheticChain())
+            os.environ[name] = f'{self.url}/{name}'
+
+    def chain_for(self, rpc: str) -> SyntheticChain:
+        return self.chains[rpc.rsplit('/', 1)[1]]
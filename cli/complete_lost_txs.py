@@ -44,8 +44,12 @@ SET
         %s,
         %s
     )
+FROM
+    txs_keys
 WHERE
-    kappa = %s;
+    txs_keys.kappa = %s
+    AND txs.from_tx_hash = txs_keys.from_tx_hash
+    AND txs.sent_time = txs_keys.sent_time;
 """
 
 DEL_SQL = """
@@ -2,5 +2,7 @@ SELECT
     lost_txs.*
 FROM
     lost_txs
-    INNER JOIN txs ON txs.pending = true
-    AND txs.kappa = lost_txs.kappa;
\ No newline at end of file
+    INNER JOIN txs_keys ON txs_keys.kappa = lost_txs.kappa
+    INNER JOIN txs ON txs.from_tx_hash = txs_keys.from_tx_hash
+    AND txs.sent_time = txs_keys.sent_time
+    AND txs.pending = true;
\ No newline at end of file
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plan and apply the schema migrations of `sql/migrations`.
+
+    python cli/migrate.py plan
+    python cli/migrate.py apply --to 3
+
+With `MIGRATE_ON_BOOT=false` the API refuses to boot with migrations pending,
+apply them with this ahead of deploying the code which needs them.
+"""
+
+import importlib.util
+import argparse
+import os
+
+from dotenv import load_dotenv, find_dotenv
+import psycopg
+
+load_dotenv(find_dotenv('.env.sample'))
+# If `.env` exists, let it override the sample env file.
+load_dotenv(override=True)
+
+if os.getenv('docker') == 'true':
+    PSQL_URL = os.environ['PSQL_DOCKER_URL']
+else:
+    PSQL_URL = os.environ['PSQL_URL']
+
+_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# By path, importing `explorer` would start the whole app.
+_spec = importlib.util.spec_from_file_location(
+    'migrations', os.path.join(_root, 'explorer', 'utils', 'migrations.py'))
+assert _spec is not None and _spec.loader is not None
+migrations = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(migrations)  # type: ignore
+
+
+def plan(conn: psycopg.Connection) -> None:
+    pending, changed = migrations.status(conn)
+
+    for migration in changed:
+        print(f'changed since applied: {migration}')
+
+    for migration in pending:
+        kind = 'transaction'
+        if migration.batched:
+            kind = 'batches'
+        elif not migration.transactional:
+            kind = 'no transaction'
+
+        print(f'pending: {migration} ({kind})')
+
+    if not pending:
+        print('up to date')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('plan', help='list the pending migrations')
+    apply_parser = commands.add_parser('apply',
+                                       help='apply the pending migrations')
+    apply_parser.add_argument('--to',
+                              type=int,
+                              help='stop after this version')
+    args = parser.parse_args()
+
+    with psycopg.connect(PSQL_URL, autocommit=True) as conn:
+        if args.command == 'plan':
+            plan(conn)
+        elif not migrations.migrate(conn, to=args.to):
+            print('up to date')
+
+
+if __name__ == '__main__':
+    main()
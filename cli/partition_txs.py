@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrate an unpartitioned `txs` to the layout of the first migration, while
+the old code keeps running against it.
+
+    python cli/partition_txs.py setup
+    python cli/partition_txs.py copy --batch-size 5000 --sleep 0.1
+    python cli/partition_txs.py swap
+    python cli/partition_txs.py ensure
+
+`setup` creates the partitioned table as `txs_partitioned` and a trigger on
+`txs` mirroring every write to it, and logging the row's key to
+`txs_mirrored`. `copy` backfills the rows which were there before, it
+prints where it's at and can be resumed with `--after`. Once it's done,
+stop ingestion and `swap` the tables, then deploy the code that goes
+through `txs_keys`. The old table is left as `txs_unpartitioned`, drop it
+once you're happy.
+
+`swap` compares the row counts of both tables before locking them, and
+once they're locked only the rows written since, from `txs_mirrored`.
+
+`ensure` creates the partitions for the next months, run it from cron. The
+API does it as well when it boots.
+"""
+
+from typing import List
+import argparse
+import time
+import sys
+import os
+import re
+
+from dotenv import load_dotenv, find_dotenv
+from psycopg import sql
+import psycopg
+
+load_dotenv(find_dotenv('.env.sample'))
+# If `.env` exists, let it override the sample env file.
+load_dotenv(override=True)
+
+if os.getenv('docker') == 'true':
+    PSQL_URL = os.environ['PSQL_DOCKER_URL']
+else:
+    PSQL_URL = os.environ['PSQL_URL']
+
+_sql_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                         'sql', 'migrations')
+
+MIRROR_SQL = """
+CREATE TABLE IF NOT EXISTS txs_mirrored (
+    from_tx_hash bytea NOT NULL,
+    sent_time bigint NOT NULL,
+    xact xid8 NOT NULL DEFAULT pg_current_xact_id()
+);
+
+CREATE OR REPLACE FUNCTION txs_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM txs_partitioned
+        WHERE from_tx_hash = OLD.from_tx_hash AND sent_time = OLD.sent_time;
+    ELSE
+        INSERT INTO txs_partitioned ({columns}) VALUES ({values})
+        ON CONFLICT (from_tx_hash, sent_time) DO UPDATE
+        SET ({columns}) = ({excluded});
+
+        INSERT INTO txs_mirrored (from_tx_hash, sent_time)
+        VALUES (NEW.from_tx_hash, NEW.sent_time);
+    END IF;
+
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO txs_mirrored (from_tx_hash, sent_time)
+        VALUES (OLD.from_tx_hash, OLD.sent_time);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER txs_mirror
+    AFTER INSERT OR DELETE OR UPDATE ON txs
+    FOR EACH ROW EXECUTE FUNCTION txs_mirror();
+"""
+
+COPY_SQL = """
+WITH batch AS (
+    SELECT * FROM txs WHERE from_tx_hash > %(after)s
+    ORDER BY from_tx_hash LIMIT %(limit)s
+), copied AS (
+    INSERT INTO txs_partitioned ({columns}) SELECT {columns} FROM batch
+    ON CONFLICT DO NOTHING
+)
+SELECT count(*), (array_agg(from_tx_hash ORDER BY from_tx_hash DESC))[1]
+FROM batch;
+"""
+
+# Keys written to `txs` after `snapshot` which are in only one of the tables.
+MISMATCHED_SQL = """
+SELECT count(*) FROM (
+    SELECT DISTINCT from_tx_hash, sent_time FROM txs_mirrored
+    WHERE NOT pg_visible_in_snapshot(xact, %(snapshot)s::pg_snapshot)
+) m
+WHERE
+    EXISTS (
+        SELECT FROM txs t
+        WHERE t.from_tx_hash = m.from_tx_hash AND t.sent_time = m.sent_time
+    ) <> EXISTS (
+        SELECT FROM txs_partitioned t
+        WHERE t.from_tx_hash = m.from_tx_hash AND t.sent_time = m.sent_time
+    );
+"""
+
+
+def relkind(conn: psycopg.Connection, name: str) -> str:
+    """ `relkind` of `name`, '' if there's no such table. """
+
+    row = conn.execute(
+        'SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)',
+        (name, )).fetchone()
+
+    return '' if row is None else row[0]
+
+
+def columns(conn: psycopg.Connection) -> List[sql.Identifier]:
+    rows = conn.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'txs'
+        ORDER BY ordinal_position
+    """).fetchall()
+
+    return [sql.Identifier(x) for (x, ) in rows]
+
+
+def setup(conn: psycopg.Connection) -> None:
+    with conn.transaction():
+        # The indexes of `txs_partitioned` get the names of these, which are
+        # the ones they'll have once it's `txs`.
+        for (name, ) in conn.execute("""
+            SELECT indexname FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'txs'
+        """).fetchall():
+            if not name.endswith('_unpartitioned'):
+                conn.execute(sql.SQL('ALTER INDEX {} RENAME TO {}').format(
+                    sql.Identifier(name),
+                    sql.Identifier(f'{name}_unpartitioned')))
+
+        with open(os.path.join(_sql_path, '0001_initial.sql')) as f:
+            conn.execute(re.sub(r'\btxs\b', 'txs_partitioned', f.read()))
+
+        cols = columns(conn)
+        conn.execute(
+            sql.SQL(MIRROR_SQL).format(
+                columns=sql.SQL(', ').join(cols),
+                values=sql.SQL(', ').join(
+                    sql.SQL('NEW.{}').format(x) for x in cols),
+                excluded=sql.SQL(', ').join(
+                    sql.SQL('EXCLUDED.{}').format(x) for x in cols)))
+
+    print('txs_partitioned created, writes to txs are mirrored to it')
+
+
+def copy(conn: psycopg.Connection, after: bytes, batch_size: int,
+         sleep: float) -> None:
+    cols = sql.SQL(', ').join(columns(conn))
+    query = sql.SQL(COPY_SQL).format(columns=cols)
+    copied = 0
+
+    while True:
+        with conn.transaction():
+            count, last = conn.execute(query, {
+                'after': after,
+                'limit': batch_size
+            }).fetchone()
+
+        if not count:
+            break
+
+        after = bytes(last)
+        copied += count
+        print(f'copied {copied} rows, up to --after {after.hex()}')
+
+        # Leave some room to everything else.
+        time.sleep(sleep)
+
+    print(f'done, copied {copied} rows')
+
+
+def swap(conn: psycopg.Connection) -> None:
+    if relkind(conn, 'txs_mirrored') != 'r':
+        sys.exit('txs_mirrored is missing, run setup again')
+
+    # Both counted in one snapshot without locking either, reads and writes
+    # go on for as long as they take.
+    with conn.transaction():
+        conn.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        snapshot, = conn.execute('SELECT pg_current_snapshot()').fetchone()
+        old, = conn.execute('SELECT count(*) FROM txs').fetchone()
+        new, = conn.execute(
+            'SELECT count(*) FROM txs_partitioned').fetchone()
+
+    if old != new:
+        sys.exit(f'txs has {old} rows but txs_partitioned has {new}, '
+                 'run copy again')
+
+    with conn.transaction():
+        conn.execute('LOCK TABLE txs, txs_partitioned '
+                     'IN ACCESS EXCLUSIVE MODE')
+
+        # Every write since went through the mirror, only the keys it logged
+        # can differ.
+        mismatched, = conn.execute(MISMATCHED_SQL, {
+            'snapshot': snapshot
+        }).fetchone()
+        if mismatched:
+            sys.exit(f'{mismatched} rows written since they were counted '
+                     'are in only one of txs and txs_partitioned')
+
+        conn.execute('DROP TRIGGER txs_mirror ON txs')
+        conn.execute('DROP FUNCTION txs_mirror()')
+        conn.execute('DROP TABLE txs_mirrored')
+        conn.execute('ALTER TABLE txs RENAME TO txs_unpartitioned')
+        conn.execute('ALTER TABLE txs_partitioned RENAME TO txs')
+
+        # As they'd be named if it had been created as `txs`.
+        for (name, ) in conn.execute("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = 'txs'::regclass
+                AND conname LIKE 'txs\\_partitioned\\_%'
+        """).fetchall():
+            conn.execute(
+                sql.SQL('ALTER TABLE txs RENAME CONSTRAINT {} TO {}').format(
+                    sql.Identifier(name),
+                    sql.Identifier(name.replace('txs_partitioned_', 'txs_',
+                                                1))))
+
+    print('swapped, the old table is txs_unpartitioned')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('setup')
+    copy_parser = commands.add_parser('copy')
+    copy_parser.add_argument('--after',
+                             type=bytes.fromhex,
+                             default=b'',
+                             help='resume after this from_tx_hash (hex)')
+    copy_parser.add_argument('--batch-size', type=int, default=5000)
+    copy_parser.add_argument('--sleep',
+                             type=float,
+                             default=0.1,
+                             help='seconds to wait between batches')
+    commands.add_parser('swap')
+    ensure_parser = commands.add_parser('ensure')
+    ensure_parser.add_argument('--months-ahead', type=int, default=3)
+    args = parser.parse_args()
+
+    with psycopg.connect(PSQL_URL, autocommit=True) as conn:
+        kind = relkind(conn, 'txs')
+
+        if args.command == 'ensure':
+            if kind != 'p':
+                sys.exit('txs is not partitioned yet')
+
+            conn.execute('SELECT txs_ensure_partitions(%s, %s)',
+                         ('txs', args.months_ahead))
+            return
+        elif kind == 'p':
+            sys.exit('txs is already partitioned')
+        elif args.command != 'setup' \
+                and relkind(conn, 'txs_partitioned') != 'p':
+            sys.exit('run setup first')
+
+        if args.command == 'setup':
+            setup(conn)
+        elif args.command == 'copy':
+            copy(conn, args.after, args.batch_size, args.sleep)
+        else:
+            swap(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aggregate the spans written with `TRACING=file` into a per-stage breakdown.
+
+    python cli/trace_stats.py traces.jsonl --chain ethereum --by event
+"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+from collections import defaultdict
+import argparse
+import json
+import time
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def read_traces(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+
+            if line:
+                yield json.loads(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', nargs='?', default='traces.jsonl')
+    parser.add_argument('--chain')
+    parser.add_argument('--event')
+    parser.add_argument('--since',
+                        type=float,
+                        help='only traces from the last N seconds')
+    parser.add_argument('--by',
+                        choices=['chain', 'event'],
+                        help='break the stages down by this tag as well')
+    args = parser.parse_args()
+
+    since = time.time() - args.since if args.since else 0
+    # (group, stage) -> durations
+    stages: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    totals: Dict[str, float] = defaultdict(float)
+    traces: Dict[str, int] = defaultdict(int)
+
+    for trace in read_traces(args.path):
+        tags = trace['tags']
+
+        if args.chain and tags.get('chain') != args.chain:
+            continue
+        elif args.event and tags.get('event') != args.event:
+            continue
+        elif trace['start'] < since:
+            continue
+
+        group = str(tags.get(args.by, '')) if args.by else ''
+        traces[group] += 1
+        totals[group] += trace['duration']
+        accounted = 0.0
+
+        for span in trace['spans']:
+            stages[(group, span['stage'])].append(span['duration'])
+            accounted += span['duration']
+
+        stages[(group, 'other')].append(max(trace['duration'] - accounted, 0))
+
+    if not traces:
+        print('no matching traces')
+        return
+
+    print(f'{"group":<24} {"stage":<30} {"count":>7} {"total s":>9} '
+          f'{"share":>6} {"mean ms":>9} {"p50 ms":>9} {"p99 ms":>9}')
+
+    for (group, stage), values in sorted(stages.items(),
+                                         key=lambda x: (x[0][0], -sum(x[1]))):
+        total = sum(values)
+        share = total / totals[group] * 100 if totals[group] else 0
+
+        print(f'{group:<24} {stage:<30} {len(values):>7} {total:>9.3f} '
+              f'{share:>5.1f}% {total / len(values) * 1000:>9.2f} '
+              f'{percentile(values, 50) * 1000:>9.2f} '
+              f'{percentile(values, 99) * 1000:>9.2f}')
+
+    print()
+    for group, count in sorted(traces.items()):
+        print(f'{group or "all"}: {count} traces, '
+              f'{totals[group] / count * 1000:.2f} ms mean per log')
+
+
+if __name__ == '__main__':
+    main()
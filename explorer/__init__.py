@@ -14,20 +14,26 @@ import gevent
 monkey.patch_all()
 
 from math import log2
+import time
+import os
 
+from psycopg_pool import PoolTimeout, TooManyRequests
 from werkzeug.routing import BaseConverter, Map
 from flask.wrappers import Response
+from flask import request as flask_request
 from web3._utils import request
 from hexbytes import HexBytes
 import simplejson as json
-from flask import Flask
+from flask import Flask, g, jsonify
 import lru
 
 from explorer.utils.helpers import dispatch_get_logs
 from explorer.utils.data import SYN_DATA, TESTING
-from explorer.utils.database import Transaction
+from explorer.utils.serialize import CustomJSONEncoder
 from explorer.utils.rpc import bridge_callback
-from explorer.utils import poll
+from explorer.utils import bloom, cache, poll, metrics, debug, recent, \
+    replicas
+from explorer.utils.analytics import users
 
 # Get the next ^2 that is greater than len(SYN_DATA.keys()) so we can make
 # the cache size greater than the amount of chains we support.
@@ -39,9 +45,19 @@ c = request._session_cache.get_size()
 assert b != c, '_session_cache size did not change'
 assert c == n, 'new _session_cache size is not what we set it to'
 
+if debug.DEBUG_MODE:
+    debug.start_blocking_monitor()
+
 if not TESTING:
     gevent.spawn(poll.start, bridge_callback)
     gevent.spawn(dispatch_get_logs, bridge_callback)
+    gevent.spawn(metrics.watch_heads,
+                 float(os.getenv('METRICS_HEAD_INTERVAL', 30)))
+    cache.start_subscriber()
+    bloom.start()
+    recent.start()
+    replicas.start()
+    users.start()
 
 
 class HexConverter(BaseConverter):
@@ -56,24 +72,6 @@ class HexConverter(BaseConverter):
         return value.hex()
 
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def _transform(self, v):
-        if isinstance(v, HexBytes):
-            return v.hex()
-        elif isinstance(v, int):
-            # Over max `Number.MAX_SAFE_INTEGER` for JS.
-            if v > (2**53 - 1):
-                return str(v)
-
-        return v
-
-    def default(self, o):
-        if isinstance(o, Transaction):
-            return {k: self._transform(v) for k, v in o.__dict__.items()}
-
-        super().default(o)
-
-
 def init() -> Flask:
     app = Flask(__name__)
     app.json_encoder = CustomJSONEncoder  # type: ignore
@@ -82,6 +80,7 @@ def init() -> Flask:
     app.url_map.converters['hex'] = HexConverter
 
     from .routes.api.v1.transactions import transactions_bp
+    from .routes.api.v1.analytics.volume import volume_bp
     from .routes.api.v1.analytics.users import users_bp
     from .routes.api.v1.search import search_bp
     from .routes.root import root_bp
@@ -89,12 +88,37 @@ def init() -> Flask:
     app.register_blueprint(root_bp)
     app.register_blueprint(search_bp, url_prefix='/api/v1/search')
     app.register_blueprint(users_bp, url_prefix='/api/v1/analytics/users')
+    app.register_blueprint(volume_bp,
+                           url_prefix='/api/v1/analytics/volume')
     app.register_blueprint(transactions_bp, url_prefix='/api/v1/transactions')
 
+    if debug.DEBUG_MODE:
+        from .routes.debug import debug_bp
+        app.register_blueprint(debug_bp, url_prefix='/debug')
+
+    @app.errorhandler(PoolTimeout)
+    @app.errorhandler(TooManyRequests)
+    def pool_exhausted(e: Exception):
+        # `PSQL_API` is exhausted, tell the client to back off rather than
+        # queueing up even more requests.
+        return jsonify({'error': 'database is busy, try again later'}), 503
+
+    @app.before_request
+    def before_request():
+        g.start = time.perf_counter()
+
     @app.after_request
     def after_request(response: Response):
         header = response.headers
         header['Access-Control-Allow-Origin'] = '*'
+
+        if (start := g.get('start')):
+            metrics.HTTP_LATENCY.labels(
+                flask_request.endpoint or 'unknown',
+                flask_request.method,
+                response.status_code,
+            ).observe(time.perf_counter() - start)
+
         return response
 
     return app
@@ -1,8 +1,16 @@
 import os
+import json
+import time
+import sqlite3
+import hashlib
 import threading
 import threading
 from typing import (
-    Any, )
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
 
 from aiohttp import (
     ClientSession,
@@ -10,6 +18,7 @@ from aiohttp import (
 )
 from eth_typing import (
     URI, )
+from gevent.threadpool import ThreadPool
 import lru
 import requests
 
@@ -45,8 +54,128 @@ def _get_session(endpoint_uri: URI) -> requests.Session:
         return _session_cache[cache_key]
 
 
-def make_post_request(endpoint_uri: URI, data: bytes, *args: Any,
-                      **kwargs: Any) -> bytes:
+# Methods whose (non-null) result can never change once it's
+# `RPC_CACHE_CONFIRMATIONS` blocks deep, these get cached on disk when
+# `RPC_CACHE_PATH` is set.
+# NOTE: `eth_getBlockByNumber` is only cached for explicit block numbers.
+IMMUTABLE_METHODS = {
+    'eth_chainId',
+    'eth_getBlockByHash',
+    'eth_getBlockByNumber',
+    'eth_getTransactionByHash',
+    'eth_getTransactionReceipt',
+}
+
+# Results of these are settled as soon as there's one, a block's hash covers
+# its contents. The rest can be reorged near the chain's head, they carry
+# the number of the block they're from.
+SETTLED_METHODS = {
+    'eth_chainId',
+    'eth_getBlockByHash',
+}
+
+
+class DiskCache:
+    """
+    Content addressed sqlite cache for JSON-RPC results, evicting the least
+    recently used entries once `max_bytes` is reached.
+
+    sqlite blocks, so every query runs on a thread of the cache's own rather
+    than on the hub. There's the one thread, which serializes them too.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._pool = ThreadPool(1)
+        # Queued ahead of any query rather than waited on, creating the cache
+        # mustn't yield to greenlets which would find it isn't there yet.
+        self._pool.spawn(self._open, path)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self._pool.apply(self._get, (key, ))
+
+    def set(self, key: bytes, value: bytes) -> None:
+        self._pool.apply(self._set, (key, value))
+
+    def _open(self, path: str) -> None:
+        self._db = sqlite3.connect(path,
+                                   check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY '
+                         'KEY, value BLOB NOT NULL, atime INTEGER NOT NULL)')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS idx_atime ON cache(atime)')
+        self.size = self._db.execute(
+            'SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache').fetchone()[0]
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        ret = self._db.execute('SELECT value FROM cache WHERE key = ?',
+                               (key, )).fetchone()
+
+        if ret is not None:
+            self._db.execute('UPDATE cache SET atime = ? WHERE key = ?',
+                             (int(time.time()), key))
+            return ret[0]
+
+        return None
+
+    def _set(self, key: bytes, value: bytes) -> None:
+        # Values are immutable, a duplicate key has the same value.
+        c = self._db.execute('INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                             (key, value, int(time.time())))
+        if c.rowcount == 1:
+            self.size += len(value)
+
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Leave some headroom so we don't evict on every insert.
+        target = self.max_bytes * 0.9
+
+        while self.size > target:
+            rows = self._db.execute(
+                'SELECT key, LENGTH(value) FROM cache ORDER BY atime '
+                'LIMIT 256').fetchall()
+            if not rows:
+                self.size = 0
+                break
+
+            self._db.executemany('DELETE FROM cache WHERE key = ?',
+                                 [(k, ) for k, _ in rows])
+            self.size -= sum(size for _, size in rows)
+
+
+_disk_cache: Optional[DiskCache] = None
+_disk_cache_init = False
+_confirmations = 0
+_head_interval = 0.0
+_chain_ids: Dict[str, bytes] = {}
+# (when, head) of each chain, by chain id.
+_heads: Dict[bytes, Tuple[float, int]] = {}
+
+
+def _get_disk_cache() -> Optional[DiskCache]:
+    # Lazily, `.env` is loaded after web3 (and so this module) is imported.
+    global _disk_cache, _disk_cache_init, _confirmations, _head_interval
+
+    if not _disk_cache_init:
+        _disk_cache_init = True
+
+        if (path := os.environ.get('RPC_CACHE_PATH')):
+            max_bytes = int(os.environ.get('RPC_CACHE_MAX_BYTES', 2**30))
+            _disk_cache = DiskCache(path, max_bytes)
+            _confirmations = int(
+                os.environ.get('RPC_CACHE_CONFIRMATIONS', 128))
+            _head_interval = float(
+                os.environ.get('RPC_CACHE_HEAD_INTERVAL', 5))
+
+    return _disk_cache
+
+
+def _post(endpoint_uri: URI, data: bytes, *args: Any, **kwargs: Any) -> bytes:
     kwargs.setdefault('timeout', 10)
 
     session = _get_session(endpoint_uri)
@@ -58,6 +187,98 @@ def make_post_request(endpoint_uri: URI, data: bytes, *args: Any,
     return response.content
 
 
+def _get_chain_id(endpoint_uri: URI, *args: Any, **kwargs: Any) -> bytes:
+    # Key on the chain rather than the endpoint so swapping RPC providers
+    # does not throw the cache away.
+    if endpoint_uri not in _chain_ids:
+        data = b'{"jsonrpc":"2.0","method":"eth_chainId","params":[],"id":0}'
+        ret = json.loads(_post(endpoint_uri, data, *args, **kwargs))
+        _chain_ids[endpoint_uri] = ret['result'].encode()
+
+    return _chain_ids[endpoint_uri]
+
+
+def _get_head(endpoint_uri: URI, chain_id: bytes, *args: Any,
+              **kwargs: Any) -> int:
+    data = b'{"jsonrpc":"2.0","method":"eth_blockNumber","params":[],"id":0}'
+    ret = json.loads(_post(endpoint_uri, data, *args, **kwargs))
+    _heads[chain_id] = (time.monotonic(), int(ret['result'], 16))
+
+    return _heads[chain_id][1]
+
+
+def _is_settled(endpoint_uri: URI, chain_id: bytes, method: str, result: Any,
+                *args: Any, **kwargs: Any) -> bool:
+    if method in SETTLED_METHODS:
+        return True
+
+    key = 'number' if method == 'eth_getBlockByNumber' else 'blockNumber'
+    # Pending transactions aren't in a block yet.
+    if not isinstance(result, dict) or result.get(key) is None:
+        return False
+
+    number = int(result[key], 16) + _confirmations
+    at, head = _heads.get(chain_id, (float('-inf'), -1))
+
+    # The head only moves forward, only ask for it when what we know of it
+    # isn't enough, and at most every `RPC_CACHE_HEAD_INTERVAL` seconds. Not
+    # caching a result until then only costs fetching it again.
+    if number > head and time.monotonic() - at >= _head_interval:
+        # Claimed up front, concurrent misses don't all ask for it too.
+        _heads[chain_id] = (time.monotonic(), head)
+        head = _get_head(endpoint_uri, chain_id, *args, **kwargs)
+
+    return number <= head
+
+
+def _is_cacheable(request: Any) -> bool:
+    if not isinstance(request, dict) \
+            or request.get('method') not in IMMUTABLE_METHODS:
+        return False
+
+    if request['method'] == 'eth_getBlockByNumber':
+        block = request['params'][0]
+        return isinstance(block, int) \
+            or (isinstance(block, str) and block.startswith('0x'))
+
+    return True
+
+
+def make_post_request(endpoint_uri: URI, data: bytes, *args: Any,
+                      **kwargs: Any) -> bytes:
+    cache = _get_disk_cache()
+    if cache is None:
+        return _post(endpoint_uri, data, *args, **kwargs)
+
+    request = json.loads(data)
+    if not _is_cacheable(request):
+        return _post(endpoint_uri, data, *args, **kwargs)
+
+    chain_id = _get_chain_id(endpoint_uri, *args, **kwargs)
+    key = hashlib.sha256(
+        chain_id + json.dumps(
+            [request['method'], request['params']],
+            sort_keys=True,
+            separators=(',', ':'),
+        ).encode()).digest()
+
+    if (result := cache.get(key)) is not None:
+        _id = json.dumps(request.get('id')).encode()
+        return b'{"jsonrpc":"2.0","id":' + _id + b',"result":' + result + b'}'
+
+    content = _post(endpoint_uri, data, *args, **kwargs)
+    response = json.loads(content)
+
+    # Pending txs and unmined receipts are null, those may still change, as
+    # may anything near the chain's head.
+    if response.get('result') is not None and 'error' not in response \
+            and _is_settled(endpoint_uri, chain_id, request['method'],
+                            response['result'], *args, **kwargs):
+        cache.set(key, json.dumps(response['result']).encode())
+
+    return content
+
+
 async def async_make_post_request(endpoint_uri: URI, data: bytes, *args: Any,
                                   **kwargs: Any) -> bytes:
     kwargs.setdefault('timeout', ClientTimeout(10))
@@ -10,14 +10,16 @@
 from flask import jsonify, Blueprint, request
 
 from explorer.utils.analytics.users import get_unique_users_count
+from explorer.utils import cache
 
 users_bp = Blueprint('users_bp', __name__)
 
 
-# TODO: cache.
 @users_bp.route('/unique', methods=['GET'])
+@cache.cached(cache.CACHE_ANALYTICS_TTL)
 def users_unique():
     from_time = request.args.get('from_time', type=int)
     to_time = request.args.get('to_time', type=int)
+    chain_id = request.args.get('chain_id', type=int)
 
-    return jsonify(get_unique_users_count(from_time, to_time))
+    return jsonify(get_unique_users_count(from_time, to_time, chain_id))
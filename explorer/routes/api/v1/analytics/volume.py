@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from flask import Blueprint, request
+
+from explorer.utils.analytics.volume import get_volume
+from explorer.utils import cache, serialize
+
+volume_bp = Blueprint('volume_bp', __name__)
+
+
+@volume_bp.route('', methods=['GET'])
+@cache.cached(cache.CACHE_ANALYTICS_TTL)
+def volume():
+    from_time = request.args.get('from_time', type=int)
+    to_time = request.args.get('to_time', type=int)
+
+    return serialize.jsonify(get_volume(from_time, to_time))
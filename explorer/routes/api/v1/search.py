@@ -7,30 +7,202 @@
           https://www.boost.org/LICENSE_1_0.txt)
 """
 
-from flask import jsonify, Blueprint
+from typing import Any, Dict, Generator, List, Union
+import re
+import os
+
+from flask import jsonify, Blueprint, Response, request, \
+    stream_with_context
 from hexbytes import HexBytes
 
-from explorer.utils.database import Transaction
+from explorer.utils.database import Transaction, LostTransaction
+from explorer.utils import bloom, cache, pagination, serialize
 
 search_bp = Blueprint('search_bp', __name__)
 
+# Most hashes and addresses `/batch` takes per request.
+BATCH_MAX = int(os.getenv('BATCH_MAX', 100))
+# Transactions returned per address in a batch, the newest.
+BATCH_ADDRESS_LIMIT = int(os.getenv('BATCH_ADDRESS_LIMIT', 20))
+
+_TX_HASH = re.compile(r'0x[A-Fa-f0-9]{64}')
+_ADDRESS = re.compile(r'0x[A-Fa-f0-9]{40}')
+
+
+def _hint(txs: List[Union[Transaction, LostTransaction]],
+          *tags: bytes) -> None:
+    """ Cache `txs` for long unless any are pending. """
+
+    # A lost transaction may still be completed by `complete_lost_txs.py`.
+    ttl = cache.CACHE_PENDING_TTL \
+        if any(getattr(x, 'pending', True) for x in txs) else cache.CACHE_TTL
+    cache.hint(ttl, tags)
+
 
-# TODO: cache w/ redis-cache
 @search_bp.route('/txhash/<hex:txhash>', methods=['GET'])
+@cache.cached()
 def search_txhash(txhash: HexBytes):
+    if not bloom.might_contain(txhash):
+        cache.hint(cache.CACHE_PENDING_TTL, [txhash])
+        return jsonify(None), 404
+
     ret = Transaction.search_with_tx_hash(txhash, silent=True)
 
     if ret is None:
+        cache.hint(cache.CACHE_PENDING_TTL, [txhash])
         return jsonify(None), 404
 
-    return jsonify(ret[0])
+    tx = ret[0]
+    # Ingestion invalidates by every hash of a row it writes.
+    _hint([tx], txhash, tx.kappa)
+
+    return serialize.jsonify(tx)
 
 
 @search_bp.route('/address/<hex(length=40):address>', methods=['GET'])
+@cache.cached()
 def search_address(address: HexBytes):
+    if not bloom.might_contain(address):
+        cache.hint(cache.CACHE_PENDING_TTL, [address])
+        return jsonify(None), 404
+
+    stream = request.args.get('stream')
+
+    if stream is not None:
+        if stream not in ('json', 'ndjson'):
+            return jsonify({'error': 'stream must be json or ndjson'}), 400
+
+        return _stream_address(address, stream)
+    elif 'limit' in request.args or 'cursor' in request.args:
+        return _page_address(address)
+
     ret = Transaction.search_with_address(address, silent=True)
 
     if ret is None:
+        cache.hint(cache.CACHE_PENDING_TTL, [address])
         return jsonify(None), 404
 
-    return jsonify(ret)
+    _hint(ret, address)
+
+    return serialize.jsonify(ret)
+
+
+@search_bp.route('/batch', methods=['POST'])
+def search_batch():
+    """
+    Look up a JSON array of tx hashes, kappas and addresses at once, with a
+    query per kind rather than per item. Returns a map of each input to what
+    `/txhash` would, or for an address its newest `BATCH_ADDRESS_LIMIT`
+    transactions (the rest are paged through `/address`), `null` if nothing
+    was found.
+    """
+
+    queries = request.get_json(silent=True)
+
+    if not isinstance(queries, list) \
+            or not all(isinstance(x, str) for x in queries):
+        return jsonify({'error': 'expected an array of hashes or addresses'
+                        }), 400
+    elif len(queries) > BATCH_MAX:
+        return jsonify({'error': f'at most {BATCH_MAX} hashes or addresses'
+                        }), 400
+
+    # Value -> the inputs it came from, they may differ in case.
+    tx_hashes: Dict[bytes, List[str]] = {}
+    addresses: Dict[bytes, List[str]] = {}
+    invalid: List[str] = []
+
+    for query in queries:
+        if _TX_HASH.fullmatch(query):
+            to = tx_hashes
+        elif _ADDRESS.fullmatch(query):
+            to = addresses
+        else:
+            invalid.append(query)
+            continue
+
+        value = bytes(HexBytes(query))
+        # Never indexed, don't bother asking.
+        if bloom.might_contain(value):
+            to.setdefault(value, []).append(query)
+
+    if invalid:
+        return jsonify({'error': 'invalid hashes or addresses',
+                        'invalid': invalid}), 400
+
+    ret: Dict[str, Any] = dict.fromkeys(queries)
+
+    if tx_hashes:
+        for value, tx in Transaction.search_with_tx_hashes(tx_hashes).items():
+            for query in tx_hashes[value]:
+                ret[query] = tx
+
+    if addresses:
+        for value, txs in Transaction.search_with_addresses(
+                addresses, BATCH_ADDRESS_LIMIT).items():
+            for query in addresses[value]:
+                ret[query] = txs
+
+    return serialize.jsonify(ret)
+
+
+def _page_address(address: HexBytes):
+    limit = request.args.get('limit', 20, int)
+
+    if limit > 250:
+        return jsonify({'error': 'limit must be less than 250'}), 400
+    elif limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        after = pagination.cursor_arg()
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+
+    # One extra row to know whether there's a next page.
+    ret = Transaction.page_with_address(address, limit + 1, after)
+
+    if not ret and after is None:
+        cache.hint(cache.CACHE_PENDING_TTL, [address])
+        return jsonify(None), 404
+
+    ret, cursor = pagination.split_page(ret, limit, 'sent_time')
+    _hint(ret, address)
+
+    res = serialize.jsonify(ret)
+    if cursor is not None:
+        res.headers['Link'] = pagination.next_link(cursor)
+
+    return res
+
+
+def _stream_address(address: HexBytes, stream: str):
+    batches = Transaction.stream_with_address(address)
+
+    # Fetch the first batch before committing to a 200.
+    if (first := next(batches, None)) is None:
+        cache.hint(cache.CACHE_PENDING_TTL, [address])
+        return jsonify(None), 404
+
+    def generate() -> Generator[str, None, None]:
+        try:
+            if stream == 'ndjson':
+                yield ''.join(serialize.dumps(x) + '\n' for x in first)
+
+                for batch in batches:
+                    yield ''.join(serialize.dumps(x) + '\n' for x in batch)
+            else:
+                yield serialize.dumps(first)[:-1]
+
+                for batch in batches:
+                    yield ',' + serialize.dumps(batch)[1:-1]
+
+                yield ']\n'
+        finally:
+            # Hand the connection back if the client went away mid-stream.
+            batches.close()
+
+    mimetype = 'application/x-ndjson' if stream == 'ndjson' \
+        else 'application/json'
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -7,14 +7,95 @@
           https://www.boost.org/LICENSE_1_0.txt)
 """
 
-from flask import jsonify, Blueprint, request
+from typing import Any, Callable, Dict
+import re
 
-from explorer.utils.database import Transaction
+from flask import jsonify, Blueprint, Response, request
+
+from explorer.utils.database import Transaction, QueryTooExpensive
+from explorer.utils import pagination, recent, serialize, singleflight
+from explorer.utils.metrics import RECENT_PAGES
 
 transactions_bp = Blueprint('transactions_bp', __name__)
 
+_ADDRESS = re.compile(r'0x[A-Fa-f0-9]{40}')
+
+
+def _bool(value: str) -> bool:
+    if value not in ('true', 'false'):
+        raise ValueError(f'expected true or false, not {value!r}')
+
+    return value == 'true'
+
+
+def _address(value: str) -> bytes:
+    if not _ADDRESS.fullmatch(value):
+        raise ValueError(f'invalid address {value!r}')
+
+    return bytes.fromhex(value[2:])
+
+
+# Query arg -> its parser, one per filter in `TX_FILTERS`.
+_FILTER_ARGS: Dict[str, Callable[[str], Any]] = {
+    'from_chain_id': int,
+    'to_chain_id': int,
+    'token': _address,
+    'from_time': int,
+    'to_time': int,
+    'pending': _bool,
+    'swap_success': _bool,
+}
+
+
+@transactions_bp.route('', methods=['GET'])
+@singleflight.coalesced
+def filter_txs():
+    limit = request.args.get('limit', 20, int)
+
+    if limit > 250:
+        return jsonify({'error': 'limit must be less than 250'}), 400
+    elif limit < 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        after = pagination.cursor_arg()
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+
+    filters: Dict[str, Any] = {}
+
+    for name, value in request.args.items():
+        if name in ('limit', 'cursor'):
+            continue
+        elif name not in _FILTER_ARGS:
+            return jsonify({'error': f'unknown filter {name!r}'}), 400
+
+        try:
+            filters[name] = _FILTER_ARGS[name](value)
+        except ValueError:
+            return jsonify({'error': f'invalid value for {name!r}'}), 400
+
+    try:
+        # One extra row to know whether there's a next page.
+        ret = Transaction.filter(filters, limit + 1, after)
+    except QueryTooExpensive as e:
+        return jsonify({
+            'error': 'no index covers this combination of filters, narrow '
+                     'it down with a chain, token or time range',
+            'detail': e.message,
+        }), 400
+
+    ret, cursor = pagination.split_page(ret, limit, 'sent_time')
+
+    res = serialize.jsonify(ret)
+    if cursor is not None:
+        res.headers['Link'] = pagination.next_link(cursor)
+
+    return res
+
 
 @transactions_bp.route('/recent', methods=['GET'])
+@singleflight.coalesced
 def search_recent_txs():
     include_pending = request.args.get('include_pending', False, bool)
     only_pending = request.args.get('only_pending', False, bool)
@@ -25,6 +106,33 @@ def search_recent_txs():
     elif limit < 0:
         return jsonify({'error': 'limit must be positive'}), 400
 
-    ret = Transaction.fetch_recent_txs(include_pending, only_pending, limit)
+    try:
+        after = pagination.cursor_arg()
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+
+    if only_pending:
+        view = 'pending'
+    elif include_pending:
+        view = 'all'
+    else:
+        view = 'completed'
+
+    if (page := recent.page(view, limit, after)) is not None:
+        RECENT_PAGES.labels('redis').inc()
+        rows, cursor = page
+        res = Response('[' + ','.join(rows) + ']\n',
+                       mimetype='application/json')
+    else:
+        RECENT_PAGES.labels('postgres').inc()
+        # One extra row to know whether there's a next page.
+        ret = Transaction.fetch_recent_txs(include_pending, only_pending,
+                                           limit + 1, after)
+        ret, cursor = pagination.split_page(ret, limit,
+                                            recent.VIEWS[view][1])
+        res = serialize.jsonify(ret)
+
+    if cursor is not None:
+        res.headers['Link'] = pagination.next_link(cursor)
 
-    return jsonify(ret)
+    return res
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from flask import Blueprint, Response, jsonify, request
+
+from explorer.utils.debug import profile as _profile
+
+debug_bp = Blueprint('debug_bp', __name__)
+
+
+@debug_bp.route('/profile', methods=['GET'])
+def profile():
+    seconds = request.args.get('seconds', 10, type=float)
+    interval = request.args.get('interval', 10, type=float) / 1000
+    mode = request.args.get('mode', 'cpu')
+
+    if mode not in ('cpu', 'wall'):
+        return jsonify({'error': 'mode must be either cpu or wall'}), 400
+    elif seconds <= 0 or interval <= 0:
+        return jsonify({'error': 'seconds and interval must be positive'}), 400
+
+    return Response(_profile(seconds, interval, mode), mimetype='text/plain')
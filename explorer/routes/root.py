@@ -10,7 +10,8 @@
 import json
 import os
 
-from flask import Blueprint, jsonify
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from flask import Blueprint, Response, jsonify
 
 # Get parent (root) dir.
 _path = os.path.dirname(
@@ -31,3 +32,8 @@ def index():
 @root_bp.route('/openapi.json')
 def openapi():
     return jsonify(OPENAPI_DATA)
+
+
+@root_bp.route('/metrics')
+def metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
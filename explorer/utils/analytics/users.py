@@ -5,48 +5,235 @@
  Distributed under the Boost Software License, Version 1.0.
     (See accompanying file LICENSE_1_0.txt or copy at
           https://www.boost.org/LICENSE_1_0.txt)
+
+Unique users (`from_address`es) counted from HyperLogLog sketches in Redis
+rather than a `COUNT(DISTINCT ...)` over `txs`, so a count takes a `PFCOUNT`
+over a key per day instead of a scan of every row in the range.
+
+Ingestion adds the sender of every row it writes to the sketches: one of
+all time, which counts pending rows too, and once it's completed one of the
+UTC day of its `received_time` (`users:days` lists the days there are).
+Each also exists per `from_chain_id`. A range is counted over the days it
+covers whole, plus the addresses of its partial days at either end from
+Postgres, exactly. Ranges under `USERS_EXACT_RANGE` seconds are counted in
+Postgres altogether, as is everything until the sketches are first built.
+
+Sketches are built from `txs` in the background at boot and every
+`USERS_REBUILD_INTERVAL` seconds, to pick up rows written by other processes
+(`cli/complete_lost_txs.py`). Adding an address twice changes nothing, so
+they're built on top of what's there.
 """
 
-from typing import cast
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
+from collections import defaultdict
+import uuid
+import time
+import os
+
+from psycopg import sql
+import gevent
+import redis
+
+from explorer.utils.data import PSQL, USERS_REDIS
+from explorer.utils.metrics import DB_LATENCY
+from explorer.utils import statements, replicas
+
+DAY = 86400
+USERS_EXACT_RANGE = int(os.getenv('USERS_EXACT_RANGE', 2 * DAY))
+USERS_REBUILD_INTERVAL = float(os.getenv('USERS_REBUILD_INTERVAL', DAY))
+
+_READY = 'users:ready'
+_DAYS = 'users:days'
+
+
+def _key(name: str, chain_id: Optional[int]) -> str:
+    return f'users:{name}' if chain_id is None else f'users:{name}:{chain_id}'
+
+
+def _sketch(
+    rows: Iterable[Tuple[bytes, int, Optional[int]]]
+) -> Tuple[Dict[str, Set[bytes]], Set[int]]:
+    """
+    The addresses to add to each sketch for `rows` of `from_address`,
+    `from_chain_id` and `received_time`, and the days they're of.
+    """
+
+    keys: Dict[str, Set[bytes]] = defaultdict(set)
+    days: Set[int] = set()
+
+    for address, chain_id, received_time in rows:
+        address = bytes(address)
+        keys[_key('all', None)].add(address)
+        keys[_key('all', chain_id)].add(address)
+
+        if received_time is not None:
+            day = received_time // DAY
+            days.add(day)
+            keys[_key(f'day:{day}', None)].add(address)
+            keys[_key(f'day:{day}', chain_id)].add(address)
+
+    return keys, days
+
+
+def _save(keys: Dict[str, Set[bytes]], days: Set[int]) -> None:
+    pipe = USERS_REDIS.pipeline(transaction=False)
+
+    for key, addresses in keys.items():
+        pipe.pfadd(key, *addresses)
+    if days:
+        pipe.zadd(_DAYS, {str(x): x for x in days})
+
+    pipe.execute()
+
+
+def add(row: Dict[str, Any]) -> None:
+    """ Count the sender of a `txs` row freshly written by ingestion. """
+
+    # The row's committed, ingestion goes on either way. The next `build`
+    # counts it.
+    try:
+        _save(*_sketch([(row['from_address'], row['from_chain_id'],
+                         row['received_time'])]))
+    except redis.RedisError as e:
+        print(f'users: failed to add {bytes(row["from_address"]).hex()}: {e}')
+
 
-from explorer.utils.data import PSQL
+def build(batch_size: int = 10000) -> None:
+    start = time.time()
+    count = 0
 
+    # As in `bloom.build`.
+    with PSQL.connection() as conn, conn.transaction():
+        with conn.cursor(name='users_sketch') as c:
+            c.execute(statements.STATEMENTS['txs.users_sketch'])
 
-def get_unique_users_count(from_time: int = None, to_time: int = None) -> int:
+            while (rows := c.fetchmany(batch_size)):
+                _save(*_sketch(rows))
+                count += len(rows)
+
+                # Let everything else run between batches.
+                gevent.sleep(0)
+
+    USERS_REDIS.set(_READY, 1)
+    print(f'users: built from {count} rows in {time.time() - start:.1f}s')
+
+
+def _rebuild_forever() -> None:
+    while True:
+        try:
+            build()
+        except Exception as e:
+            print(f'users: build failed: {e}')
+
+        gevent.sleep(USERS_REBUILD_INTERVAL)
+
+
+def start() -> gevent.Greenlet:
+    return gevent.spawn(_rebuild_forever)
+
+
+def _query(select: str, from_time: Optional[int], to_time: Optional[int],
+           chain_id: Optional[int]) -> Tuple[sql.Composable, Dict[str, Any]]:
+    conditions: List[sql.Composable] = []
+
+    if from_time is not None:
+        conditions.append(sql.SQL('received_time > %(from_time)s'))
+    if to_time is not None:
+        conditions.append(sql.SQL('received_time < %(to_time)s'))
+    if chain_id is not None:
+        conditions.append(sql.SQL('from_chain_id = %(chain_id)s'))
+
+    query = sql.SQL(f'SELECT {select} FROM txs')
+    if conditions:
+        query += sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions)
+
+    return query, {
+        'from_time': from_time,
+        'to_time': to_time,
+        'chain_id': chain_id
+    }
+
+
+def _exact(select: str, from_time: Optional[int], to_time: Optional[int],
+           chain_id: Optional[int]) -> List[Tuple[Any, ...]]:
+    query, params = _query(select, from_time, to_time, chain_id)
+
+    with replicas.pool().connection() as conn:
+        with conn.cursor() as c, DB_LATENCY.labels('txs.unique_users').time():
+            c.execute(query, params)
+            return c.fetchall()
+
+
+def _count(from_time: Optional[int], to_time: Optional[int],
+           chain_id: Optional[int]) -> int:
+    return cast(
+        int,
+        _exact('COUNT(DISTINCT from_address)', from_time, to_time,
+               chain_id)[0][0])
+
+
+def days(from_time: int, to_time: int) -> Tuple[int, int]:
+    """
+    The days `[first, last)` entirely within `received_time > from_time AND
+    received_time < to_time`.
+    """
+
+    return -(-(from_time + 1) // DAY), to_time // DAY
+
+
+def get_unique_users_count(from_time: int = None,
+                           to_time: int = None,
+                           chain_id: int = None) -> int:
     """
     Get unique users with the option to filter by `received_time` using UNIX
-    timestamps - `int(time.time())`
+    timestamps - `int(time.time())` - and by `from_chain_id`.
+
+    NOTE: counts over more than `USERS_EXACT_RANGE` seconds are estimates,
+        within a percent or so.
 
     Args:
         from_time (int, optional): received_time gt than `from_time`.
         to_time (int, optional): received_time lt than `to_time`.
+        chain_id (int, optional): from_chain_id eq to `chain_id`.
 
     Returns:
         int: number of unique users
     """
 
-    sql = "SELECT COUNT(DISTINCT from_address) FROM txs "
-    params = []
+    if not USERS_REDIS.exists(_READY):
+        return _count(from_time, to_time, chain_id)
+    elif from_time is None and to_time is None:
+        return cast(int, USERS_REDIS.pfcount(_key('all', chain_id)))
 
-    if from_time or to_time:
-        sql += "WHERE received_time "
+    # No day has anything before its first row nor after today.
+    lo = -1 if from_time is None else from_time
+    hi = (int(time.time()) // DAY + 2) * DAY if to_time is None else to_time
+    first, last = days(lo, hi)
 
-    if from_time:
-        params.append(from_time)
-        sql += "> %s "
+    if hi - lo <= USERS_EXACT_RANGE or first >= last:
+        return _count(from_time, to_time, chain_id)
 
-    if to_time:
-        params.append(to_time)
+    keys = [
+        _key(f'day:{int(x)}', chain_id)
+        for x in USERS_REDIS.zrangebyscore(_DAYS, first, last - 1)
+    ]
 
-        if from_time:
-            sql += "AND received_time "
+    # The partial days at either end, if there's a second in them.
+    addresses: Set[bytes] = set()
+    for start, end in ((lo, first * DAY), (last * DAY - 1, hi)):
+        if end - start > 1:
+            addresses.update(
+                bytes(x) for x, in _exact('DISTINCT from_address', start,
+                                          end, chain_id))
 
-        sql += "< %s "
+    if not addresses:
+        return cast(int, USERS_REDIS.pfcount(*keys)) if keys else 0
 
-    with PSQL.connection() as conn:
-        with conn.cursor() as c:
-            c.execute(sql, params)
-            ret = c.fetchone()
-            assert ret is not None
+    # Counted along with the days without writing to them.
+    edges = f'users:edges:{uuid.uuid4().hex}'
+    pipe = USERS_REDIS.pipeline()
+    pipe.pfadd(edges, *addresses)
+    pipe.pfcount(edges, *keys)
+    pipe.delete(edges)
 
-            return cast(int, ret[0])
+    return cast(int, pipe.execute()[1])
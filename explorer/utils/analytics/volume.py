@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Dict, List
+from decimal import Decimal
+
+from hexbytes import HexBytes
+
+from explorer.utils.database import token_meta
+from explorer.utils import statements, replicas
+
+
+def get_volume(from_time: int = None,
+               to_time: int = None) -> List[Dict[str, Any]]:
+    """
+    Get the number of transactions and the volume sent per chain and token,
+    with the option to filter by `sent_time` using UNIX timestamps.
+
+    Args:
+        from_time (int, optional): sent_time gte than `from_time`.
+        to_time (int, optional): sent_time lt than `to_time`.
+
+    Returns:
+        List[Dict[str, Any]]: a dict per chain and token, by chain id.
+    """
+
+    with replicas.pool().connection() as conn:
+        with conn.cursor() as c:
+            statements.execute(c, 'txs.volume',
+                               [from_time or 0, to_time or 2**63 - 1])
+            rows = c.fetchall()
+
+    ret = []
+
+    for chain_id, token, count, volume in sorted(rows):
+        try:
+            symbol, divisor = token_meta(chain_id, token)
+        except KeyError:
+            # A token we don't know the decimals of.
+            symbol, formatted = None, None
+        else:
+            formatted = str(Decimal(volume) / divisor)
+
+        ret.append({
+            'chain_id': chain_id,
+            'token': HexBytes(token).hex(),
+            'token_symbol': symbol,
+            'count': count,
+            'volume': volume,
+            'volume_formatted': formatted,
+        })
+
+    return ret
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Bloom filter of every tx hash, kappa and address in `txs` and `lost_txs`,
+so a search for something we've never indexed is a 404 without a round trip
+to Postgres.
+
+It's built from both tables in the background at boot, ingestion adds to it
+before writing a row, and it's rebuilt every `BLOOM_REBUILD_INTERVAL`
+seconds to pick up rows written by other processes
+(`cli/complete_lost_txs.py`). Until the first build is done every lookup is
+a "maybe".
+"""
+
+from typing import Iterable, List, Optional
+import hashlib
+import time
+import math
+import os
+
+import gevent
+
+from explorer.utils.data import PSQL
+from explorer.utils.metrics import BLOOM_LOOKUPS
+from explorer.utils.statements import STATEMENTS
+
+# Values the filter is sized for, grows to twice the last build's count.
+BLOOM_CAPACITY = int(os.getenv('BLOOM_CAPACITY', 10_000_000))
+BLOOM_FP_RATE = float(os.getenv('BLOOM_FP_RATE', 0.001))
+BLOOM_REBUILD_INTERVAL = float(os.getenv('BLOOM_REBUILD_INTERVAL', 3600))
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float) -> None:
+        # Optimal number of bits and hashes for `capacity` at `fp_rate`.
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2)**2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, value: bytes) -> Iterable[int]:
+        digest = hashlib.blake2b(value, digest_size=16).digest()
+        # Double hashing, `h2` odd so it never degenerates to one index.
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: bytes) -> None:
+        bits = self.bits
+
+        for i in self._indexes(value):
+            bits[i >> 3] |= 1 << (i & 7)
+
+        self.count += 1
+
+    def __contains__(self, value: bytes) -> bool:
+        bits = self.bits
+
+        return all(bits[i >> 3] & (1 << (i & 7))
+                   for i in self._indexes(value))
+
+
+_filter: Optional[BloomFilter] = None
+# The filter being built, if any, it gets every `add` as well.
+_building: Optional[BloomFilter] = None
+
+
+def add(*values: Optional[bytes]) -> None:
+    for value in values:
+        if value is None:
+            continue
+
+        value = bytes(value)
+
+        if _filter is not None:
+            _filter.add(value)
+        if _building is not None:
+            _building.add(value)
+
+
+def might_contain(value: bytes) -> bool:
+    """ `False` only if `value` is definitely not indexed. """
+
+    if _filter is None:
+        BLOOM_LOOKUPS.labels('not_ready').inc()
+        return True
+    elif bytes(value) in _filter:
+        BLOOM_LOOKUPS.labels('maybe').inc()
+        return True
+
+    BLOOM_LOOKUPS.labels('miss').inc()
+    return False
+
+
+def build(batch_size: int = 5000) -> BloomFilter:
+    global _building, _filter
+
+    capacity = BLOOM_CAPACITY
+    if _filter is not None:
+        capacity = max(capacity, 2 * _filter.count)
+
+    _building = bloom = BloomFilter(capacity, BLOOM_FP_RATE)
+    start = time.time()
+
+    try:
+        # The pool may hand out connections left in autocommit, which a
+        # server-side cursor can't be declared on outside of a transaction.
+        with PSQL.connection() as conn, conn.transaction():
+            with conn.cursor(name='bloom_keys') as c:
+                c.execute(STATEMENTS['txs.bloom_keys'])
+
+                while (rows := c.fetchmany(batch_size)):
+                    values: List[bytes] = [x for row in rows for x in row
+                                           if x is not None]
+                    for value in values:
+                        bloom.add(value)
+
+                    # Let everything else run between batches.
+                    gevent.sleep(0)
+    finally:
+        _building = None
+
+    _filter = bloom
+    print(f'bloom: built with {bloom.count} values in '
+          f'{time.time() - start:.1f}s ({len(bloom.bits) >> 20}MiB, '
+          f'{bloom.hashes} hashes)')
+
+    if bloom.count > capacity:
+        print(f'bloom: {bloom.count} values is over the capacity of '
+              f'{capacity}, the false positive rate is above '
+              f'{BLOOM_FP_RATE} until the next build')
+
+    return bloom
+
+
+def _rebuild_forever() -> None:
+    while True:
+        try:
+            build()
+        except Exception as e:
+            print(f'bloom: build failed: {e}')
+
+        gevent.sleep(BLOOM_REBUILD_INTERVAL)
+
+
+def start() -> gevent.Greenlet:
+    return gevent.spawn(_rebuild_forever)
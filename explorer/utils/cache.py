@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Response cache, an in-process LRU in front of Redis so a popular lookup is
+served without leaving the process, let alone reaching Postgres.
+
+Entries are keyed by path and (sorted) query args, and tagged with the tx
+hashes, kappas and addresses in them. Ingestion calls `invalidate` with the
+ones of every row it writes, which drops the tagged entries from Redis and
+publishes their keys so every process evicts them from its LRU too.
+
+A completed transaction never changes, so those are cached for a long time,
+pending ones only briefly in case an invalidation is missed.
+"""
+
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple, \
+    TypeVar, cast
+import functools
+import time
+import os
+
+from flask import g, make_response
+from flask.wrappers import Response
+import simplejson as json
+import gevent
+import redis
+import lru
+
+from explorer.utils.data import CACHE_REDIS
+from explorer.utils.metrics import CACHE_REQUESTS
+from explorer.utils import singleflight
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Seconds to cache a response which only has completed transactions.
+CACHE_TTL = int(os.getenv('CACHE_TTL', 86400))
+# Seconds to cache a response with any pending transaction.
+CACHE_PENDING_TTL = int(os.getenv('CACHE_PENDING_TTL', 15))
+# Seconds to cache analytics, these aren't invalidated.
+CACHE_ANALYTICS_TTL = int(os.getenv('CACHE_ANALYTICS_TTL', 60))
+# Entries held in-process.
+CACHE_LRU_SIZE = int(os.getenv('CACHE_LRU_SIZE', 4096))
+
+_CHANNEL = 'cache:invalidate'
+
+# key -> (expires at, status, headers, body)
+Entry = Tuple[float, int, List[Tuple[str, str]], bytes]
+_local = lru.LRU(CACHE_LRU_SIZE)
+# Bumped on every invalidation this process sees, a response rendered while
+# it changed may be stale so it isn't stored.
+_generation = 0
+# The LRU is only used while we're subscribed to invalidations, otherwise it
+# could keep serving what another process invalidated.
+_subscribed = False
+
+
+def _tag(value: bytes) -> str:
+    return f'cache:tag:{value.hex()}'
+
+
+def _evict(keys: Iterable[str]) -> None:
+    global _generation
+    _generation += 1
+
+    for key in keys:
+        _local.pop(key, None)
+
+
+def _get(key: str) -> Optional[Entry]:
+    now = time.time()
+
+    if _subscribed and (entry := _local.get(key)) is not None:
+        if entry[0] > now:
+            CACHE_REQUESTS.labels('local').inc()
+            return entry
+
+        del _local[key]
+
+    try:
+        raw = CACHE_REDIS.get(key)
+    except redis.RedisError as e:
+        print(f'cache: {e}')
+        raw = None
+
+    if raw is None:
+        CACHE_REQUESTS.labels('miss').inc()
+        return None
+
+    expires, status, headers, body = json.loads(raw)
+    entry = (expires, status, [tuple(x) for x in headers], body.encode())
+    if _subscribed:
+        _local[key] = entry
+    CACHE_REQUESTS.labels('redis').inc()
+
+    return cast(Entry, entry)
+
+
+def _set(key: str, entry: Entry, tags: Set[bytes]) -> None:
+    expires, status, headers, body = entry
+    ttl = max(1, int(expires - time.time()))
+
+    if _subscribed:
+        _local[key] = entry
+
+    try:
+        with CACHE_REDIS.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps([expires, status, headers,
+                                      body.decode()]), ex=ttl)
+
+            for tag in tags:
+                pipe.sadd(_tag(tag), key)
+                # Outlives anything it may point to.
+                pipe.expire(_tag(tag), CACHE_TTL)
+
+            pipe.execute()
+    except redis.RedisError as e:
+        print(f'cache: {e}')
+
+
+def hint(ttl: Optional[int] = None, tags: Iterable[bytes] = ()) -> None:
+    """
+    Called from a view wrapped in `cached`, set the response's TTL (0 to
+    not cache it) and add to the tags it's invalidated by.
+    """
+
+    if 'cache_tags' not in g:
+        return
+
+    if ttl is not None:
+        g.cache_ttl = ttl
+
+    g.cache_tags.update(bytes(x) for x in tags if x is not None)
+
+
+def cached(ttl: int = CACHE_TTL) -> Callable[[F], F]:
+    """
+    Cache the responses of a view for `ttl` seconds, or whatever it `hint`s.
+    Only 200s and 404s are cached, streamed responses never are.
+    """
+
+    def decorator(f: F) -> F:
+        @functools.wraps(f)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = 'cache:' + singleflight.request_key()
+
+            if (entry := _get(key)) is not None:
+                _, status, headers, body = entry
+                return Response(body, status, headers)
+
+            def render() -> Response:
+                generation = _generation
+                g.cache_ttl, g.cache_tags = ttl, set()
+                res = make_response(f(*args, **kwargs))
+
+                if res.status_code in (200, 404) and not res.is_streamed \
+                        and g.cache_ttl > 0 and generation == _generation:
+                    headers = [(k, v) for k, v in res.headers.items()
+                               if k != 'Content-Length']
+                    _set(key, (time.time() + g.cache_ttl, res.status_code,
+                               headers, res.get_data()), g.cache_tags)
+
+                return res
+
+            # Concurrent misses share one render, and only it is stored.
+            return singleflight.share(key, render)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def invalidate(tags: Iterable[Optional[bytes]]) -> None:
+    """
+    Drop every entry tagged with any of `tags`, here and in every process
+    subscribed to invalidations.
+    """
+
+    names = [_tag(bytes(x)) for x in tags if x is not None]
+    if not names:
+        return
+
+    try:
+        with CACHE_REDIS.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.smembers(name)
+
+            keys = {x.decode() for xs in pipe.execute() for x in xs}
+
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(*names)
+            if keys:
+                pipe.publish(_CHANNEL, json.dumps(sorted(keys)))
+
+            pipe.execute()
+    except redis.RedisError as e:
+        print(f'cache: failed to invalidate {names}: {e}')
+        # Can't tell which keys, play it safe.
+        _local.clear()
+        _evict(())
+        return
+
+    _evict(keys)
+
+
+def _subscribe() -> None:
+    global _subscribed
+
+    while True:
+        try:
+            pubsub = CACHE_REDIS.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_CHANNEL)
+            # We may have missed invalidations while we weren't subscribed.
+            _local.clear()
+            _evict(())
+            _subscribed = True
+
+            for message in pubsub.listen():
+                _evict(json.loads(message['data']))
+        except redis.RedisError as e:
+            _subscribed = False
+            print(f'cache: invalidation subscriber died, retrying: {e}')
+            gevent.sleep(1)
+
+
+def start_subscriber() -> gevent.Greenlet:
+    return gevent.spawn(_subscribe)
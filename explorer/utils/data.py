@@ -23,9 +23,15 @@ from hexbytes import HexBytes
 from gevent.pool import Pool
 from web3 import Web3
 import psycopg_pool
+import psycopg
 import gevent
 import redis
 
+from explorer.utils.ratelimit import ratelimit_middleware_factory
+from explorer.utils.metrics import rpc_metrics_middleware_factory
+from explorer.utils.postgres import create_pool, green_waits, \
+    numerics_as_ints
+from explorer.utils import migrations
 from explorer.utils.contract import get_all_tokens_in_pool
 
 load_dotenv(find_dotenv('.env.sample'))
@@ -125,6 +131,17 @@ SYN_DATA = {
     },
 }
 
+# Requests per second allowed against a chain's RPC, `RPC_RPS_OVERRIDES` is
+# of the form `chain:rps,chain:rps` e.g. `ethereum:25,bsc:8`.
+RPC_RPS = float(os.getenv('RPC_RPS', 10))
+RPC_RPS_OVERRIDES: Dict[str, float] = {
+    k.strip(): float(v)
+    for k, v in (x.split(':')
+                 for x in os.getenv('RPC_RPS_OVERRIDES', '').split(',') if x)
+}
+RPC_BREAKER_THRESHOLD = int(os.getenv('RPC_BREAKER_THRESHOLD', 5))
+RPC_BREAKER_COOLDOWN = float(os.getenv('RPC_BREAKER_COOLDOWN', 30))
+
 # Init 'func' to append `contract` to SYN_DATA so we can call the ABI simpler later.
 for key, value in SYN_DATA.items():
     w3 = Web3(Web3.HTTPProvider(value['rpc']))
@@ -133,6 +150,20 @@ for key, value in SYN_DATA.items():
     if key != 'ethereum':
         w3.middleware_onion.inject(geth_poa_middleware, layer=0)
 
+    # Innermost, so every request which actually hits the RPC is accounted
+    # for - including the ones made by `local_filter_middleware`.
+    limiter = ratelimit_middleware_factory(
+        key,
+        RPC_RPS_OVERRIDES.get(key, RPC_RPS),
+        RPC_BREAKER_THRESHOLD,
+        RPC_BREAKER_COOLDOWN,
+    )
+    w3.middleware_onion.inject(limiter, name='ratelimit', layer=0)
+    # Inside the limiter so we time the RPC rather than our own throttling.
+    w3.middleware_onion.inject(rpc_metrics_middleware_factory(key),
+                               name='metrics',
+                               layer=0)
+
     w3.middleware_onion.add(local_filter_middleware)
     print(key)
     try:
@@ -165,6 +196,17 @@ else:
     REDIS_PORT = int(os.environ['REDIS_PORT'])
     PSQL_URL = os.environ['PSQL_URL']
 
+# Read-only replicas for the API, see `explorer/utils/replicas.py`.
+PSQL_REPLICA_URLS = [
+    x.strip() for x in os.getenv('PSQL_REPLICA_URLS', '').split(',')
+    if x.strip()
+]
+
+# Apply pending migrations at boot, rather than refuse to boot until they're
+# applied with `cli/migrate.py`. Off by default, the API would be down for as
+# long as they take.
+MIGRATE_ON_BOOT = os.getenv('MIGRATE_ON_BOOT', 'false') == 'true'
+
 TESTING = "pytest" in sys.modules or os.getenv('TESTING')
 if TESTING:
     print('Running with TESTING mode enabled.')
@@ -172,13 +214,38 @@ if TESTING:
     # Hack to make the linter happy - though calling a literal should fail
     # runtime which should be expected.
     PSQL = cast(psycopg_pool.ConnectionPool, 'foo')
+    PSQL_API = PSQL
+    PSQL_REPLICAS: Dict[str, psycopg_pool.ConnectionPool] = {}
 else:
-    PSQL = psycopg_pool.ConnectionPool(PSQL_URL)
-
-    _sql_path = os.path.join(os.getcwd(), 'sql')
-    with open(os.path.join(_sql_path, 'transactions.sql')) as f:
-        with PSQL.connection() as conn:
-            conn.execute(f.read())
+    green_waits()
+    numerics_as_ints()
+
+    # Ingestion and the API get their own pools so a backfill hogging
+    # connections doesn't queue up API requests behind it.
+    PSQL = create_pool('ingestion', PSQL_URL, 'PSQL_POOL')
+    PSQL_API = create_pool('api', PSQL_URL, 'PSQL_API_POOL')
+    PSQL_REPLICAS = {
+        f'replica{i}': create_pool(f'replica{i}', url, 'PSQL_REPLICA_POOL')
+        for i, url in enumerate(PSQL_REPLICA_URLS)
+    }
+
+    with psycopg.connect(PSQL_URL, autocommit=True) as conn:
+        # `CREATE TABLE IF NOT EXISTS` would leave it be, and nothing that
+        # goes through `txs_keys` would find a thing.
+        if conn.execute("SELECT relkind FROM pg_class "
+                        "WHERE oid = to_regclass('txs')").fetchone() \
+                == ('r', ):
+            raise RuntimeError('txs is not partitioned yet, migrate it with '
+                               'cli/partition_txs.py first')
+
+        if MIGRATE_ON_BOOT:
+            migrations.migrate(conn)
+        elif (pending := migrations.status(conn)[0]):
+            raise RuntimeError(f'{len(pending)} migrations are pending, '
+                               'apply them with cli/migrate.py apply')
+
+        # A month is only created ahead of time if we're still around.
+        conn.execute("SELECT txs_ensure_partitions('txs', 3)")
 
 # We use this for processes to interact w/ eachother.
 MESSAGE_QUEUE_REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
@@ -186,6 +253,12 @@ MESSAGE_QUEUE_REDIS = redis.Redis.from_url(MESSAGE_QUEUE_REDIS_URL,
                                            decode_responses=True)
 # We use this for storing eth_GetLogs and stuff related to that.
 LOGS_REDIS_URL = redis.Redis(REDIS_HOST, REDIS_PORT, decode_responses=True)
+# Response cache, see `explorer/utils/cache.py`.
+CACHE_REDIS = redis.Redis.from_url(f'redis://{REDIS_HOST}:{REDIS_PORT}/2')
+# Latest transactions, see `explorer/utils/recent.py`.
+RECENT_REDIS = redis.Redis.from_url(f'redis://{REDIS_HOST}:{REDIS_PORT}/3')
+# Unique users sketches, see `explorer/utils/analytics/users.py`.
+USERS_REDIS = redis.Redis.from_url(f'redis://{REDIS_HOST}:{REDIS_PORT}/4')
 
 CHAINS = {
     43114: 'avalanche',
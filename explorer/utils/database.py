@@ -7,19 +7,45 @@
           https://www.boost.org/LICENSE_1_0.txt)
 """
 
-from typing import (Any, List, Literal, Tuple, Generator, overload, Optional,
-                    get_args)
+from typing import (Any, Dict, Iterable, List, Literal, Tuple, Generator,
+                    Type, TypeVar, Union, overload, Optional, get_args)
+from collections import defaultdict
 from dataclasses import dataclass, fields
 from contextlib import contextmanager
 from decimal import Decimal
 from attr import field
+import os
 
-from psycopg.rows import class_row
+from psycopg.rows import RowFactory, RowMaker, no_result
+from psycopg.cursor import BaseCursor
+from psycopg_pool import ConnectionPool
 from hexbytes import HexBytes
-from psycopg import Cursor
+from psycopg import Cursor, sql
 
-from explorer.utils.data import PSQL, TOKEN_DECIMALS, CHAINS, TOKEN_SYMBOLS
+from explorer.utils.data import PSQL_API, TOKEN_DECIMALS, CHAINS, TOKEN_SYMBOLS
 from explorer.utils.helpers import handle_decimals
+from explorer.utils.metrics import DB_LATENCY
+from explorer.utils import statements, replicas
+
+T = TypeVar('T')
+_FORMATTED = ('received_value_formatted', 'received_token_symbol',
+              'sent_value_formatted', 'sent_token_symbol')
+
+# Highest cost, in the planner's units, a filtered query may be estimated at
+# before `Transaction.filter` refuses to run it.
+FILTER_MAX_COST = float(os.getenv('FILTER_MAX_COST', 10000))
+
+# Filter -> the `txs` column and operator it's applied with. See the indexes
+# in `sql/migrations` for which of them (and their combinations) are cheap.
+TX_FILTERS: Dict[str, Tuple[str, str]] = {
+    'from_chain_id': ('from_chain_id', '='),
+    'to_chain_id': ('to_chain_id', '='),
+    'token': ('sent_token', '='),
+    'from_time': ('sent_time', '>='),
+    'to_time': ('sent_time', '<'),
+    'pending': ('pending', '='),
+    'swap_success': ('swap_success', '='),
+}
 
 
 class NotFoundInDatabase(Exception):
@@ -28,13 +54,31 @@ class NotFoundInDatabase(Exception):
         super().__init__(self.message)
 
 
+class QueryTooExpensive(Exception):
+    def __init__(self, cost: float) -> None:
+        self.message = f'estimated cost of {cost:.0f} is over the maximum ' \
+            f'of {FILTER_MAX_COST:.0f}'
+        super().__init__(self.message)
+
+
+# The row and which of its columns a hash matched.
+Match = Tuple[Union['Transaction', 'LostTransaction'],
+              Literal['from', 'to', 'kappa']]
+
+
 @contextmanager
-def _psql_connection() -> Generator[Cursor['Transaction'], None, None]:
-    with PSQL.connection() as conn:
-        with conn.cursor(row_factory=class_row(Transaction)) as c:
+def _psql_connection(
+        fresh: bool = False) -> Generator[Cursor['Transaction'], None, None]:
+    with replicas.pool(fresh).connection() as conn:
+        with conn.cursor(row_factory=fast_row(Transaction)) as c:
             yield c
 
 
+def _stale(tx: Union['Transaction', 'LostTransaction']) -> bool:
+    # A replica may be behind on its completion.
+    return isinstance(tx, Transaction) and tx.pending
+
+
 class Base:
     def __post_init__(self) -> None:
         # Handle token decimals.
@@ -88,9 +132,10 @@ class Base:
             # Pscyopg returns psql's bytea as bytes.
             if type(val) == bytes:
                 self.__dict__[field.name] = HexBytes(val)
-            # We store ints as varchars in psql due to BIGINT's limitations.
-            elif type(val) == str and (field.type == int
-                                       or get_args(field.type)[0] == int):
+            # Values are `numeric`, loaded as `Decimal` by a connection
+            # without `numerics_as_ints`.
+            elif type(val) in (str, Decimal) and (
+                    field.type == int or get_args(field.type)[0] == int):
                 self.__dict__[field.name] = int(val)
             elif not isinstance(val, get_args(field.type) or field.type):
                 raise TypeError(f'expected {field.name!r} to be of type '
@@ -135,59 +180,87 @@ class Transaction(Base):
 
     @staticmethod
     def search(column: str, value: Any) -> List["Transaction"]:
-        with _psql_connection() as c:
-            c.execute("SELECT * FROM txs WHERE %s = %s", (column, value))
+        # A column name can't be a parameter, it has to be quoted in.
+        query = sql.SQL('SELECT * FROM txs WHERE {} = %s').format(
+            sql.Identifier(column))
+
+        with _psql_connection() as c, DB_LATENCY.labels('txs.search').time():
+            c.execute(query, (value, ))
             return c.fetchall()
 
     @overload
     @staticmethod
-    def search_with_tx_hash(
-            tx_hash: HexBytes) -> Tuple['Transaction', Literal['to', 'from']]:
+    def search_with_tx_hash(tx_hash: HexBytes) -> Match:
         ...
 
     @overload
     @staticmethod
-    def search_with_tx_hash(
-            tx_hash: HexBytes, silent: bool
-    ) -> Optional[Tuple['Transaction', Literal['to', 'from']]]:
+    def search_with_tx_hash(tx_hash: HexBytes,
+                            silent: bool) -> Optional[Match]:
         ...
 
     @staticmethod
-    def search_with_tx_hash(
-        tx_hash: HexBytes,
-        silent: bool = False
-    ) -> Optional[Tuple['Transaction', Literal['to', 'from']]]:
+    def search_with_tx_hash(tx_hash: HexBytes,
+                            silent: bool = False) -> Optional[Match]:
         """
         Find the data stored in the database relating to `tx_hash`, looking
-        through both columns: `from_tx_hash` and `to_tx_hash`.
+        through `from_tx_hash`, `to_tx_hash` and `kappa` of `txs` and then
+        `lost_txs`, along with which of those matched.
         """
 
-        sql = """
-           SELECT * FROM txs
-           WHERE
-                from_tx_hash = %(tx_hash)s
-                OR to_tx_hash = %(tx_hash)s;
-            """
+        pool = replicas.pool()
+        ret = _search_with_tx_hash(pool, tx_hash)
 
-        with _psql_connection() as c:
-            c.execute(sql, {'tx_hash': tx_hash})
-            ret = c.fetchone()
+        # Missing or pending on a replica, which may just be behind.
+        if pool is not PSQL_API and (ret is None or _stale(ret[0])):
+            ret = _search_with_tx_hash(PSQL_API, tx_hash)
 
-            if ret is None:
-                if not silent:
-                    raise NotFoundInDatabase(tx_hash)
+        if ret is None and not silent:
+            raise NotFoundInDatabase(tx_hash)
 
-                return None
+        return ret
 
-            if ret.to_tx_hash == tx_hash:
-                direction = 'to'
-            elif ret.from_tx_hash == tx_hash:
-                direction = 'from'
-            else:
-                raise RuntimeError(
-                    f'sanity check: {tx_hash} does not match any at {ret!r}')
+    @staticmethod
+    def search_with_tx_hashes(
+        tx_hashes: Iterable[bytes]
+    ) -> Dict[bytes, Union['Transaction', 'LostTransaction']]:
+        """
+        `search_with_tx_hash` for many hashes at once, the rows found keyed
+        by the hash (or kappa) that matched them.
+        """
+
+        hashes = [bytes(x) for x in tx_hashes]
+        pool = replicas.pool()
+        ret = _search_with_tx_hashes(pool, hashes)
+
+        if pool is not PSQL_API:
+            # As in `search_with_tx_hash`, for those only.
+            stale = [x for x in hashes if x not in ret or _stale(ret[x])]
+            if stale:
+                ret.update(_search_with_tx_hashes(PSQL_API, stale))
+
+        return ret
+
+    @staticmethod
+    def search_with_addresses(
+            addresses: Iterable[bytes],
+            limit: int) -> Dict[bytes, List['Transaction']]:
+        """
+        `page_with_address` for many addresses at once, keyed by address.
+        Addresses without any transactions are left out.
+        """
+
+        ret: Dict[bytes, List[Transaction]] = defaultdict(list)
+        params = {'addresses': [bytes(x) for x in addresses], 'limit': limit}
+
+        with replicas.pool().connection() as conn:
+            with conn.cursor(row_factory=_matched_row(Transaction)) as c:
+                statements.execute(c, 'txs.search_with_addresses', params)
+
+                for tx, key in c:
+                    ret[key].append(tx)
 
-        return ret, direction
+        return dict(ret)
 
     @overload
     @staticmethod
@@ -207,17 +280,15 @@ class Transaction(Base):
         """
         Find the data stored in the database relating to `tx_hash`, looking
         through both columns: `from_address` and `to_address`.
-        """
 
-        sql = """
-           SELECT * FROM txs
-           WHERE
-                from_address = %(address)s
-                OR to_address = %(address)s;
-            """
+        Read from the primary, as are the other per address reads: the views
+        built from them are cached until ingestion invalidates the address,
+        and a lagging replica could cache them again without the new rows.
+        """
 
-        with _psql_connection() as c:
-            c.execute(sql, {'address': address})
+        with _psql_connection(fresh=True) as c:
+            statements.execute(c, 'txs.search_with_address',
+                               {'address': address})
             ret = c.fetchall()
 
             if not ret:
@@ -229,9 +300,95 @@ class Transaction(Base):
         return ret
 
     @staticmethod
-    def fetch_recent_txs(include_pending: bool,
-                         only_pending: bool,
-                         limit: int = 20) -> List["Transaction"]:
+    def stream_with_address(
+        address: HexBytes,
+        batch_size: int = 500
+    ) -> Generator[List['Transaction'], None, None]:
+        """
+        Like `search_with_address` but through a server-side cursor, yielding
+        `batch_size` rows at a time so memory stays constant regardless of
+        how many transactions `address` has.
+
+        NOTE: the connection is held until the generator is exhausted or
+            closed.
+        """
+
+        with replicas.pool(fresh=True).connection() as conn:
+            with conn.cursor(name='stream_with_address',
+                             row_factory=fast_row(Transaction)) as c:
+                with DB_LATENCY.labels('txs.stream_with_address').time():
+                    c.execute(statements.STATEMENTS['txs.search_with_address'],
+                              {'address': address})
+
+                while (rows := c.fetchmany(batch_size)):
+                    yield rows
+
+    @staticmethod
+    def page_with_address(
+            address: HexBytes,
+            limit: int,
+            after: Optional[Tuple[int, bytes]] = None) -> List['Transaction']:
+        """
+        Like `search_with_address` but at most `limit` transactions, newest
+        (by `sent_time`) first, starting after the `(sent_time, from_tx_hash)`
+        key `after` if set.
+        """
+
+        params: Dict[str, Any] = {'address': address, 'limit': limit}
+
+        if after is None:
+            name = 'txs.address_page'
+        else:
+            name = 'txs.address_page_after'
+            params['time'], params['tx_hash'] = after
+
+        with _psql_connection(fresh=True) as c:
+            statements.execute(c, name, params)
+            return c.fetchall()
+
+    @staticmethod
+    def filter(
+            filters: Dict[str, Any],
+            limit: int = 20,
+            after: Optional[Tuple[int, bytes]] = None) -> List['Transaction']:
+        """
+        At most `limit` transactions matching every one of `filters` (see
+        `TX_FILTERS`), newest (by `sent_time`) first, starting after the
+        `(sent_time, from_tx_hash)` key `after` if set.
+
+        The query is planned before it's run, and refused if it's estimated
+        to cost more than `FILTER_MAX_COST`, which it will if no index helps
+        with this combination of filters.
+        NOTE: the planner assumes filters are independent, a combination of
+            correlated ones can cost more than it's estimated to.
+
+        Raises:
+            ValueError: a filter isn't in `TX_FILTERS`.
+            QueryTooExpensive: the query is estimated to cost too much.
+        """
+
+        query, params = _filter_query(filters, limit, after)
+
+        # Not prepared, so the plan is for these values in particular: the
+        # partial indexes only apply to some of them.
+        with _psql_connection(filters.get('pending') is True) as c, \
+                DB_LATENCY.labels('txs.filter').time():
+            plan = c.connection.execute(
+                sql.SQL('EXPLAIN (FORMAT JSON) ') + query, params,
+                prepare=False).fetchone()
+
+            if (cost := plan[0][0]['Plan']['Total Cost']) > FILTER_MAX_COST:
+                raise QueryTooExpensive(cost)
+
+            c.execute(query, params, prepare=False)
+            return c.fetchall()
+
+    @staticmethod
+    def fetch_recent_txs(
+            include_pending: bool,
+            only_pending: bool,
+            limit: int = 20,
+            after: Optional[Tuple[int, bytes]] = None) -> List["Transaction"]:
         """
         Fetch the most recent transactions in the database.
         NOTE: `only_pending` is used if both options are set.
@@ -241,20 +398,223 @@ class Transaction(Base):
         Args:
             include_pending (bool): Include pending transactions.
             only_pending (bool): Include only pending transactions.
+            limit (int): Maximum number of transactions.
+            after (Optional[Tuple[int, bytes]]): Only transactions after
+                this `(time, from_tx_hash)` key, in the order above.
         """
 
-        sql = "SELECT * FROM txs "
-
         if only_pending:
-            sql += "WHERE pending=true "
-        elif not include_pending:
-            sql += "WHERE pending=false "
+            name = 'txs.recent_pending'
+        elif include_pending:
+            name = 'txs.recent_including_pending'
+        else:
+            name = 'txs.recent'
+
+        params: Dict[str, Any] = {'limit': limit}
+
+        if after is not None:
+            name += '_after'
+            params['time'], params['tx_hash'] = after
+
+        # Pending ones are completed from one moment to the next, a replica
+        # behind would show them pending for longer.
+        with _psql_connection(only_pending or include_pending) as c:
+            statements.execute(c, name, params)
+            return c.fetchall()
 
-        sql += "ORDER BY "
-        sql += "sent_time " if (include_pending
-                                or only_pending) else "received_time "
-        sql += "DESC LIMIT %s;"
 
-        with _psql_connection() as c:
-            c.execute(sql, (limit, ))
-            return c.fetchall()
+def _search_with_tx_hash(pool: ConnectionPool,
+                         tx_hash: HexBytes) -> Optional[Match]:
+    with pool.connection() as conn:
+        for cls, name in ((Transaction, 'txs.search_with_tx_hash'),
+                          (LostTransaction, 'lost_txs.search_with_tx_hash')):
+            with conn.cursor(row_factory=_matched_row(cls)) as c:
+                statements.execute(c, name, {'tx_hash': tx_hash})
+
+                if (ret := c.fetchone()) is not None:
+                    return ret
+
+    return None
+
+
+def _search_with_tx_hashes(
+    pool: ConnectionPool, tx_hashes: List[bytes]
+) -> Dict[bytes, Union['Transaction', 'LostTransaction']]:
+    ret: Dict[bytes, Union[Transaction, LostTransaction]] = {}
+    params = {'tx_hashes': tx_hashes}
+
+    with pool.connection() as conn:
+        for cls, name in ((Transaction, 'txs.search_with_tx_hashes'),
+                          (LostTransaction, 'lost_txs.search_with_tx_hashes')):
+            if not params['tx_hashes']:
+                break
+
+            with conn.cursor(row_factory=_matched_row(cls)) as c:
+                statements.execute(c, name, params)
+
+                for tx, key in c:
+                    ret.setdefault(key, tx)
+
+            # Only look for what's left in `lost_txs`.
+            params = {'tx_hashes': [x for x in params['tx_hashes']
+                                    if x not in ret]}
+
+    return ret
+
+
+def _filter_query(
+    filters: Dict[str, Any], limit: int, after: Optional[Tuple[int, bytes]]
+) -> Tuple[sql.Composable, Dict[str, Any]]:
+    """ The query and params of `Transaction.filter`. """
+
+    conditions: List[sql.Composable] = []
+
+    for name in sorted(filters):
+        if name not in TX_FILTERS:
+            raise ValueError(f'unknown filter {name!r}')
+
+        column, op = TX_FILTERS[name]
+        conditions.append(sql.SQL('{} {} {}').format(
+            sql.Identifier(column), sql.SQL(op), sql.Placeholder(name)))
+
+    params = {**filters, 'limit': limit}
+
+    if after is not None:
+        # The first is implied by the second, but only it prunes partitions.
+        conditions.append(sql.SQL('sent_time <= {} AND '
+                                  '(sent_time, from_tx_hash) < ({}, {})')
+                          .format(sql.Placeholder('time'),
+                                  sql.Placeholder('time'),
+                                  sql.Placeholder('tx_hash')))
+        params['time'], params['tx_hash'] = after
+
+    query: sql.Composable = sql.SQL('SELECT * FROM txs')
+    if conditions:
+        query += sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions)
+    query += sql.SQL(' ORDER BY sent_time DESC, from_tx_hash DESC '
+                     'LIMIT {}').format(sql.Placeholder('limit'))
+
+    return query, params
+
+
+# chain id, raw token bytes -> symbol, 10**decimals
+_token_meta: Dict[Tuple[int, bytes], Tuple[str, Decimal]] = {}
+
+
+def token_meta(chain_id: int, token: bytes) -> Tuple[str, Decimal]:
+    try:
+        return _token_meta[(chain_id, token)]
+    except KeyError:
+        chain = CHAINS[chain_id]
+        key = HexBytes(token).hex()
+        meta = (TOKEN_SYMBOLS[chain][key],
+                Decimal(10**TOKEN_DECIMALS[chain][key]))
+
+        _token_meta[(chain_id, bytes(token))] = meta
+        return meta
+
+
+_decoders: Dict[Tuple[type, Tuple[str, ...]], RowMaker[Any]] = {}
+
+
+def _compile_decoder(cls: Type[T], columns: Tuple[str, ...]) -> RowMaker[T]:
+    """
+    Generate a function which turns a row with `columns` into a `cls`, doing
+    the same conversions as `Base.__post_init__` without any of the per row
+    introspection.
+    """
+
+    index = {name: i for i, name in enumerate(columns)}
+    lines = ['def decode(row):', '    d = {}']
+
+    for f in fields(cls):  # type: ignore
+        if f.name in _FORMATTED:
+            continue
+
+        i = index[f.name]
+        _type = (get_args(f.type) or (f.type, ))[0]
+
+        # Pscyopg returns psql's bytea as bytes, which `HexBytes` can wrap
+        # without going through its (slow) input conversion.
+        if _type == HexBytes:
+            expr = f'None if (v := row[{i}]) is None else ' \
+                'new_bytes(HexBytes, v)'
+        # Values are `numeric`, which `numerics_as_ints` has psycopg load as
+        # `int` already. A connection without it loads `Decimal`s.
+        elif _type == int:
+            expr = f'int(v) if (v := row[{i}]).__class__ is Decimal else v'
+        else:
+            expr = f'row[{i}]'
+
+        lines.append(f'    d[{f.name!r}] = {expr}')
+
+    for prefix, chain_id in (('received', 'to_chain_id'),
+                             ('sent', 'from_chain_id')):
+        if f'{prefix}_token' not in index:
+            continue
+
+        lines += [
+            f'    if (t := row[{index[prefix + "_token"]}]) is None:',
+            f'        d[{prefix + "_value_formatted"!r}] = None',
+            f'        d[{prefix + "_token_symbol"!r}] = None',
+            '    else:',
+            f'        symbol, divisor = token_meta(d[{chain_id!r}], t)',
+            f'        d[{prefix + "_value_formatted"!r}] = '
+            f'Decimal(row[{index[prefix + "_value"]}]) / divisor',
+            f'        d[{prefix + "_token_symbol"!r}] = symbol',
+        ]
+
+    # Assigning `__dict__` directly keeps the key order of `fields()` which
+    # is what `CustomJSONEncoder` serializes in.
+    lines += ['    o = new(cls)', '    o.__dict__ = d', '    return o']
+
+    namespace: Dict[str, Any] = {
+        'HexBytes': HexBytes,
+        'Decimal': Decimal,
+        'token_meta': token_meta,
+        'new': object.__new__,
+        'new_bytes': bytes.__new__,
+        'cls': cls,
+    }
+    exec('\n'.join(lines), namespace)
+
+    return namespace['decode']
+
+
+def _matched_row(cls: Type[T]) -> RowFactory[Tuple[T, Any]]:
+    """
+    `fast_row` for statements with a trailing column saying what the row
+    matched, `match` or `key`.
+    """
+
+    factory = fast_row(cls)
+
+    def row_factory(cursor: BaseCursor[Any, Any]) -> RowMaker[Tuple[T, Any]]:
+        if (decode := factory(cursor)) is no_result:
+            return no_result
+
+        return lambda row: (decode(row), row[-1])
+
+    return row_factory
+
+
+def fast_row(cls: Type[T]) -> RowFactory[T]:
+    """
+    Row factory building `Transaction` / `LostTransaction` through a decoder
+    compiled once per class and set of columns, rather than `class_row` and
+    `__post_init__` on every row.
+    """
+
+    def row_factory(cursor: BaseCursor[Any, Any]) -> RowMaker[T]:
+        if cursor.description is None:
+            return no_result
+
+        columns = tuple(c.name for c in cursor.description)
+
+        if (decoder := _decoders.get((cls, columns))) is None:
+            decoder = _decoders[(cls, columns)] = \
+                _compile_decoder(cls, columns)
+
+        return decoder
+
+    return row_factory
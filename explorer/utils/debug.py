@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import Counter
+from types import FrameType
+import logging
+import sys
+import gc
+import os
+
+from gevent import monkey
+from gevent.events import EventLoopBlocked
+import gevent.events
+import greenlet
+import gevent
+
+from explorer.utils import metrics
+
+DEBUG_MODE = os.getenv('DEBUG_MODE') == 'true'
+# Seconds the hub may go without switching before the stack is logged.
+DEBUG_MAX_BLOCKING_TIME = float(os.getenv('DEBUG_MAX_BLOCKING_TIME', 0.1))
+PROFILE_MAX_SECONDS = 60
+
+# The sampler must keep running while the hub is blocked, so it uses a real
+# thread and real sleeps rather than the monkey patched ones.
+_sleep = monkey.get_original('time', 'sleep')
+_get_ident = monkey.get_original('_thread', 'get_ident')
+# Imported from the hub's (main) thread.
+_hub_ident = _get_ident()
+_hub: Optional[gevent.hub.Hub] = None
+
+
+def _on_event(event: Any) -> None:
+    # Threadpool threads (e.g. the sampler below) have hubs of their own.
+    if isinstance(event, EventLoopBlocked) and event.hub is _hub:
+        metrics.HUB_BLOCKED.inc()
+        # Keep the blocked stack, the rest is every thread and greenlet which
+        # gevent already writes to stderr.
+        report = '\n'.join(event.info).split('\nInfo:')[0]
+        logging.warning(
+            f'event loop blocked for more than {event.blocking_time}s by '
+            f'{event.greenlet}\n{report}')
+
+
+def start_blocking_monitor() -> None:
+    """
+    Start gevent's monitor thread for this hub and log (with the stack) every
+    time the loop is blocked for more than `DEBUG_MAX_BLOCKING_TIME`.
+    """
+
+    global _hub
+
+    gevent.config.monitor_thread = True
+    gevent.config.max_blocking_time = DEBUG_MAX_BLOCKING_TIME
+    gevent.events.subscribers.append(_on_event)
+
+    _hub = gevent.get_hub()
+    _hub.start_periodic_monitoring_thread()
+    # Otherwise every hub created from here on gets a monitor as well.
+    gevent.config.monitor_thread = False
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+
+    # Trim to the package for readability, e.g. `explorer/utils/rpc.py`.
+    if (i := filename.rfind('site-packages' + os.sep)) != -1:
+        filename = filename[i + len('site-packages' + os.sep):]
+    elif (i := filename.rfind('explorer' + os.sep)) != -1:
+        filename = filename[i:]
+
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    stack: List[str] = []
+
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+
+    return ';'.join(reversed(stack))
+
+
+def _greenlets() -> List[greenlet.greenlet]:
+    return [
+        x for x in gc.get_objects()
+        if isinstance(x, greenlet.greenlet) and not x.dead
+    ]
+
+
+def sample(seconds: float, interval: float = 0.01,
+           mode: str = 'cpu') -> Dict[str, int]:
+    """
+    Sample stacks for `seconds`, every `interval` seconds, must be run in a
+    native thread (e.g. the hub's threadpool).
+
+    `cpu` samples whatever the hub thread is executing at that moment, which
+    is what's eating the loop. `wall` also samples the stacks of every
+    suspended greenlet, showing where they spend their time waiting.
+    """
+
+    assert mode in ('cpu', 'wall'), mode
+    stacks: Dict[str, int] = Counter()
+    greenlets: List[greenlet.greenlet] = []
+    refresh = 0.0
+    elapsed = 0.0
+
+    while elapsed < seconds:
+        # Whatever the hub thread is executing right now.
+        if (frame := sys._current_frames().get(_hub_ident)) is not None:
+            stacks[_collapse(frame)] += 1
+
+        if mode == 'wall':
+            if elapsed >= refresh:
+                # Walking the heap is expensive, only do so once a second.
+                greenlets = _greenlets()
+                refresh = elapsed + 1
+
+            for g in greenlets:
+                # Only suspended greenlets have a `gr_frame`, the running
+                # one was sampled above.
+                if g.gr_frame is not None:
+                    stacks[_collapse(g.gr_frame)] += 1
+
+        _sleep(interval)
+        elapsed += interval
+
+    return stacks
+
+
+def profile(seconds: float, interval: float = 0.01, mode: str = 'cpu') -> str:
+    """
+    Run :func:`sample` without blocking the hub and return the stacks in the
+    collapsed format `flamegraph.pl` and speedscope understand.
+    """
+
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    stacks = gevent.get_hub().threadpool.spawn(sample, seconds, interval,
+                                               mode).get()
+
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(
+        stacks.items(), key=lambda x: x[1], reverse=True))
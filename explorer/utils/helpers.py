@@ -12,6 +12,7 @@ from typing import List, Dict, Optional, Tuple, TypeVar, Union, cast, Literal, A
 from contextlib import suppress
 import traceback
 import decimal
+import time
 import logging
 
 from web3.types import TxReceipt, LogReceipt
@@ -21,6 +22,8 @@ from gevent import Greenlet
 import gevent
 
 from .contract import get_bridge_token_info, bridge_token_to_id
+from .ratelimit import CircuitOpenError
+from . import metrics
 from .data import SYN_DATA, POOLS, TOKENS_INFO, CHAINS_REVERSED
 
 logger = logging.Logger(__name__)
@@ -173,16 +176,31 @@ def dispatch_get_logs(
 
 def retry(func: Callable[..., T], *args, **kwargs) -> Optional[T]:
     attempts: int = kwargs.pop('attempts', 5)
+    name = getattr(func, '__name__', type(func).__name__)
+    # No longer than backing off after every attempt would take.
+    deadline = time.monotonic() + sum(3**i for i in range(attempts))
+    i = 0
 
-    for i in range(attempts):
+    while i < attempts:
         try:
             return func(*args, **kwargs)
+        except CircuitOpenError as e:
+            # The endpoint is known to be down, don't burn an attempt on it
+            # and wait for the breaker to let a probe through instead, as
+            # long as there's time left.
+            if (left := deadline - time.monotonic()) <= 0:
+                break
+
+            gevent.sleep(min(e.retry_after, left))
         except Exception:
             print(f'retry attempt {i}, args: {args}')
             traceback.print_exc()
+            metrics.RETRIES.labels(name).inc()
             gevent.sleep(3**i)
+            i += 1
 
-    logging.critical(f'maximum retries ({attempts}) reached')
+    metrics.DROPPED.labels(name).inc()
+    logging.critical(f'maximum retries ({attempts}) reached, args: {args}')
 
 
 def token_address_to_pool(chain: str, address: str) -> Literal['neth', 'nusd']:
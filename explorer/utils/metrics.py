@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Callable, Dict, Iterator, Set, Tuple
+import time
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, \
+    Metric
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from web3.types import RPCEndpoint, RPCResponse
+from psycopg_pool import ConnectionPool
+from web3 import Web3
+import gevent
+
+# Ingestion.
+CHAIN_HEAD = Gauge('explorer_chain_head_block', 'Latest block on the chain',
+                   ['chain'])
+CHAIN_HEAD_TIME = Gauge('explorer_chain_head_timestamp_seconds',
+                        'Timestamp of the latest block on the chain',
+                        ['chain'])
+CHECKPOINT = Gauge('explorer_checkpoint_block',
+                   'Block ingestion has processed up to', ['chain'])
+CHECKPOINT_TIME = Gauge('explorer_checkpoint_timestamp_seconds',
+                        'Timestamp of the last processed event\'s block',
+                        ['chain'])
+LAG_BLOCKS = Gauge('explorer_lag_blocks',
+                   'Blocks between the chain head and the checkpoint',
+                   ['chain'])
+LAG_SECONDS = Gauge('explorer_lag_seconds',
+                    'Seconds between the chain head and the checkpoint',
+                    ['chain'])
+EVENTS = Counter('explorer_events_ingested_total',
+                 'Bridge events processed by `bridge_callback`',
+                 ['chain', 'event', 'direction'])
+RETRIES = Counter('explorer_retries_total', 'Failed attempts in `retry`',
+                  ['func'])
+DROPPED = Counter('explorer_dropped_total',
+                  'Calls `retry` gave up on after the maximum attempts',
+                  ['func'])
+
+# RPC.
+RPC_LATENCY = Histogram('explorer_rpc_request_duration_seconds',
+                        'JSON-RPC request latency', ['method', 'endpoint'])
+RPC_ERRORS = Counter('explorer_rpc_errors_total',
+                     'JSON-RPC requests which raised or returned an error',
+                     ['method', 'endpoint'])
+
+# Database.
+DB_LATENCY = Histogram('explorer_db_statement_duration_seconds',
+                       'SQL statement latency', ['statement'])
+REPLICA_LAG = Gauge('explorer_db_replica_lag_seconds',
+                    'Seconds a replica is behind the primary, +Inf if it '
+                    'failed its check or is over a minute behind', ['pool'])
+
+# gevent.
+HUB_BLOCKED = Counter('explorer_hub_blocked_total',
+                      'Times the event loop was blocked for longer than '
+                      '`DEBUG_MAX_BLOCKING_TIME`')
+
+# HTTP.
+HTTP_LATENCY = Histogram('explorer_http_request_duration_seconds',
+                         'API request latency',
+                         ['endpoint', 'method', 'status'])
+CACHE_REQUESTS = Counter('explorer_cache_requests_total',
+                         'Response cache lookups by where they were served '
+                         'from: `local`, `redis` or `miss`', ['layer'])
+BLOOM_LOOKUPS = Counter('explorer_bloom_lookups_total',
+                        'Bloom filter lookups by result: `miss` (a 404 '
+                        'without a query), `maybe` or `not_ready`',
+                        ['result'])
+RECENT_PAGES = Counter('explorer_recent_pages_total',
+                       'Recent transaction pages by where they were served '
+                       'from: `redis` or `postgres`', ['source'])
+COALESCED_REQUESTS = Counter('explorer_coalesced_requests_total',
+                             'Requests which waited on an identical one in '
+                             'flight rather than running their own')
+
+
+# chain -> (block, timestamp)
+_heads: Dict[str, Tuple[int, int]] = {}
+_checkpoints: Dict[str, Tuple[int, int]] = {}
+# Chains `get_logs` is still catching up on, their checkpoint is whatever
+# the backfill got to rather than the head `poll.py` is following.
+backfilling: Set[str] = set()
+
+
+def set_head(chain: str, block: int, timestamp: int) -> None:
+    _heads[chain] = (block, timestamp)
+    CHAIN_HEAD.labels(chain).set(block)
+    CHAIN_HEAD_TIME.labels(chain).set(timestamp)
+    _update_lag(chain)
+
+
+def set_checkpoint(chain: str, block: int, timestamp: int = None) -> None:
+    if timestamp is None:
+        # Scanned a range without events, the block moved but we don't know
+        # its timestamp without asking the RPC.
+        timestamp = _checkpoints.get(chain, (0, 0))[1]
+    else:
+        CHECKPOINT_TIME.labels(chain).set(timestamp)
+
+    _checkpoints[chain] = (block, timestamp)
+    CHECKPOINT.labels(chain).set(block)
+    _update_lag(chain)
+
+
+def set_checkpoint_to_head(chain: str) -> None:
+    """
+    Live ingestion (`poll.py`) is caught up by definition, whenever it
+    successfully polled the checkpoint is the head.
+    """
+
+    if chain in _heads and chain not in backfilling:
+        set_checkpoint(chain, *_heads[chain])
+
+
+def _update_lag(chain: str) -> None:
+    if chain not in _heads or chain not in _checkpoints:
+        return
+
+    head, head_time = _heads[chain]
+    checkpoint, checkpoint_time = _checkpoints[chain]
+
+    LAG_BLOCKS.labels(chain).set(max(head - checkpoint, 0))
+
+    if checkpoint_time:
+        LAG_SECONDS.labels(chain).set(max(head_time - checkpoint_time, 0))
+
+
+def watch_heads(interval: float = 30) -> None:
+    from explorer.utils.data import SYN_DATA
+
+    def _watch(chain: str, w3: Web3) -> None:
+        while True:
+            try:
+                block = w3.eth.get_block('latest')
+                set_head(chain, block['number'], block['timestamp'])
+            except Exception as e:
+                print(f'err watch_heads {chain}: {e}')
+            finally:
+                gevent.sleep(interval)
+
+    gevent.joinall([
+        gevent.spawn(_watch, chain, x['w3']) for chain, x in SYN_DATA.items()
+    ])
+
+
+def rpc_metrics_middleware_factory(endpoint: str) -> Callable:
+    def rpc_metrics_middleware(make_request: Callable[[RPCEndpoint, Any],
+                                                      RPCResponse], _w3):
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            start = time.perf_counter()
+
+            try:
+                response = make_request(method, params)
+            except Exception:
+                RPC_ERRORS.labels(method, endpoint).inc()
+                raise
+            finally:
+                RPC_LATENCY.labels(method, endpoint).observe(
+                    time.perf_counter() - start)
+
+            if 'error' in response:
+                RPC_ERRORS.labels(method, endpoint).inc()
+
+            return response
+
+        return middleware
+
+    return rpc_metrics_middleware
+
+
+class PoolCollector:
+    def __init__(self) -> None:
+        self.pools: Dict[str, ConnectionPool] = {}
+
+    gauges = {
+        'pool_size': 'Connections currently in the pool',
+        'pool_available': 'Idle connections in the pool',
+        'pool_min': 'Minimum connections the pool keeps open',
+        'pool_max': 'Maximum connections the pool will open',
+        'requests_waiting': 'Requests queued for a connection',
+    }
+    # Cumulative since the pool was created (`get_stats` doesn't reset them).
+    counters = {
+        'requests_num': 'Connections requested from the pool',
+        'requests_queued': 'Requests which had to wait for a connection',
+        'requests_wait_ms': 'Milliseconds requests spent waiting',
+        'requests_errors': 'Requests which timed out or were rejected',
+        'usage_ms': 'Milliseconds connections were out of the pool',
+        'connections_num': 'Connections opened to the server',
+        'connections_errors': 'Failed attempts to open a connection',
+        'connections_lost': 'Connections found broken and discarded',
+    }
+
+    def collect(self) -> Iterator[Metric]:
+        stats = {name: pool.get_stats() for name, pool in self.pools.items()}
+
+        for stat, doc in self.gauges.items():
+            metric = GaugeMetricFamily(f'explorer_db_{stat}', doc,
+                                       labels=['pool'])
+
+            for name, _stats in stats.items():
+                metric.add_metric([name], _stats.get(stat, 0))
+
+            yield metric
+
+        for stat, doc in self.counters.items():
+            metric = CounterMetricFamily(f'explorer_db_{stat}', doc,
+                                         labels=['pool'])
+
+            for name, _stats in stats.items():
+                metric.add_metric([name], _stats.get(stat, 0))
+
+            yield metric
+
+
+POOLS = PoolCollector()
+REGISTRY.register(POOLS)  # type: ignore
+
+
+def register_pool(name: str, pool: ConnectionPool) -> None:
+    POOLS.pools[name] = pool
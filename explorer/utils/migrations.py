@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Versioned schema migrations: the files of `sql/migrations`, named
+`<version>_<name>.sql`, applied in order of version and recorded in
+`schema_version`.
+
+A migration runs in a transaction, waiting at most `MIGRATE_LOCK_TIMEOUT`
+for its locks rather than queueing every query on the table behind it.
+Directives on its first lines change that:
+
+    -- migrate: no-transaction
+
+runs it a statement at a time (split at each `;` ending a line), as
+`CREATE INDEX CONCURRENTLY` has to be. A failure halfway leaves it half
+applied, so every statement should be fine to run again.
+
+    -- migrate: batch
+
+runs each statement over and over, in a transaction of its own, until it
+affects no rows. A backfill updating a `LIMIT`ed batch at a time never holds
+locks on much of the table for long. Statements which don't report rows,
+like DDL, run once.
+
+Postgres can't `CREATE INDEX CONCURRENTLY` on a partitioned table, so for one
+the index is created `ON ONLY` it and each partition's is built concurrently
+and attached to it. Whichever the table, an invalid index left behind by a
+failed build is dropped before building it again.
+
+This only depends on psycopg, `cli/migrate.py` loads it without the app.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import hashlib
+import time
+import re
+import os
+
+from psycopg import sql
+import psycopg
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..', '..', 'sql', 'migrations')
+MIGRATE_LOCK_TIMEOUT = os.getenv('MIGRATE_LOCK_TIMEOUT', '5s')
+# Seconds between the batches of a `batch` migration.
+MIGRATE_BATCH_SLEEP = float(os.getenv('MIGRATE_BATCH_SLEEP', 0.1))
+
+# Advisory lock held while migrating, so only one process does.
+_LOCK = 4_747_001
+
+_FILE = re.compile(r'(\d+)_(\w+)\.sql')
+_DIRECTIVE = re.compile(r'--\s*migrate:(.*)')
+_CONCURRENTLY = re.compile(
+    r'CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+    r'(\w+)\s+ON\s+(\w+)\s*(.*)', re.I | re.S)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str = field(repr=False)
+    transactional: bool
+    batched: bool
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    def __str__(self) -> str:
+        return f'{self.version:04} {self.name}'
+
+
+def load(path: str = MIGRATIONS_PATH) -> List[Migration]:
+    """ Every migration in `path`, in order. """
+
+    ret: Dict[int, Migration] = {}
+
+    for file in os.listdir(path):
+        if (match := _FILE.fullmatch(file)) is None:
+            continue
+
+        with open(os.path.join(path, file)) as f:
+            text = f.read()
+
+        directives: Set[str] = set()
+        for line in text.splitlines():
+            if not line.startswith('--'):
+                break
+            elif (directive := _DIRECTIVE.match(line)) is not None:
+                directives.update(directive.group(1).split())
+
+        if (unknown := directives - {'no-transaction', 'batch'}):
+            raise ValueError(f'{file}: unknown directives {unknown}')
+
+        version = int(match.group(1))
+        if version in ret:
+            raise ValueError(f'{file}: version {version} is taken by '
+                             f'{ret[version]}')
+
+        ret[version] = Migration(
+            version, match.group(2), text,
+            not directives & {'no-transaction', 'batch'}, 'batch'
+            in directives)
+
+    return [ret[x] for x in sorted(ret)]
+
+
+def statements(text: str) -> List[str]:
+    """ The statements of `text`, without comments. """
+
+    ret = []
+
+    for chunk in re.split(r';[ \t]*(?:--.*)?$', text, flags=re.M):
+        code = '\n'.join(x for x in chunk.splitlines()
+                         if not x.lstrip().startswith('--')).strip()
+        if code:
+            ret.append(code)
+
+    return ret
+
+
+def applied(conn: psycopg.Connection) -> Dict[int, str]:
+    """ Version -> checksum of every applied migration. """
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version int PRIMARY KEY,
+            name text NOT NULL,
+            checksum text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+
+    rows = conn.execute('SELECT version, checksum FROM schema_version')
+
+    return dict(rows.fetchall())
+
+
+def status(
+    conn: psycopg.Connection,
+    path: str = MIGRATIONS_PATH
+) -> Tuple[List[Migration], List[Migration]]:
+    """
+    The migrations yet to apply, and those applied which have changed since.
+    """
+
+    done = applied(conn)
+    migrations = load(path)
+
+    return ([x for x in migrations if x.version not in done],
+            [x for x in migrations
+             if x.version in done and done[x.version] != x.checksum])
+
+
+def _relkind(conn: psycopg.Connection, name: str) -> Optional[str]:
+    row = conn.execute(
+        'SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)',
+        (name, )).fetchone()
+
+    return None if row is None else row[0]
+
+
+def _drop_invalid(conn: psycopg.Connection, index: str) -> None:
+    row = conn.execute(
+        'SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)',
+        (index, )).fetchone()
+
+    if row is not None and not row[0]:
+        print(f'migrations: dropping {index}, invalid since a failed build')
+        conn.execute(sql.SQL('DROP INDEX CONCURRENTLY {}').format(
+            sql.Identifier(index)))
+
+
+def _create_index_concurrently(conn: psycopg.Connection, statement: str,
+                               match: 're.Match[str]') -> None:
+    unique, index, table, rest = match.groups()
+
+    if _relkind(conn, table) != 'p':
+        _drop_invalid(conn, index)
+        conn.execute(statement)
+        return
+
+    kind = sql.SQL(unique or '')
+    conn.execute(
+        sql.SQL('CREATE {}INDEX IF NOT EXISTS {} ON ONLY {} {}').format(
+            kind, sql.Identifier(index), sql.Identifier(table),
+            sql.SQL(rest)))
+
+    # Partitions created since have it already.
+    partitions = conn.execute(
+        """
+        SELECT inhrelid::regclass::text FROM pg_inherits
+        WHERE inhparent = %(table)s::regclass
+        EXCEPT
+        SELECT indrelid::regclass::text FROM pg_inherits
+        JOIN pg_index ON indexrelid = inhrelid
+        WHERE inhparent = %(index)s::regclass
+        """, {
+            'table': table,
+            'index': index
+        }).fetchall()
+
+    for (partition, ) in partitions:
+        name = f'{partition}_{index}'
+        _drop_invalid(conn, name)
+        conn.execute(
+            sql.SQL('CREATE {}INDEX CONCURRENTLY IF NOT EXISTS {} ON {} {}').
+            format(kind, sql.Identifier(name), sql.Identifier(partition),
+                   sql.SQL(rest)))
+        conn.execute(sql.SQL('ALTER INDEX {} ATTACH PARTITION {}').format(
+            sql.Identifier(index), sql.Identifier(name)))
+
+
+def _run_batched(conn: psycopg.Connection, statement: str) -> None:
+    total = 0
+
+    while (rows := conn.execute(statement).rowcount) > 0:
+        total += rows
+        print(f'migrations: {total} rows so far')
+        time.sleep(MIGRATE_BATCH_SLEEP)
+
+
+def apply(conn: psycopg.Connection, migration: Migration) -> None:
+    start = time.time()
+
+    if migration.transactional:
+        with conn.transaction():
+            conn.execute(
+                sql.SQL('SET LOCAL lock_timeout = {}').format(
+                    sql.Literal(MIGRATE_LOCK_TIMEOUT)))
+            conn.execute(migration.sql)
+            _record(conn, migration)
+    else:
+        for statement in statements(migration.sql):
+            if (match := _CONCURRENTLY.match(statement)) is not None:
+                _create_index_concurrently(conn, statement, match)
+            elif migration.batched:
+                _run_batched(conn, statement)
+            else:
+                conn.execute(statement)
+
+        _record(conn, migration)
+
+    print(f'migrations: applied {migration} in {time.time() - start:.1f}s')
+
+
+def _record(conn: psycopg.Connection, migration: Migration) -> None:
+    conn.execute(
+        'INSERT INTO schema_version (version, name, checksum) '
+        'VALUES (%s, %s, %s)',
+        (migration.version, migration.name, migration.checksum))
+
+
+def migrate(conn: psycopg.Connection,
+            path: str = MIGRATIONS_PATH,
+            to: Optional[int] = None) -> List[Migration]:
+    """
+    Apply the pending migrations of `path` up to version `to` (or all of
+    them) and return them. `conn` has to be in autocommit.
+    """
+
+    if not conn.autocommit:
+        raise ValueError('migrating needs a connection in autocommit')
+
+    # Polled rather than waited on, a session stuck waiting for it would be
+    # a transaction `CREATE INDEX CONCURRENTLY` has to wait out in turn.
+    while not conn.execute('SELECT pg_try_advisory_lock(%s)',
+                           (_LOCK, )).fetchone()[0]:
+        print('migrations: waiting on another process migrating')
+        time.sleep(1)
+
+    try:
+        pending, changed = status(conn, path)
+
+        for migration in changed:
+            print(f'migrations: {migration} has changed since it was applied')
+
+        ret = [x for x in pending if to is None or x.version <= to]
+        for migration in ret:
+            apply(conn, migration)
+
+        return ret
+    finally:
+        conn.execute('SELECT pg_advisory_unlock(%s)', (_LOCK, ))
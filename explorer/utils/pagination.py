@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Keyset pagination. A page ends on some `(time, from_tx_hash)` and the next
+one starts strictly after it in `ORDER BY time DESC, from_tx_hash DESC`, so
+every page is an index range scan no matter how deep it is - unlike `OFFSET`
+which has to walk past every skipped row.
+
+The key is handed to clients as an opaque cursor, they shouldn't build one.
+"""
+
+from typing import List, Optional, Tuple, TypeVar
+import binascii
+import base64
+import struct
+
+from flask import request, url_for
+
+T = TypeVar('T')
+Key = Tuple[int, bytes]
+
+_KEY = struct.Struct('>q32s')
+
+
+def encode_cursor(time: int, tx_hash: bytes) -> str:
+    return base64.urlsafe_b64encode(_KEY.pack(time, tx_hash)) \
+        .rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> Key:
+    """
+    Raises:
+        ValueError: `cursor` wasn't made by `encode_cursor`.
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return _KEY.unpack(raw)
+    except (binascii.Error, struct.error) as e:
+        raise ValueError(f'invalid cursor {cursor!r}') from e
+
+
+def cursor_arg() -> Optional[Key]:
+    """
+    The key in the current request's `cursor` arg, if any.
+
+    Raises:
+        ValueError: the cursor is invalid.
+    """
+
+    # Not `request.args.get(..., type=)`, which swallows the `ValueError`.
+    if (cursor := request.args.get('cursor')) is None:
+        return None
+
+    return decode_cursor(cursor)
+
+
+def split_page(rows: List[T], limit: int,
+               time_attr: str) -> Tuple[List[T], Optional[str]]:
+    """
+    `rows` is fetched with `limit + 1`, the extra row only tells us whether
+    there's a next page. Returns the page and the cursor to the next one.
+    """
+
+    if len(rows) <= limit or not limit:
+        return rows[:limit], None
+
+    rows = rows[:limit]
+    last = rows[-1]
+
+    return rows, encode_cursor(getattr(last, time_attr),
+                               last.from_tx_hash)  # type: ignore
+
+
+def next_link(cursor: str) -> str:
+    """ A `Link` header to the current request with `cursor` swapped in. """
+
+    args = request.args.to_dict()
+    args['cursor'] = cursor
+    url = url_for(request.endpoint,  # type: ignore
+                  **request.view_args, **args)  # type: ignore
+
+    return f'<{url}>; rel="next"'
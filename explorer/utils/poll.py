@@ -16,6 +16,7 @@ import gevent
 
 from explorer.utils.data import TOPICS, SYN_DATA
 from explorer.utils.helpers import retry
+from explorer.utils import metrics
 
 # NOTE: :type:`EventData` is not really :type:`LogReceipt`,
 # but close enough to assume its type.
@@ -29,6 +30,8 @@ def log_loop(filter, chain: str, address: str, poll: int, cb: CB):
             # `event` is of type `EventData`.
             for event in filter.get_new_entries():
                 retry(cb, chain, address, event, save_block_index=False)
+
+            metrics.set_checkpoint_to_head(chain)
         except Exception as e:
             print(f'err filter log_loop: {e}')
         finally:
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Union
+from decimal import Decimal
+import os
+
+from psycopg.adapt import Loader, Buffer
+from gevent import monkey
+import psycopg.connection
+import psycopg.waiting
+import psycopg_pool
+import psycopg
+
+from explorer.utils.metrics import register_pool
+
+
+def green_waits() -> None:
+    """
+    Make psycopg wait on its sockets through the (monkey patched) `select`
+    module so a query in flight yields to the hub.
+
+    Depending on the version psycopg picks `wait_c` or `wait_epoll` at import
+    time, neither of which goes through gevent and both block every other
+    greenlet - ingestion and API alike - for the length of the query.
+    """
+
+    if not monkey.is_module_patched('select'):
+        return
+
+    wait = getattr(psycopg.waiting, 'wait_select', None) \
+        or psycopg.waiting.wait_selector
+
+    psycopg.waiting.wait = wait
+    # Older versions import `wait` into the connection module by name.
+    if hasattr(psycopg.connection, 'wait'):
+        psycopg.connection.wait = wait  # type: ignore
+
+
+class IntNumericLoader(Loader):
+    """
+    Load `numeric` as `int` when it has no fractional part, as the values of
+    `txs` never have, rather than as `Decimal` parsed from a `str`.
+    """
+
+    def load(self, data: Buffer) -> Union[int, Decimal]:
+        try:
+            return int(bytes(data))
+        except ValueError:
+            # Fractional, like an `avg()`, or 'NaN'.
+            return Decimal(bytes(data).decode())
+
+
+def numerics_as_ints() -> None:
+    """ Have connections made from now on use `IntNumericLoader`. """
+
+    psycopg.adapters.register_loader('numeric', IntNumericLoader)
+
+
+def create_pool(name: str, url: str,
+                prefix: str = 'PSQL_POOL') -> psycopg_pool.ConnectionPool:
+    """
+    Create a pool sized by the `{prefix}_MIN`, `{prefix}_MAX`,
+    `{prefix}_TIMEOUT` and `{prefix}_MAX_WAITING` env vars, its stats are
+    exported with the metrics under the `pool` label `name`.
+    """
+
+    min_size = int(os.getenv(f'{prefix}_MIN', 4))
+    pool = psycopg_pool.ConnectionPool(
+        url,
+        min_size=min_size,
+        max_size=int(os.getenv(f'{prefix}_MAX', min_size)),
+        # Seconds a caller waits for a connection before `PoolTimeout`.
+        timeout=float(os.getenv(f'{prefix}_TIMEOUT', 30)),
+        # Callers queued for a connection before `TooManyRequests`, 0 means
+        # unlimited.
+        max_waiting=int(os.getenv(f'{prefix}_MAX_WAITING', 0)),
+        name=name,
+    )
+    register_pool(name, pool)
+
+    return pool
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Callable, Dict, Optional
+from enum import Enum
+import threading
+import logging
+import time
+
+from web3.types import RPCEndpoint, RPCResponse
+import gevent
+
+logger = logging.Logger(__name__)
+
+# JSON-RPC error codes which mean the provider is throttling us rather than
+# the call itself being bad (e.g. a revert).
+# REF: https://eips.ethereum.org/EIPS/eip-1474#error-codes
+THROTTLED_ERROR_CODES = (-32005, 429)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        self.retry_after = retry_after
+        self.message = f'circuit for {endpoint!r} is open, retry in ' \
+            f'{retry_after:.1f}s'
+        super().__init__(self.message)
+
+
+class State(Enum):
+    def __str__(self) -> str:
+        return self.name
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """
+        A token bucket shared by every greenlet talking to the same endpoint.
+
+        Args:
+            rate (float): tokens (requests) refilled per second, a rate of
+                0 or less disables the limiter.
+            burst (Optional[float], optional): bucket capacity. Defaults to
+                one second worth of tokens.
+        """
+
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now so concurrent callers queue up behind us
+            # instead of all waking up at the same time.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            gevent.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self,
+                 name: str,
+                 threshold: int = 5,
+                 cooldown: float = 30) -> None:
+        """
+        Closed -> open after `threshold` consecutive failures, open -> half
+        open after `cooldown` seconds where a single probe is let through,
+        which either closes the circuit again or re-opens it.
+        """
+
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = State.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_call(self) -> None:
+        if self.state == State.CLOSED:
+            return
+
+        if self.state == State.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+
+            if elapsed < self.cooldown:
+                raise CircuitOpenError(self.name, self.cooldown - elapsed)
+
+            self.state = State.HALF_OPEN
+
+        # HALF_OPEN: only one probe at a time.
+        if self._probing:
+            raise CircuitOpenError(self.name, 1)
+
+        self._probing = True
+
+    def record_success(self) -> None:
+        if self.state != State.CLOSED:
+            logger.warning(f'circuit for {self.name!r} closed')
+
+        self.state = State.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+
+        if self.state == State.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != State.OPEN:
+                logger.warning(f'circuit for {self.name!r} opened after '
+                               f'{self.failures} failures')
+
+            self.state = State.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Endpoint:
+    def __init__(self, name: str, rps: float, threshold: int,
+                 cooldown: float) -> None:
+        self.bucket = TokenBucket(rps)
+        self.breaker = CircuitBreaker(name, threshold, cooldown)
+
+    def call(self, func: Callable[[], RPCResponse]) -> RPCResponse:
+        # Wait for a token first, a half open probe killed while it waits
+        # would never get to record its outcome.
+        self.bucket.acquire()
+        self.breaker.before_call()
+
+        try:
+            response = func()
+        except BaseException:
+            # Killed or timed out too, or a half open probe never finishes.
+            self.breaker.record_failure()
+            raise
+
+        error = response.get('error')
+        if isinstance(error, dict) \
+                and error.get('code') in THROTTLED_ERROR_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        return response
+
+
+_endpoints: Dict[str, Endpoint] = {}
+
+
+def get_endpoint(name: str,
+                 rps: float,
+                 threshold: int = 5,
+                 cooldown: float = 30) -> Endpoint:
+    """
+    Get (or create) the shared limiter and breaker for `name`, the first
+    caller decides the configuration.
+    """
+
+    if name not in _endpoints:
+        _endpoints[name] = Endpoint(name, rps, threshold, cooldown)
+
+    return _endpoints[name]
+
+
+def ratelimit_middleware_factory(name: str,
+                                 rps: float,
+                                 threshold: int = 5,
+                                 cooldown: float = 30) -> Callable:
+    endpoint = get_endpoint(name, rps, threshold, cooldown)
+
+    def ratelimit_middleware(make_request: Callable[[RPCEndpoint, Any],
+                                                    RPCResponse], _w3):
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            return endpoint.call(lambda: make_request(method, params))
+
+        return middleware
+
+    return ratelimit_middleware
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+The latest `RECENT_SIZE` transactions of each view of `/transactions/recent`,
+kept in Redis by ingestion so the endpoint is served without touching
+Postgres.
+
+Each view is a sorted set where every member has the same score, so they're
+ordered by value: the `(time, from_tx_hash)` key of the row (big-endian, so
+bytewise order is keyset order) followed by its JSON. A page is then a single
+`ZREVRANGEBYLEX` and the response is the members joined together.
+
+When rows are trimmed off the end of a view, the key of the highest one is
+kept as its floor: rows at or below it may be missing, so a page reaching
+that far is left to Postgres. A view without a floor has every row.
+
+The views are warmed from Postgres at boot and every
+`RECENT_REBUILD_INTERVAL` seconds, to pick up rows written by other
+processes (`cli/complete_lost_txs.py`). Until a warm is done, `page` returns
+`None`.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+import struct
+import time
+import os
+
+from psycopg.rows import dict_row
+import gevent
+import redis
+import lru
+
+from explorer.utils.data import PSQL, RECENT_REDIS
+from explorer.utils.database import Transaction
+from explorer.utils import pagination, serialize, statements
+
+# Rows kept per view.
+RECENT_SIZE = int(os.getenv('RECENT_SIZE', 5000))
+RECENT_REBUILD_INTERVAL = float(os.getenv('RECENT_REBUILD_INTERVAL', 3600))
+
+# View -> the statement it's warmed from and the attribute it's ordered by.
+VIEWS: Dict[str, Tuple[str, str]] = {
+    'completed': ('txs.recent', 'received_time'),
+    'pending': ('txs.recent_pending', 'sent_time'),
+    'all': ('txs.recent_including_pending', 'sent_time'),
+}
+
+_READY = 'recent:ready'
+_KEY = struct.Struct('>Q32s')
+# JSON is ASCII, so every member starting with a key sorts below this.
+_END = b'\x80'
+
+# Set while warming, `from_tx_hash` of every row ingested meanwhile.
+_touched: Optional[Set[bytes]] = None
+# `from_tx_hash` of rows seen completed, an OUT event racing its IN event
+# mustn't put the row back as pending.
+_completed = lru.LRU(RECENT_SIZE)
+
+
+def _key(tx: Transaction, view: str) -> Optional[bytes]:
+    """ The key of `tx` in `view`, `None` if it can't be in it. """
+
+    if (time_ := getattr(tx, VIEWS[view][1])) is None:
+        return None
+
+    return _KEY.pack(time_, tx.from_tx_hash)
+
+
+def _members(tx: Transaction) -> Dict[str, Optional[bytes]]:
+    """ View -> the member of `tx` in it, `None` if it's not in it. """
+
+    data = serialize.dumps(tx).encode()
+    ret: Dict[str, Optional[bytes]] = {}
+
+    for view in VIEWS:
+        if (view == 'completed' and tx.pending) \
+                or (view == 'pending' and not tx.pending):
+            ret[view] = None
+        else:
+            ret[view] = _key(tx, view) + data  # type: ignore
+
+    return ret
+
+
+def _trim(pipe: 'redis.client.Pipeline', view: str) -> None:
+    """ Queue the trim of `view`, `_floor` takes the first result. """
+
+    pipe.zrange(f'recent:{view}', 0, -RECENT_SIZE - 1)
+    pipe.zremrangebyrank(f'recent:{view}', 0, -RECENT_SIZE - 1)
+
+
+def _floor(pipe: 'redis.client.Pipeline', view: str,
+           trimmed: List[bytes]) -> None:
+    if trimmed:
+        pipe.zadd(f'recent:{view}:floor', {trimmed[-1][:_KEY.size]: 0})
+        # Only the highest matters.
+        pipe.zremrangebyrank(f'recent:{view}:floor', 0, -2)
+
+
+def _transaction(row: Dict[str, Any]) -> Optional[Transaction]:
+    """ The `Transaction` of a `txs` row, `None` if it can't be one. """
+
+    try:
+        return Transaction(**row)
+    except Exception as e:
+        # A token we don't know about, say. The API can't show it either,
+        # but ingestion and warms mustn't stop over it.
+        print(f"recent: skipping {bytes(row['from_tx_hash']).hex()}: {e}")
+        return None
+
+
+def add(row: Dict[str, Any]) -> None:
+    """ Put a `txs` row freshly written by ingestion into its views. """
+
+    key = bytes(row['from_tx_hash'])
+
+    if (tx := _transaction(row)) is None:
+        return
+
+    if tx.pending and key in _completed:
+        return
+    elif not tx.pending:
+        _completed[key] = True
+
+    if _touched is not None:
+        _touched.add(key)
+
+    members = _members(tx)
+    # View -> the index of its trim's result.
+    trims: Dict[str, int] = {}
+
+    try:
+        with RECENT_REDIS.pipeline() as pipe:
+            for view, member in members.items():
+                # Whatever it was in the view before (pending or not) has
+                # the same key, drop it.
+                if (start := _key(tx, view)) is not None:
+                    pipe.zremrangebylex(f'recent:{view}', b'[' + start,
+                                        b'(' + start + _END)
+
+                if member is not None:
+                    pipe.zadd(f'recent:{view}', {member: 0})
+                    trims[view] = len(pipe)
+                    _trim(pipe, view)
+
+            res = pipe.execute()
+
+            for view, i in trims.items():
+                _floor(pipe, view, res[i])
+
+            pipe.execute()
+    except redis.RedisError as e:
+        print(f'recent: failed to add {key.hex()}: {e}')
+
+
+def page(view: str, limit: int,
+         after: Optional[pagination.Key]) -> Optional[Tuple[List[str],
+                                                            Optional[str]]]:
+    """
+    The JSON of the `limit` rows of `view` after the key `after`, and the
+    cursor to the next page. `None` if the page has to come from Postgres.
+    """
+
+    start = b'+' if after is None else b'(' + _KEY.pack(*after)
+
+    try:
+        with RECENT_REDIS.pipeline(transaction=False) as pipe:
+            pipe.get(_READY)
+            pipe.zrange(f'recent:{view}:floor', 0, 0)
+            pipe.zrevrangebylex(f'recent:{view}', start, b'-', 0, limit + 1)
+            ready, floor, members = pipe.execute()
+    except redis.RedisError as e:
+        print(f'recent: {e}')
+        return None
+
+    if ready is None:
+        return None
+
+    if floor:
+        members = [x for x in members if x[:_KEY.size] > floor[0]]
+
+        # Short of a full page, the rest may be missing.
+        if len(members) <= limit:
+            return None
+
+    cursor = None
+    if len(members) > limit and limit:
+        cursor = pagination.encode_cursor(*_KEY.unpack(
+            members[limit - 1][:_KEY.size]))
+
+    return [x[_KEY.size:].decode() for x in members[:limit]], cursor
+
+
+def warm() -> None:
+    """ Rebuild every view from Postgres. """
+
+    global _touched
+
+    start = time.time()
+    RECENT_REDIS.delete(_READY, *(f'recent:{x}{y}' for x in VIEWS
+                                  for y in ('', ':floor')))
+    # From here on whatever is ingested is in the views, and newer than what
+    # we'll read.
+    _touched = set()
+
+    try:
+        with PSQL.connection() as conn:
+            # Rows rather than `fast_row`, so one which can't be decoded is
+            # skipped instead of failing the whole warm.
+            with conn.cursor(row_factory=dict_row) as c:
+                for view, (name, attr) in VIEWS.items():
+                    # One more than is kept, to know whether there's a floor.
+                    statements.execute(c, name, {'limit': RECENT_SIZE + 1})
+                    rows = c.fetchall()
+
+                    with RECENT_REDIS.pipeline() as pipe:
+                        members = {
+                            m: 0
+                            for row in rows[:RECENT_SIZE]
+                            if bytes(row['from_tx_hash']) not in _touched
+                            and (tx := _transaction(row)) is not None
+                            and (m := _members(tx)[view]) is not None
+                        }
+                        if members:
+                            pipe.zadd(f'recent:{view}', members)
+
+                        _trim(pipe, view)
+                        trimmed = pipe.execute()[-2]
+
+                        # Below anything trimmed, which is in ascending order.
+                        if len(rows) > RECENT_SIZE:
+                            trimmed.insert(
+                                0,
+                                _KEY.pack(rows[-1][attr],
+                                          bytes(rows[-1]['from_tx_hash'])))
+                        _floor(pipe, view, trimmed)
+                        pipe.execute()
+    finally:
+        _touched = None
+
+    RECENT_REDIS.set(_READY, 1)
+    print(f'recent: warmed in {time.time() - start:.1f}s')
+
+
+def _rewarm_forever() -> None:
+    while True:
+        try:
+            warm()
+        except Exception as e:
+            print(f'recent: warm failed: {e}')
+
+        gevent.sleep(RECENT_REBUILD_INTERVAL)
+
+
+def start() -> gevent.Greenlet:
+    return gevent.spawn(_rewarm_forever)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Routing of API reads to the read-only replicas of `PSQL_REPLICA_URLS`, so
+they don't compete with ingestion's writes on the primary.
+
+Every `PSQL_REPLICA_CHECK_INTERVAL` seconds the primary's WAL position is
+sampled and each replica's lag is how long ago the primary was where the
+replica has replayed up to. Unlike `pg_last_xact_replay_timestamp()` that
+holds for an idle primary, and a replica cut off from it falls behind too.
+One lagging more than `PSQL_REPLICA_MAX_LAG` seconds, or failing its check,
+is left out until it catches up. With none left, or none checked yet,
+reads go to the primary's `PSQL_API` pool.
+
+Reads which have to see the latest writes, like pending transactions or an
+address's transactions (cached until the next write invalidates them), ask
+for a `fresh` pool and always get the primary's.
+"""
+
+from typing import Deque, List, Tuple
+from collections import deque
+import random
+import time
+import os
+
+from psycopg_pool import ConnectionPool
+import gevent
+
+from explorer.utils.data import PSQL_API, PSQL_REPLICAS
+from explorer.utils.metrics import REPLICA_LAG
+
+PSQL_REPLICA_MAX_LAG = float(os.getenv('PSQL_REPLICA_MAX_LAG', 5))
+PSQL_REPLICA_CHECK_INTERVAL = float(
+    os.getenv('PSQL_REPLICA_CHECK_INTERVAL', 1))
+
+# How far back the primary's position is kept, a replica further behind
+# than this has a lag of `inf`.
+SAMPLES_SECONDS = 60
+
+# Bytes of WAL written (primary) or replayed (replica) so far.
+WAL_POSITION_SQL = """
+    SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+        ELSE pg_current_wal_lsn() END - '0/0'::pg_lsn;
+"""
+
+# (time, position) of the primary, oldest first.
+_samples: Deque[Tuple[float, int]] = deque(
+    maxlen=int(SAMPLES_SECONDS / PSQL_REPLICA_CHECK_INTERVAL) + 1)
+# Pools of the replicas caught up as of the last check.
+_healthy: List[ConnectionPool] = []
+
+
+def pool(fresh: bool = False) -> ConnectionPool:
+    """
+    The pool of a replica caught up with the primary, or the primary's if
+    there's none or the read has to be `fresh`.
+    """
+
+    if fresh or not _healthy:
+        return PSQL_API
+
+    return random.choice(_healthy)
+
+
+def lag(samples: Deque[Tuple[float, int]], position: int,
+        now: float) -> float:
+    """
+    Seconds since the last of `samples` of the primary which a replica at
+    `position` has caught up with, `inf` if it hasn't with any.
+    """
+
+    for at, primary in reversed(samples):
+        if position >= primary:
+            return max(now - at, 0)
+
+    return float('inf')
+
+
+def check() -> None:
+    """ Measure the lag of every replica and route reads accordingly. """
+
+    global _healthy
+
+    with PSQL_API.connection() as conn:
+        row = conn.execute(WAL_POSITION_SQL).fetchone()
+        assert row is not None
+        _samples.append((time.time(), int(row[0])))
+
+    healthy = []
+
+    for name, replica in PSQL_REPLICAS.items():
+        try:
+            # Any longer and it'd be too late anyway.
+            with replica.connection(timeout=PSQL_REPLICA_MAX_LAG) as conn:
+                row = conn.execute(WAL_POSITION_SQL).fetchone()
+                assert row is not None
+
+            seconds = lag(_samples, int(row[0]), time.time())
+        except Exception as e:
+            print(f'replicas: failed to check {name}: {e}')
+            seconds = float('inf')
+
+        REPLICA_LAG.labels(name).set(seconds)
+        if seconds <= PSQL_REPLICA_MAX_LAG:
+            healthy.append(replica)
+
+    _healthy = healthy
+
+
+def _check_forever() -> None:
+    while True:
+        try:
+            check()
+        except Exception as e:
+            # The primary's down, there's nothing to route to but it.
+            print(f'replicas: check failed: {e}')
+            _healthy.clear()
+
+        gevent.sleep(PSQL_REPLICA_CHECK_INTERVAL)
+
+
+def start() -> gevent.Greenlet:
+    return gevent.spawn(_check_forever)
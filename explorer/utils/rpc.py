@@ -12,6 +12,7 @@ from collections import namedtuple
 import time
 
 from web3.types import FilterParams, LogReceipt
+from psycopg.rows import dict_row
 from hexbytes import HexBytes
 from web3 import Web3
 import psycopg
@@ -24,6 +25,9 @@ from explorer.utils.helpers import convert, retry, search_logs, \
     iterate_receipt_logs
 from explorer.utils.database import Transaction, LostTransaction
 from explorer.utils.contract import get_pool_data
+from explorer.utils import bloom, cache, metrics, recent, statements, \
+    tracing
+from explorer.utils.analytics import users
 
 # Start blocks of the 4pool >=Nov-7th-2021.
 _start_blocks = {
@@ -47,62 +51,6 @@ _start_blocks = {
 WETH = HexBytes('0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2')
 MAX_BLOCKS = 2048
 
-OUT_SQL = """
-INSERT into
-    txs (
-        from_tx_hash,
-        from_address,
-        to_address,
-        sent_value,
-        from_chain_id,
-        to_chain_id,
-        sent_time,
-        sent_token,
-        kappa
-    )
-VALUES
-    (%s, %s, %s, %s, %s, %s, %s, %s, %s);
-"""
-
-IN_SQL = """
-UPDATE
-    txs
-SET
-    (
-        to_tx_hash,
-        received_value,
-        pending,
-        received_time,
-        received_token,
-        swap_success
-    ) = (
-        %s,
-        %s,
-        false,
-        %s,
-        %s,
-        %s
-    )
-WHERE
-    kappa = %s;
-"""
-
-LOST_IN_SQL = """
-INSERT into
-    lost_txs (
-        to_tx_hash,
-        to_address,
-        received_value,
-        to_chain_id,
-        received_time,
-        received_token,
-        swap_success,
-        kappa
-    )
-VALUES
-    (%s, %s, %s, %s, %s, %s, %s, %s);
-"""
-
 
 class Events(object):
     # OUT EVENTS
@@ -181,6 +129,7 @@ def bridge_callback(
 
 
 # REF: https://github.com/synapsecns/synapse-contracts/blob/master/contracts/bridge/SynapseBridge.sol#L63-L129
+@tracing.traced('bridge_callback')
 def bridge_callback(
         chain: str,
         address: str,
@@ -193,16 +142,21 @@ def bridge_callback(
     contract = w3.eth.contract(w3.toChecksumAddress(address), abi=abi)
     tx_hash = log['transactionHash']
 
-    timestamp = w3.eth.get_block(log['blockNumber'])
-    timestamp = timestamp['timestamp']  # type: ignore
-    tx_info = w3.eth.get_transaction(tx_hash)
+    with tracing.span('get_block'):
+        timestamp = w3.eth.get_block(log['blockNumber'])
+        timestamp = timestamp['timestamp']  # type: ignore
+
+    with tracing.span('get_transaction'):
+        tx_info = w3.eth.get_transaction(tx_hash)
+
     assert 'from' in tx_info  # Make mypy happy - look key 'from' exists!
     from_chain = CHAINS_REVERSED[chain]
 
     # The info before wrapping the asset can be found in the receipt.
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash,
-                                                  timeout=10,
-                                                  poll_latency=0.5)
+    with tracing.span('wait_for_transaction_receipt'):
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash,
+                                                      timeout=10,
+                                                      poll_latency=0.5)
 
     topic = cast(str, convert(log['topics'][0]))
     if topic not in TOPICS:
@@ -210,8 +164,10 @@ def bridge_callback(
 
     event = TOPIC_TO_EVENT[topic]
     direction = TOPICS[topic]
+    tracing.tag(event=event, tx_hash=tx_hash.hex())
 
-    args = contract.events[event]().processLog(log)['args']
+    with tracing.span('decode'):
+        args = contract.events[event]().processLog(log)['args']
 
     if direction == Direction.OUT:
         kappa = w3.keccak(text=tx_hash.hex())
@@ -236,12 +192,13 @@ def bridge_callback(
 
         sent_token_address = sent_value = None
 
-        for _log in receipt['logs']:
-            ret = get_sent_info(_log)
+        with tracing.span('search_logs'):
+            for _log in receipt['logs']:
+                ret = get_sent_info(_log)
 
-            if ret is not None:
-                sent_token_address, sent_value = ret
-                break
+                if ret is not None:
+                    sent_token_address, sent_value = ret
+                    break
 
         if sent_token_address is None or sent_value is None:
             raise RuntimeError(
@@ -269,25 +226,42 @@ def bridge_callback(
                                data.chain_id, timestamp, None, None,
                                sent_token_address, None, kappa)
 
-        with PSQL.connection() as conn:
-            with conn.cursor() as c:
+        # Before the row is visible, so a search can never miss it.
+        bloom.add(tx_hash, kappa, HexBytes(tx_info['from']), data.to)
+
+        row = None
+
+        with PSQL.connection() as conn, tracing.span('sql'):
+            with conn.cursor(row_factory=dict_row) as c:
                 try:
-                    c.execute(OUT_SQL,
-                              (tx_hash, HexBytes(tx_info['from']), data.to,
-                               sent_value, from_chain, data.chain_id,
-                               timestamp, sent_token_address, kappa))
+                    statements.execute(
+                        c, 'txs.insert_out',
+                        (tx_hash, HexBytes(tx_info['from']), data.to,
+                         sent_value, from_chain, data.chain_id, timestamp,
+                         sent_token_address, kappa))
+                    row = c.fetchone()
                 except psycopg.errors.UniqueViolation:
                     # TODO: stderr? rollback?
                     pass
 
+        # Once it's committed.
+        if row is not None:
+            recent.add(row)
+            users.add(row)
+
+        cache.invalidate([tx_hash, kappa, HexBytes(tx_info['from']), data.to])
+
     elif direction == Direction.IN:
         received_value = None
         kappa = args['kappa']
 
         if event in ['TokenWithdrawAndRemove', 'TokenMintAndSwap']:
             assert 'input' in tx_info  # IT EXISTS MYPY!
-            _, inp_args = contract.decode_function_input(tx_info['input'])
-            pool = get_pool_data(chain, inp_args['pool'])
+            with tracing.span('decode'):
+                _, inp_args = contract.decode_function_input(tx_info['input'])
+
+            with tracing.span('get_pool_data'):
+                pool = get_pool_data(chain, inp_args['pool'])
 
             if event == 'TokenWithdrawAndRemove':
                 data = Events.TokenWithdrawAndRemove(args)
@@ -324,17 +298,18 @@ def bridge_callback(
                 and received_token in MISREPRESENTED_MAP[chain]):
             received_token = MISREPRESENTED_MAP[chain][received_token]
 
-        if received_value is None:
-            received_value = search_logs(chain, receipt,
-                                         received_token)['value']
+        with tracing.span('search_logs'):
+            if received_value is None:
+                received_value = search_logs(chain, receipt,
+                                             received_token)['value']
 
-        if event == 'TokenMint':
-            # emit TokenMint(to, token, amount.sub(fee), fee, kappa);
-            if received_value != data.amount:  # type: ignore
-                received_token, received_value = iterate_receipt_logs(
-                    receipt,
-                    check_factory(data.amount)  # type: ignore
-                )
+            if event == 'TokenMint':
+                # emit TokenMint(to, token, amount.sub(fee), fee, kappa);
+                if received_value != data.amount:  # type: ignore
+                    received_token, received_value = iterate_receipt_logs(
+                        receipt,
+                        check_factory(data.amount)  # type: ignore
+                    )
 
         # Must equal to False rather than eval to False since None is falsy.
         if swap_success == False:
@@ -349,39 +324,56 @@ def bridge_callback(
 
         params = (tx_hash, received_value, timestamp, received_token,
                   swap_success, kappa)
+        bloom.add(tx_hash, kappa, data.to)
 
-        with PSQL.connection() as conn:
+        with PSQL.connection() as conn, tracing.span('sql'):
             conn.autocommit = True
-            with conn.cursor() as c:
+            with conn.cursor(row_factory=dict_row) as c:
                 try:
-                    c.execute(IN_SQL, params)
+                    statements.execute(c, 'txs.update_in', params)
 
                     if c.rowcount == 0:
-                        c.execute(LOST_IN_SQL,
-                                  (tx_hash, data.to, received_value,
-                                   from_chain, timestamp, received_token,
-                                   swap_success, args['kappa']))
+                        statements.execute(
+                            c, 'lost_txs.insert',
+                            (tx_hash, data.to, received_value, from_chain,
+                             timestamp, received_token, swap_success,
+                             args['kappa']))
                     else:
                         if c.rowcount != 1:
                             # TODO: Rollback here?
                             raise RuntimeError(
-                                f'`IN_SQL` with args {params}, affected {c.rowcount}'
-                                f' {tx_hash.hex()} {chain}')
+                                f'`txs.update_in` with args {params}, '
+                                f'affected {c.rowcount} {tx_hash.hex()} '
+                                f'{chain}')
                 except Exception as e:
                     try:
-                        c.execute(LOST_IN_SQL,
-                                  (tx_hash, data.to, received_value,
-                                   from_chain, timestamp, received_token,
-                                   swap_success, args['kappa']))
+                        statements.execute(
+                            c, 'lost_txs.insert',
+                            (tx_hash, data.to, received_value, from_chain,
+                             timestamp, received_token, swap_success,
+                             args['kappa']))
                         print(e)
                     except psycopg.errors.UniqueViolation:
                         pass
+                else:
+                    # The row `txs.update_in` returned, unless it went to
+                    # `lost_txs`.
+                    if c.description is not None \
+                            and (row := c.fetchone()) is not None:
+                        recent.add(row)
+                        users.add(row)
+                        cache.invalidate([tx_hash, kappa, row['from_tx_hash'],
+                                          row['from_address'],
+                                          row['to_address']])
+
+    metrics.EVENTS.labels(chain, event, direction).inc()
 
     if save_block_index:
         LOGS_REDIS_URL.set(f'{chain}:logs:{address}:MAX_BLOCK_STORED',
                            log['blockNumber'])
         LOGS_REDIS_URL.set(f'{chain}:logs:{address}:TX_INDEX',
                            log['transactionIndex'])
+        metrics.set_checkpoint(chain, log['blockNumber'], timestamp)
 
 
 def get_logs(
@@ -423,6 +415,8 @@ def get_logs(
     _start = time.time()
     x = 0
 
+    metrics.backfilling.add(chain)
+
     total_events = 0
     initial_block = start_block
 
@@ -457,6 +451,7 @@ def get_logs(
             retry(callback, chain, address, log)
 
         start_block += max_blocks + 1
+        metrics.set_checkpoint(chain, to_block)
 
         y = time.time() - _start
         total_events += len(logs)
@@ -470,4 +465,5 @@ def get_logs(
         x = y
 
     gevent.joinall(jobs)
+    metrics.backfilling.discard(chain)
     print(f'{_chain:{chain_len}} it took {time.time() - _start:.1f}s!')
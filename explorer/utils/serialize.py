@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Callable, Dict, List, Optional, get_args
+from json.encoder import encode_basestring_ascii
+from dataclasses import fields
+from decimal import Decimal
+
+from flask.wrappers import Response
+from hexbytes import HexBytes
+import simplejson as json
+
+from explorer.utils.database import Transaction, LostTransaction
+
+# Over max `Number.MAX_SAFE_INTEGER` for JS.
+MAX_SAFE_INTEGER = 2**53 - 1
+
+
+class CustomJSONEncoder(json.JSONEncoder):
+    def _transform(self, v):
+        if isinstance(v, HexBytes):
+            return v.hex()
+        elif isinstance(v, int):
+            if v > MAX_SAFE_INTEGER:
+                return str(v)
+
+        return v
+
+    def default(self, o):
+        if isinstance(o, (Transaction, LostTransaction)):
+            return {k: self._transform(v) for k, v in o.__dict__.items()}
+
+        super().default(o)
+
+
+_encoders: Dict[type, Callable[[Any], str]] = {}
+
+
+def _compile_encoder(cls: type) -> Callable[[Any], str]:
+    """
+    Generate a function which serializes a `cls` to exactly what
+    `CustomJSONEncoder` would (with sorted keys and compact separators), but
+    with the type of every field resolved up front.
+    """
+
+    lines = ['def encode(o):', '    d = o.__dict__']
+    template = []
+
+    for i, f in enumerate(sorted(fields(cls), key=lambda x: x.name)):
+        _type = (get_args(f.type) or (f.type, ))[0]
+
+        if _type == HexBytes:
+            expr = """f'"0x{hex(v)}"'"""
+        elif _type == bool:
+            expr = "'true' if v else 'false'"
+        elif _type == int:
+            expr = """f'"{v}"' if v > MAX_SAFE_INTEGER else str(v)"""
+        elif _type == Decimal:
+            # `simplejson` emits decimals as numbers, verbatim.
+            expr = 'str(v)'
+        elif _type == str:
+            expr = 'encode_str(v)'
+        else:
+            raise TypeError(f'no encoder for {f.name!r} of type {f.type}')
+
+        lines += [
+            f'    v = d[{f.name!r}]',
+            f"    v{i} = 'null' if v is None else {expr}",
+        ]
+        template.append(f'{encode_basestring_ascii(f.name)}:{{v{i}}}')
+
+    # A single f-string rather than concatenating every piece.
+    lines.append("    return f'{{" + ','.join(template) + "}}'")
+    src = '\n'.join(lines)
+
+    namespace: Dict[str, Any] = {
+        'hex': bytes.hex,
+        'encode_str': encode_basestring_ascii,
+        'MAX_SAFE_INTEGER': MAX_SAFE_INTEGER,
+    }
+    exec(src, namespace)
+
+    return namespace['encode']
+
+
+def _encoder(cls: type) -> Optional[Callable[[Any], str]]:
+    if (encoder := _encoders.get(cls)) is None \
+            and cls in (Transaction, LostTransaction):
+        encoder = _encoders[cls] = _compile_encoder(cls)
+
+    return encoder
+
+
+def dumps(obj: Any) -> str:
+    if (encoder := _encoder(type(obj))) is not None:
+        return encoder(obj)
+    elif type(obj) is list and obj \
+            and (encoder := _encoder(type(obj[0]))) is not None:
+        items: List[str] = [encoder(x) for x in obj]
+        return '[' + ','.join(items) + ']'
+    elif type(obj) is dict and all(type(k) is str for k in obj):
+        # Values may be `Transaction`s or lists of them, encode each on its
+        # own so they get the fast paths above.
+        items = [encode_basestring_ascii(k) + ':' + dumps(obj[k])
+                 for k in sorted(obj)]
+        return '{' + ','.join(items) + '}'
+
+    # Ints outside of what JS can represent exactly become strings anywhere,
+    # not just in `Transaction`s.
+    return json.dumps(obj,
+                      cls=CustomJSONEncoder,
+                      sort_keys=True,
+                      separators=(',', ':'),
+                      int_as_string_bitcount=53)
+
+
+def jsonify(obj: Any) -> Response:
+    """ `flask.jsonify` for `Transaction`s, and lists and maps of them. """
+
+    return Response(dumps(obj) + '\n', mimetype='application/json')
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Request coalescing. While a request is being rendered, identical ones (same
+path and query args) wait for it and get a copy of its response instead of
+running their own queries. Nothing is kept once it's done, so unlike the
+cache this is never stale.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+import functools
+
+from flask import request, make_response
+from flask.wrappers import Response
+from gevent.event import AsyncResult
+
+from explorer.utils.metrics import COALESCED_REQUESTS
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# status, headers, body
+Snapshot = Tuple[int, List[Tuple[str, str]], bytes]
+
+# key -> the response of the request in flight, `None` if it's streamed.
+_calls: Dict[str, 'AsyncResult[Optional[Snapshot]]'] = {}
+
+
+def request_key() -> str:
+    """ The current request's path and query args, sorted. """
+
+    key = request.path
+    if request.args:
+        key += '?' + '&'.join(
+            f'{k}={v}' for k, v in sorted(request.args.items(True)))
+
+    return key
+
+
+def share(key: str, render: Callable[[], Response]) -> Response:
+    """
+    Return `render()`, or a copy of its result if another greenlet is
+    already rendering `key`. Exceptions are shared too.
+
+    A streamed response can't be shared, the waiters render their own.
+    """
+
+    if (call := _calls.get(key)) is not None:
+        COALESCED_REQUESTS.inc()
+
+        if (snapshot := call.get()) is None:
+            return render()
+
+        status, headers, body = snapshot
+        return Response(body, status, headers)
+
+    call = _calls[key] = AsyncResult()
+
+    try:
+        res = render()
+    except BaseException as e:
+        call.set_exception(e)
+        raise
+    finally:
+        del _calls[key]
+
+    if res.is_streamed:
+        call.set(None)
+    else:
+        call.set((res.status_code,
+                  [(k, v) for k, v in res.headers.items()
+                   if k != 'Content-Length'],
+                  res.get_data()))
+
+    return res
+
+
+def coalesced(f: F) -> F:
+    """ Coalesce identical concurrent requests to a view. """
+
+    @functools.wraps(f)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return share(request_key(),
+                     lambda: make_response(f(*args, **kwargs)))
+
+    return cast(F, wrapper)
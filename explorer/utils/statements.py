@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Every statement we run on a hot path, by name. They're executed with
+`prepare=True` so each pooled connection parses and plans a statement once,
+the first time it runs it, and reuses the plan from then on.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Mapping, TypeVar, Union
+
+from psycopg import Cursor
+
+from explorer.utils.metrics import DB_LATENCY
+
+T = TypeVar('T')
+
+STATEMENTS: Dict[str, str] = {
+    # Ingestion.
+    'txs.insert_out': """
+        INSERT into
+            txs (
+                from_tx_hash,
+                from_address,
+                to_address,
+                sent_value,
+                from_chain_id,
+                to_chain_id,
+                sent_time,
+                sent_token,
+                kappa
+            )
+        VALUES
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING
+            *;
+    """,
+    'txs.update_in': """
+        UPDATE
+            txs
+        SET
+            (
+                to_tx_hash,
+                received_value,
+                pending,
+                received_time,
+                received_token,
+                swap_success
+            ) = (
+                %s,
+                %s,
+                false,
+                %s,
+                %s,
+                %s
+            )
+        FROM
+            txs_keys
+        WHERE
+            txs_keys.kappa = %s
+            AND txs.from_tx_hash = txs_keys.from_tx_hash
+            AND txs.sent_time = txs_keys.sent_time
+        RETURNING
+            txs.*;
+    """,
+    'lost_txs.insert': """
+        INSERT into
+            lost_txs (
+                to_tx_hash,
+                to_address,
+                received_value,
+                to_chain_id,
+                received_time,
+                received_token,
+                swap_success,
+                kappa
+            )
+        VALUES
+            (%s, %s, %s, %s, %s, %s, %s, %s);
+    """,
+
+    # API.
+    # A branch per column rather than an `OR`, so each is a single probe of
+    # that column's unique index and `match` says which one hit. For `txs`
+    # that's on `txs_keys`, whose `sent_time` leads to the one partition to
+    # look in. The first branch is a subquery as in a join, the hash would
+    # be pushed to both sides and every partition searched for it.
+    'txs.search_with_tx_hash': """
+        SELECT *, 'from' AS match FROM txs
+        WHERE
+            from_tx_hash = %(tx_hash)s
+            AND sent_time = (
+                SELECT sent_time FROM txs_keys
+                WHERE from_tx_hash = %(tx_hash)s
+            )
+        UNION ALL
+        SELECT txs.*, 'to'
+        FROM txs_keys k JOIN txs USING (from_tx_hash, sent_time)
+        WHERE k.to_tx_hash = %(tx_hash)s
+        UNION ALL
+        SELECT txs.*, 'kappa'
+        FROM txs_keys k JOIN txs USING (from_tx_hash, sent_time)
+        WHERE k.kappa = %(tx_hash)s
+        LIMIT 1;
+    """,
+    'lost_txs.search_with_tx_hash': """
+        SELECT *, 'to' AS match FROM lost_txs WHERE to_tx_hash = %(tx_hash)s
+        UNION ALL
+        SELECT *, 'kappa' FROM lost_txs WHERE kappa = %(tx_hash)s
+        LIMIT 1;
+    """,
+    'txs.search_with_address': """
+        SELECT * FROM txs WHERE from_address = %(address)s
+        UNION ALL
+        SELECT * FROM txs
+        WHERE to_address = %(address)s AND from_address <> %(address)s;
+    """,
+    # Batched versions of the above, the trailing `key` column is the input
+    # a row matched.
+    'txs.search_with_tx_hashes': """
+        SELECT txs.*, k.from_tx_hash AS key
+        FROM txs_keys k JOIN txs USING (from_tx_hash, sent_time)
+        WHERE k.from_tx_hash = ANY(%(tx_hashes)s)
+        UNION ALL
+        SELECT txs.*, k.to_tx_hash
+        FROM txs_keys k JOIN txs USING (from_tx_hash, sent_time)
+        WHERE k.to_tx_hash = ANY(%(tx_hashes)s)
+        UNION ALL
+        SELECT txs.*, k.kappa
+        FROM txs_keys k JOIN txs USING (from_tx_hash, sent_time)
+        WHERE k.kappa = ANY(%(tx_hashes)s);
+    """,
+    'lost_txs.search_with_tx_hashes': """
+        SELECT *, to_tx_hash AS key FROM lost_txs
+        WHERE to_tx_hash = ANY(%(tx_hashes)s)
+        UNION ALL
+        SELECT *, kappa FROM lost_txs WHERE kappa = ANY(%(tx_hashes)s);
+    """,
+    # The first `txs.address_page` of each address.
+    'txs.search_with_addresses': """
+        SELECT t.*, a.key
+        FROM unnest(%(addresses)s::bytea[]) AS a(key)
+        CROSS JOIN LATERAL (
+            (
+                SELECT * FROM txs WHERE from_address = a.key
+                ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+            )
+            UNION
+            (
+                SELECT * FROM txs WHERE to_address = a.key
+                ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+            )
+            ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+        ) t;
+    """,
+    # Keyset pagination, `from_tx_hash` breaks ties between rows with the
+    # same timestamp. The `_after` variants continue from a page's last row,
+    # those on `sent_time` also compare it alone since partitions are only
+    # pruned by that, not the row comparison.
+    'txs.recent': """
+        SELECT * FROM txs WHERE pending = false
+        ORDER BY received_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.recent_after': """
+        SELECT * FROM txs
+        WHERE
+            pending = false
+            AND (received_time, from_tx_hash) < (%(time)s, %(tx_hash)s)
+        ORDER BY received_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.recent_pending': """
+        SELECT * FROM txs WHERE pending = true
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.recent_pending_after': """
+        SELECT * FROM txs
+        WHERE
+            pending = true
+            AND sent_time <= %(time)s
+            AND (sent_time, from_tx_hash) < (%(time)s, %(tx_hash)s)
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.recent_including_pending': """
+        SELECT * FROM txs
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.recent_including_pending_after': """
+        SELECT * FROM txs
+        WHERE
+            sent_time <= %(time)s
+            AND (sent_time, from_tx_hash) < (%(time)s, %(tx_hash)s)
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    # One branch per address column so each walks its own index in order,
+    # rather than an `OR` which can't.
+    'txs.address_page': """
+        (
+            SELECT * FROM txs WHERE from_address = %(address)s
+            ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+        )
+        UNION
+        (
+            SELECT * FROM txs WHERE to_address = %(address)s
+            ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+        )
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.address_page_after': """
+        (
+            SELECT * FROM txs
+            WHERE
+                from_address = %(address)s
+                AND sent_time <= %(time)s
+                AND (sent_time, from_tx_hash) < (%(time)s, %(tx_hash)s)
+            ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+        )
+        UNION
+        (
+            SELECT * FROM txs
+            WHERE
+                to_address = %(address)s
+                AND sent_time <= %(time)s
+                AND (sent_time, from_tx_hash) < (%(time)s, %(tx_hash)s)
+            ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s
+        )
+        ORDER BY sent_time DESC, from_tx_hash DESC LIMIT %(limit)s;
+    """,
+    'txs.bloom_keys': """
+        SELECT from_tx_hash, to_tx_hash, kappa, from_address, to_address
+        FROM txs
+        UNION ALL
+        SELECT to_tx_hash, NULL, kappa, NULL, to_address FROM lost_txs;
+    """,
+    'txs.users_sketch': """
+        SELECT from_address, from_chain_id, received_time FROM txs;
+    """,
+    # Summed in postgres now the values are `numeric`, the bounds on
+    # `sent_time` leave out the partitions outside of them.
+    'txs.volume': """
+        SELECT from_chain_id, sent_token, count(*), sum(sent_value) FROM txs
+        WHERE sent_time >= %s AND sent_time < %s
+        GROUP BY from_chain_id, sent_token;
+    """,
+}
+
+
+def execute(
+    c: Cursor[T],
+    name: str,
+    params: Optional[Union[Sequence[Any], Mapping[str, Any]]] = None
+) -> Cursor[T]:
+    """
+    Execute the statement `name` on `c`, timed under the same name in
+    `explorer_db_statement_duration_seconds`.
+    """
+
+    with DB_LATENCY.labels(name).time():
+        return c.execute(STATEMENTS[name], params, prepare=True)
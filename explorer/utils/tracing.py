@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Callable, Dict, Generator, List, Optional, TypeVar, \
+    cast
+from contextlib import contextmanager
+from functools import wraps
+import threading
+import random
+import json
+import time
+import os
+
+from gevent.local import local
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+#: `file` (JSON lines at `TRACING_FILE`), `otlp` or empty to disable.
+TRACING = os.getenv('TRACING', '')
+TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 1))
+
+
+class Trace:
+    def __init__(self, name: str, **tags: Any) -> None:
+        self.name = name
+        self.tags = tags
+        self.spans: List[Dict[str, Any]] = []
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'tags': self.tags,
+            'start': self.start,
+            'duration': self.duration,
+            'spans': self.spans,
+        }
+
+
+class FileExporter:
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_dict(), default=str)
+
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+
+class OTLPExporter:
+    def __init__(self) -> None:
+        # Optional dependencies, only needed when exporting to a collector.
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import \
+            OTLPSpanExporter
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry import trace
+
+        provider = TracerProvider(
+            resource=Resource.create({'service.name': 'syn-explorer'}))
+        # Endpoint etc. are configured through the `OTEL_EXPORTER_OTLP_*`
+        # env vars.
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        self._trace = trace
+        self._tracer = provider.get_tracer(__name__)
+
+    def export(self, trace: Trace) -> None:
+        start = int(trace.start * 1e9)
+        attributes = {k: str(v) for k, v in trace.tags.items()}
+
+        root = self._tracer.start_span(trace.name,
+                                       start_time=start,
+                                       attributes=attributes)
+        ctx = self._trace.set_span_in_context(root)
+
+        for span in trace.spans:
+            child = self._tracer.start_span(
+                span['stage'],
+                context=ctx,
+                start_time=start + int(span['offset'] * 1e9),
+                attributes=attributes,
+            )
+            child.end(end_time=start +
+                      int((span['offset'] + span['duration']) * 1e9))
+
+        root.end(end_time=start + int(trace.duration * 1e9))
+
+
+_exporter: Any = None
+_local = local()
+
+
+def _get_exporter() -> Any:
+    global _exporter
+
+    if _exporter is None:
+        if TRACING == 'file':
+            _exporter = FileExporter(TRACING_FILE)
+        elif TRACING == 'otlp':
+            _exporter = OTLPExporter()
+        else:
+            raise RuntimeError(f'unknown TRACING exporter: {TRACING!r}')
+
+    return _exporter
+
+
+def current() -> Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def trace(name: str, **tags: Any) -> Generator[Optional[Trace], None, None]:
+    """
+    Start a (sampled) trace for the current greenlet, `span` calls inside of
+    it are recorded against it.
+    """
+
+    if not TRACING or random.random() >= TRACING_SAMPLE_RATE:
+        yield None
+        return
+
+    _trace = Trace(name, **tags)
+    _local.trace = _trace
+
+    try:
+        yield _trace
+    except Exception as e:
+        _trace.tags['error'] = repr(e)
+        raise
+    finally:
+        _local.trace = None
+        _trace.duration = time.perf_counter() - _trace._start
+        _get_exporter().export(_trace)
+
+
+@contextmanager
+def span(stage: str) -> Generator[None, None, None]:
+    if (_trace := current()) is None:
+        yield
+        return
+
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        _trace.spans.append({
+            'stage': stage,
+            'offset': start - _trace._start,
+            'duration': time.perf_counter() - start,
+        })
+
+
+def tag(**tags: Any) -> None:
+    if (_trace := current()) is not None:
+        _trace.tags.update(tags)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Trace every call of the decorated function, tagged with `chain` which is
+    expected to be its first argument.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with trace(name, chain=args[0] if args else kwargs.get('chain')):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
@@ -0,0 +1,162 @@
+-- Partitioned by month of `sent_time`, see `txs_create_partition`. Unique
+-- constraints on it would have to include `sent_time`, the global ones are
+-- on `txs_keys` instead.
+CREATE TABLE IF NOT EXISTS txs (
+    from_tx_hash bytea NOT NULL,
+    to_tx_hash bytea,
+    from_address bytea NOT NULL,
+    to_address bytea NOT NULL,
+    sent_value varchar NOT NULL,
+    received_value varchar,
+    pending boolean DEFAULT true,
+    from_chain_id bigint NOT NULL CHECK (from_chain_id > 0),
+    to_chain_id bigint NOT NULL CHECK (to_chain_id > 0),
+    sent_time bigint NOT NULL,
+    received_time bigint,
+    sent_token bytea NOT NULL,
+    received_token bytea,
+    swap_success boolean,
+    kappa bytea NOT NULL,
+    PRIMARY KEY (from_tx_hash, sent_time)
+) PARTITION BY RANGE (sent_time);
+
+-- Rows outside of every partition, moved out when theirs is created.
+CREATE TABLE IF NOT EXISTS txs_default PARTITION OF txs DEFAULT;
+
+-- The hashes of every row of `txs`, unique across partitions, and the
+-- `sent_time` which finds its partition. Kept in sync by `txs_keys_sync`.
+CREATE TABLE IF NOT EXISTS txs_keys (
+    from_tx_hash bytea PRIMARY KEY,
+    to_tx_hash bytea,
+    kappa bytea UNIQUE NOT NULL,
+    sent_time bigint NOT NULL,
+    CONSTRAINT txs_keys_to_tx_hash_key UNIQUE (to_tx_hash)
+        DEFERRABLE INITIALLY IMMEDIATE
+);
+
+CREATE OR REPLACE FUNCTION txs_keys_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO txs_keys
+        VALUES (NEW.from_tx_hash, NEW.to_tx_hash, NEW.kappa, NEW.sent_time);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE txs_keys
+        SET (from_tx_hash, to_tx_hash, kappa, sent_time) =
+            (NEW.from_tx_hash, NEW.to_tx_hash, NEW.kappa, NEW.sent_time)
+        WHERE from_tx_hash = OLD.from_tx_hash;
+    ELSE
+        DELETE FROM txs_keys WHERE from_tx_hash = OLD.from_tx_hash;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER txs_keys_sync
+    AFTER INSERT OR DELETE OR UPDATE OF from_tx_hash, to_tx_hash, kappa,
+        sent_time
+    ON txs FOR EACH ROW EXECUTE FUNCTION txs_keys_sync();
+
+-- Create the partition of `parent` for `month`, moving in whatever landed in
+-- the default partition for lack of it.
+CREATE OR REPLACE FUNCTION txs_create_partition(parent regclass, month date)
+RETURNS void AS $$
+DECLARE
+    name text := 'txs_' || to_char(month, 'YYYY_MM');
+    lo bigint := extract(epoch FROM month::timestamp);
+    hi bigint := extract(epoch FROM month + interval '1 month');
+    fallback regclass;
+BEGIN
+    IF to_regclass(name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT partdefid::regclass INTO fallback
+    FROM pg_partitioned_table WHERE partrelid = parent;
+
+    -- Their keys go with them and come back once they're reinserted.
+    EXECUTE format('CREATE TEMPORARY TABLE txs_moved ON COMMIT DROP AS '
+                   'SELECT * FROM %s WHERE sent_time >= %s AND sent_time < %s',
+                   fallback, lo, hi);
+    EXECUTE format('DELETE FROM %s WHERE sent_time >= %s AND sent_time < %s',
+                   fallback, lo, hi);
+    EXECUTE format('CREATE TABLE %I PARTITION OF %s '
+                   'FOR VALUES FROM (%s) TO (%s)', name, parent, lo, hi);
+    EXECUTE format('INSERT INTO %s SELECT * FROM txs_moved', parent);
+    DROP TABLE txs_moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the partitions of `parent` from the bridge's launch up to
+-- `months_ahead` months from now.
+CREATE OR REPLACE FUNCTION txs_ensure_partitions(parent regclass,
+                                                 months_ahead int)
+RETURNS void AS $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series('2021-08-01'::date,
+                               date_trunc('month', now())
+                                   + make_interval(months => months_ahead),
+                               interval '1 month')
+    LOOP
+        PERFORM txs_create_partition(parent, month);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS lost_txs (
+    to_tx_hash bytea PRIMARY KEY,
+    to_address bytea NOT NULL,
+    received_value varchar NOT NULL,
+    to_chain_id bigint NOT NULL CHECK (to_chain_id > 0),
+    received_time bigint NOT NULL,
+    received_token bytea NOT NULL,
+    swap_success boolean,
+    kappa bytea UNIQUE NOT NULL
+);
+
+-- Keyset pagination, each matches an `ORDER BY ..., from_tx_hash DESC` in
+-- `explorer/utils/statements.py`.
+CREATE INDEX IF NOT EXISTS idx_from_address_sent_time
+    ON txs(from_address, sent_time DESC, from_tx_hash DESC);
+
+CREATE INDEX IF NOT EXISTS idx_to_address_sent_time
+    ON txs(to_address, sent_time DESC, from_tx_hash DESC);
+
+CREATE INDEX IF NOT EXISTS idx_sent_time
+    ON txs(sent_time DESC, from_tx_hash DESC);
+
+CREATE INDEX IF NOT EXISTS idx_pending_sent_time
+    ON txs(sent_time DESC, from_tx_hash DESC) WHERE pending = true;
+
+CREATE INDEX IF NOT EXISTS idx_received_time
+    ON txs(received_time DESC, from_tx_hash DESC) WHERE pending = false;
+
+-- Filters of `Transaction.filter`, each walked in the same order as above.
+CREATE INDEX IF NOT EXISTS idx_from_chain_id_sent_time
+    ON txs(from_chain_id, sent_time DESC, from_tx_hash DESC);
+
+CREATE INDEX IF NOT EXISTS idx_to_chain_id_sent_time
+    ON txs(to_chain_id, sent_time DESC, from_tx_hash DESC);
+
+CREATE INDEX IF NOT EXISTS idx_sent_token_sent_time
+    ON txs(sent_token, sent_time DESC, from_tx_hash DESC);
+
+-- Failed swaps are rare, walking `idx_sent_time` for them isn't an option.
+CREATE INDEX IF NOT EXISTS idx_failed_swap_sent_time
+    ON txs(sent_time DESC, from_tx_hash DESC) WHERE swap_success = false;
+
+-- Time ranges, `received_time` ones in particular since they can't prune
+-- partitions. Rows are appended in about time order, so these are tiny.
+CREATE INDEX IF NOT EXISTS brin_sent_time ON txs USING brin(sent_time);
+
+CREATE INDEX IF NOT EXISTS brin_received_time ON txs USING brin(received_time);
+
+SELECT txs_ensure_partitions('txs', 3);
+
+-- Superseded by the composite address indexes above.
+DROP INDEX IF EXISTS idx_from_address;
+
+DROP INDEX IF EXISTS idx_to_address;
@@ -0,0 +1,41 @@
+-- `sent_value` and `received_value` as `numeric(78, 0)`, which fits any
+-- uint256, rather than `varchar`. Altering their type in place would rewrite
+-- `txs` under a lock nothing gets past, so instead this adds columns of the
+-- new type, kept in sync with the old by a trigger, 0003 backfills them and
+-- 0004 swaps them in.
+ALTER TABLE txs
+    ADD COLUMN sent_value_numeric numeric(78, 0),
+    ADD COLUMN received_value_numeric numeric(78, 0);
+
+ALTER TABLE lost_txs ADD COLUMN received_value_numeric numeric(78, 0);
+
+CREATE FUNCTION txs_values_numeric() RETURNS trigger AS $$
+BEGIN
+    NEW.sent_value_numeric := NEW.sent_value::numeric;
+    NEW.received_value_numeric := NEW.received_value::numeric;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER txs_values_numeric
+    BEFORE INSERT OR UPDATE OF sent_value, received_value ON txs
+    FOR EACH ROW EXECUTE FUNCTION txs_values_numeric();
+
+CREATE FUNCTION lost_txs_values_numeric() RETURNS trigger AS $$
+BEGIN
+    NEW.received_value_numeric := NEW.received_value::numeric;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER lost_txs_values_numeric
+    BEFORE INSERT OR UPDATE OF received_value ON lost_txs
+    FOR EACH ROW EXECUTE FUNCTION lost_txs_values_numeric();
+
+-- Validated by 0003 while writes go on, then they spare `SET NOT NULL` in
+-- 0004 from scanning the tables for nulls under its lock.
+ALTER TABLE txs ADD CONSTRAINT txs_sent_value_numeric_not_null
+    CHECK (sent_value_numeric IS NOT NULL) NOT VALID;
+
+ALTER TABLE lost_txs ADD CONSTRAINT lost_txs_received_value_numeric_not_null
+    CHECK (received_value_numeric IS NOT NULL) NOT VALID;
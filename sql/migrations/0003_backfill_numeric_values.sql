@@ -0,0 +1,24 @@
+-- migrate: batch
+-- Rows written since 0002 are converted by its triggers, this converts the
+-- ones from before. The partial index finds those left without a scan of
+-- everything converted so far, 0004 drops it.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS txs_values_not_numeric
+    ON txs(from_tx_hash, sent_time) WHERE sent_value_numeric IS NULL;
+
+UPDATE txs SET sent_value_numeric = sent_value::numeric,
+    received_value_numeric = received_value::numeric
+WHERE (from_tx_hash, sent_time) IN (
+    SELECT from_tx_hash, sent_time FROM txs
+    WHERE sent_value_numeric IS NULL LIMIT 5000
+);
+
+UPDATE lost_txs SET received_value_numeric = received_value::numeric
+WHERE to_tx_hash IN (
+    SELECT to_tx_hash FROM lost_txs
+    WHERE received_value_numeric IS NULL LIMIT 5000
+);
+
+ALTER TABLE txs VALIDATE CONSTRAINT txs_sent_value_numeric_not_null;
+
+ALTER TABLE lost_txs
+    VALIDATE CONSTRAINT lost_txs_received_value_numeric_not_null;
@@ -0,0 +1,19 @@
+-- Only catalog changes, the constraints validated by 0003 prove there are
+-- no nulls. The columns end up last, which nothing depends on: every query
+-- names the columns it writes and rows are decoded by column name.
+DROP TRIGGER txs_values_numeric ON txs;
+DROP FUNCTION txs_values_numeric();
+DROP TRIGGER lost_txs_values_numeric ON lost_txs;
+DROP FUNCTION lost_txs_values_numeric();
+DROP INDEX txs_values_not_numeric;
+
+ALTER TABLE txs DROP COLUMN sent_value, DROP COLUMN received_value;
+ALTER TABLE txs RENAME COLUMN sent_value_numeric TO sent_value;
+ALTER TABLE txs RENAME COLUMN received_value_numeric TO received_value;
+ALTER TABLE txs ALTER COLUMN sent_value SET NOT NULL;
+ALTER TABLE txs DROP CONSTRAINT txs_sent_value_numeric_not_null;
+
+ALTER TABLE lost_txs DROP COLUMN received_value;
+ALTER TABLE lost_txs RENAME COLUMN received_value_numeric TO received_value;
+ALTER TABLE lost_txs ALTER COLUMN received_value SET NOT NULL;
+ALTER TABLE lost_txs DROP CONSTRAINT lost_txs_received_value_numeric_not_null;
@@ -7,10 +7,46 @@
           https://www.boost.org/LICENSE_1_0.txt)
 """
 
+from typing import Optional
+import os
+
 from dotenv import find_dotenv, load_dotenv
+import pytest
+
+from tests.rpc_replay import ReplayServer, cassette_path, install
+
+_replay: Optional[ReplayServer] = None
 
 
 def pytest_configure(config) -> None:
+    global _replay
+
+    config.addinivalue_line(
+        'markers', 'rpc: needs the real chains, or a recorded cassette')
     load_dotenv(find_dotenv('.env.sample'))
     # If `.env` exists, let it override the sample env file.
     load_dotenv(override=True)
+
+    # `record` or `replay`, see `tests/rpc_replay.py`.
+    if (mode := os.getenv('RPC_REPLAY')):
+        _replay = install(mode)
+
+
+def pytest_unconfigure(config) -> None:
+    if _replay is not None:
+        _replay.stop()
+
+
+@pytest.fixture(autouse=True)
+def rpc_cassette(request):
+    if _replay is None:
+        yield
+        return
+
+    if _replay.mode == 'replay' and request.node.get_closest_marker('rpc') \
+            and not os.path.exists(cassette_path(request.node.nodeid)):
+        pytest.skip('not recorded, see `make tests-record`')
+
+    _replay.use_cassette(request.node.nodeid)
+    yield
+    _replay.use_cassette(None)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+A local JSON-RPC stand-in which either records every exchange made against
+the real RPCs (`RPC_REPLAY=record`) or serves them back from the fixtures
+(`RPC_REPLAY=replay`) so the suite and benchmarks can run offline. What
+wasn't recorded is answered by a `SyntheticNode` when replaying, tests which
+need the real chains are marked `rpc` and skipped without their cassette.
+
+Every `*_RPC` env var is pointed at `http://127.0.0.1:<port>/<ENV_NAME>`,
+fixtures are kept per test ("cassette") in `tests/fixtures/rpc`, anything
+done outside of a test (e.g. importing `explorer.utils.data`) goes into the
+`_session` cassette.
+"""
+
+from typing import Any, Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import urllib.request
+import threading
+import hashlib
+import json
+import os
+import re
+
+from benchmarks.synthetic_chain import SyntheticNode
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'fixtures', 'rpc')
+SESSION_CASSETTE = '_session'
+
+Cassette = Dict[str, Dict[str, Dict[str, Any]]]
+
+
+def rpc_env_vars() -> List[str]:
+    return [k for k in os.environ if k.endswith('_RPC')]
+
+
+def request_key(method: str, params: Any) -> str:
+    return hashlib.sha256(
+        json.dumps([method, params], sort_keys=True,
+                   separators=(',', ':')).encode()).hexdigest()
+
+
+def cassette_path(name: str) -> str:
+    # Test node ids look like `tests/test_x.py::test_y[param]`.
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+    return os.path.join(FIXTURES_PATH, f'{name}.json')
+
+
+class Server(ThreadingHTTPServer):
+    # Every greenlet of the app can be connecting at once.
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class ReplayServer:
+    def __init__(self, mode: str, upstreams: Dict[str, str]) -> None:
+        assert mode in ('record', 'replay'), mode
+
+        self.mode = mode
+        self.upstreams = upstreams
+        self.calls = 0
+
+        self._lock = threading.Lock()
+        self._cassettes: Dict[str, Cassette] = {}
+        # Position in a key's recorded responses, so a method that is called
+        # multiple times with the same params (`eth_blockNumber`) replays in
+        # the same order it was recorded in.
+        self._cursors: Dict[str, int] = {}
+        self._current = SESSION_CASSETTE
+        self._load(SESSION_CASSETTE)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, the RPC clients reuse their sessions.
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self) -> None:
+                length = int(self.headers['Content-Length'])
+                body = server.handle(self.path.strip('/'),
+                                     self.rfile.read(length))
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._httpd = Server(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._httpd.server_address[1]}'
+
+    def start(self) -> None:
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self.save()
+
+    def endpoint(self, name: str) -> str:
+        return f'{self.url}/{name}'
+
+    def use_cassette(self, name: Optional[str]) -> None:
+        with self._lock:
+            if self.mode == 'record':
+                self._save(self._current)
+
+            self._current = name or SESSION_CASSETTE
+            self._cursors.clear()
+            self._load(self._current)
+
+    def save(self) -> None:
+        with self._lock:
+            for name in self._cassettes:
+                self._save(name)
+
+    def handle(self, chain: str, data: bytes) -> bytes:
+        request = json.loads(data)
+        method, params = request['method'], request.get('params', [])
+        key = request_key(method, params)
+
+        with self._lock:
+            self.calls += 1
+
+            if self.mode == 'replay':
+                response = self._replay(chain, key)
+            else:
+                response = None
+
+        if response is None:
+            response = self._forward(chain, data)
+            response.pop('jsonrpc', None)
+            response.pop('id', None)
+
+        if self.mode == 'record':
+            with self._lock:
+                entry = self._cassettes[self._current].setdefault(
+                    chain, {}).setdefault(key, {
+                        'method': method,
+                        'params': params,
+                        'responses': [],
+                    })
+                entry['responses'].append(response)
+
+        return json.dumps({
+            'jsonrpc': '2.0',
+            'id': request.get('id'),
+            **response
+        }).encode()
+
+    def _replay(self, chain: str, key: str) -> Optional[Dict[str, Any]]:
+        for name in (self._current, SESSION_CASSETTE):
+            entry = self._cassettes[name].get(chain, {}).get(key)
+
+            if entry is not None:
+                cursor = f'{name}:{chain}:{key}'
+                i = self._cursors.get(cursor, 0)
+                self._cursors[cursor] = i + 1
+
+                responses = entry['responses']
+                return responses[min(i, len(responses) - 1)]
+
+        return None
+
+    def _forward(self, chain: str, data: bytes) -> Dict[str, Any]:
+        req = urllib.request.Request(
+            self.upstreams[chain],
+            data=data,
+            headers={'Content-Type': 'application/json'},
+        )
+
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read())
+
+    def _load(self, name: str) -> None:
+        if name in self._cassettes:
+            return
+
+        path = cassette_path(name)
+        if os.path.exists(path):
+            with open(path) as f:
+                self._cassettes[name] = json.load(f)
+        else:
+            self._cassettes[name] = {}
+
+    def _save(self, name: str) -> None:
+        if self.mode != 'record' or not self._cassettes.get(name):
+            return
+
+        os.makedirs(FIXTURES_PATH, exist_ok=True)
+        with open(cassette_path(name), 'w') as f:
+            json.dump(self._cassettes[name], f, indent=1, sort_keys=True)
+
+
+def install(mode: str) -> ReplayServer:
+    """
+    Start a :class:`ReplayServer` and point every `*_RPC` env var at it,
+    this has to happen before `explorer` is imported.
+    """
+
+    names = rpc_env_vars()
+
+    if mode == 'replay':
+        # Stays up for the whole session, it's a daemon thread like ours.
+        fallback = SyntheticNode()
+        fallback.start()
+        upstreams = {k: f'{fallback.url}/{k}' for k in names}
+    else:
+        upstreams = {k: os.environ[k] for k in names}
+
+    server = ReplayServer(mode, upstreams)
+    server.start()
+
+    for name in names:
+        os.environ[name] = server.endpoint(name)
+
+    return server
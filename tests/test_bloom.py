@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import random
+
+from explorer.utils.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    rand = random.Random(0)
+    bloom = BloomFilter(1000, 0.01)
+    values = [rand.randbytes(32) for _ in range(1000)]
+
+    for value in values:
+        bloom.add(value)
+
+    assert all(x in bloom for x in values)
+    assert bloom.count == 1000
+
+
+def test_false_positive_rate():
+    rand = random.Random(1)
+    bloom = BloomFilter(10_000, 0.01)
+
+    for _ in range(10_000):
+        bloom.add(rand.randbytes(20))
+
+    misses = sum(rand.randbytes(20) in bloom for _ in range(20_000))
+
+    assert misses / 20_000 < 0.02
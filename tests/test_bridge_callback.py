@@ -24,6 +24,9 @@ from tests.helper import (eth_get_log, avalanche_bridge_cb, polygon_bridge_cb,
 from explorer.utils.database import Transaction, LostTransaction
 from explorer.utils.data import SYN_DATA
 
+# Real transactions, from the real chains.
+pytestmark = pytest.mark.rpc
+
 
 @pytest.fixture
 def rpcs() -> Dict[str, Web3]:
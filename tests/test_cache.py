@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+These need the Redis of `REDIS_HOST`, only keys under `cache:/test/` and
+tags of random values are written to it.
+"""
+
+from collections import Counter
+import os
+
+from flask import Flask, jsonify
+import simplejson as json
+import pytest
+import gevent
+import redis
+
+from explorer.utils.data import CACHE_REDIS
+from explorer.utils import cache
+
+
+def _redis_up() -> bool:
+    try:
+        return bool(CACHE_REDIS.ping())
+    except redis.RedisError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_up(),
+                                reason='Redis is not reachable')
+
+TAG = os.urandom(32)
+renders: Counter = Counter()
+app = Flask(__name__)
+
+
+@app.route('/test/ttl/<int:ttl>')
+@cache.cached()
+def ttl(ttl: int):
+    renders['ttl'] += 1
+    cache.hint(ttl, [TAG, None])
+    return jsonify(ttl)
+
+
+@app.route('/test/default')
+@cache.cached()
+def default():
+    renders['default'] += 1
+    return jsonify(None)
+
+
+@app.route('/test/missing')
+@cache.cached()
+def missing():
+    renders['missing'] += 1
+    cache.hint(cache.CACHE_PENDING_TTL, [TAG])
+    return jsonify(None), 404
+
+
+@app.route('/test/error')
+@cache.cached()
+def error():
+    renders['error'] += 1
+    return jsonify(None), 500
+
+
+@app.route('/test/racing')
+@cache.cached()
+def racing():
+    renders['racing'] += 1
+    # Ingestion wrote something while this was being rendered.
+    cache.invalidate([os.urandom(32)])
+    return jsonify(None)
+
+
+@pytest.fixture
+def client():
+    renders.clear()
+    yield app.test_client()
+
+    cache._local.clear()
+    for key in CACHE_REDIS.scan_iter('cache:/test/*'):
+        CACHE_REDIS.delete(key)
+    CACHE_REDIS.delete(cache._tag(TAG))
+
+
+def get(client, path: str) -> int:
+    return client.get(path).status_code
+
+
+def test_views_hint_their_ttl(client):
+    assert get(client, '/test/ttl/5') == 200
+    assert 0 < CACHE_REDIS.ttl('cache:/test/ttl/5') <= 5
+    assert get(client, '/test/ttl/5') == 200
+    assert renders['ttl'] == 1
+
+    assert get(client, '/test/default') == 200
+    assert cache.CACHE_TTL - 5 < CACHE_REDIS.ttl('cache:/test/default') \
+        <= cache.CACHE_TTL
+
+    assert get(client, '/test/missing') == 404
+    assert get(client, '/test/missing') == 404
+    assert renders['missing'] == 1
+    assert 0 < CACHE_REDIS.ttl('cache:/test/missing') \
+        <= cache.CACHE_PENDING_TTL
+
+
+def test_some_responses_are_not_cached(client):
+    # A TTL of 0.
+    get(client, '/test/ttl/0')
+    get(client, '/test/ttl/0')
+    assert renders['ttl'] == 2
+
+    get(client, '/test/error')
+    get(client, '/test/error')
+    assert renders['error'] == 2
+    assert not CACHE_REDIS.exists('cache:/test/ttl/0', 'cache:/test/error')
+
+
+def test_invalidation_drops_tagged_entries(client):
+    get(client, '/test/ttl/60')
+    get(client, '/test/missing')
+    get(client, '/test/default')
+    assert CACHE_REDIS.smembers(cache._tag(TAG)) \
+        == {b'cache:/test/ttl/60', b'cache:/test/missing'}
+
+    cache.invalidate([TAG, None])
+
+    assert not CACHE_REDIS.exists('cache:/test/ttl/60', 'cache:/test/missing',
+                                  cache._tag(TAG))
+    assert CACHE_REDIS.exists('cache:/test/default')
+
+    get(client, '/test/ttl/60')
+    get(client, '/test/missing')
+    get(client, '/test/default')
+    assert renders == {'ttl': 2, 'missing': 2, 'default': 1}
+
+
+def test_responses_rendered_during_an_invalidation_are_not_stored(client):
+    get(client, '/test/racing')
+    get(client, '/test/racing')
+
+    assert renders['racing'] == 2
+    assert not CACHE_REDIS.exists('cache:/test/racing')
+
+
+def test_published_invalidations_evict_the_lru(client, monkeypatch):
+    monkeypatch.setattr(cache, '_subscribed', False)
+    subscriber = cache.start_subscriber()
+
+    try:
+        with gevent.Timeout(1):
+            while not cache._subscribed:
+                gevent.sleep(0.01)
+
+        get(client, '/test/ttl/60')
+        assert 'cache:/test/ttl/60' in cache._local
+        generation = cache._generation
+
+        # As another process invalidating it would.
+        CACHE_REDIS.publish(cache._CHANNEL, json.dumps(['cache:/test/ttl/60']))
+
+        with gevent.Timeout(1):
+            while 'cache:/test/ttl/60' in cache._local:
+                gevent.sleep(0.01)
+
+        assert cache._generation > generation
+    finally:
+        subscriber.kill()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import logging
+import time
+import sys
+import re
+
+import gevent.events
+import gevent
+
+from explorer.utils import debug
+
+
+def block_the_hub(seconds: float) -> None:
+    # Neither `gevent.sleep` nor a cooperative `time.sleep`, which switch.
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_blocking_the_hub_is_reported(caplog):
+    caplog.set_level(logging.WARNING)
+    debug.start_blocking_monitor()
+
+    try:
+        gevent.sleep(debug.DEBUG_MAX_BLOCKING_TIME)
+        block_the_hub(debug.DEBUG_MAX_BLOCKING_TIME * 5)
+        gevent.sleep(debug.DEBUG_MAX_BLOCKING_TIME)
+    finally:
+        gevent.events.subscribers.remove(debug._on_event)
+        gevent.get_hub().periodic_monitoring_thread.kill()
+
+    reports = [
+        x.getMessage() for x in caplog.records
+        if x.getMessage().startswith('event loop blocked')
+    ]
+    assert reports
+    assert 'block_the_hub' in reports[0]
+
+
+def test_stacks_are_collapsed_root_first():
+    def outer():
+        return inner()
+
+    def inner():
+        return debug._collapse(sys._getframe())
+
+    frames = outer().split(';')
+
+    assert frames[-2].startswith('outer (')
+    assert frames[-1].startswith('inner (')
+    line = inner.__code__.co_firstlineno
+    assert frames[-1].endswith(f'test_debug.py:{line})')
+
+
+def test_profile_is_in_the_collapsed_format():
+    gevent.spawn(block_the_hub, 0.3)
+    lines = debug.profile(0.2, interval=0.01).splitlines()
+
+    counts = []
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        counts.append(int(count))
+        assert all(re.fullmatch(r'\S+ \(.+:\d+\)', x)
+                   for x in stack.split(';'))
+
+    # Busiest first.
+    assert counts == sorted(counts, reverse=True)
+    assert 'block_the_hub (' in lines[0].split(';')[-1]
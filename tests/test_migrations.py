@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+The ones applying migrations need a scratch database at `TEST_PSQL_URL`,
+they're applied to a throwaway schema.
+"""
+
+from typing import Iterator
+import os
+
+import psycopg
+import pytest
+
+from explorer.utils import migrations
+
+needs_psql = pytest.mark.skipif(not os.getenv('TEST_PSQL_URL'),
+                                reason='TEST_PSQL_URL is not set')
+
+
+def write(path, files):
+    for name, text in files.items():
+        (path / name).write_text(text)
+
+
+def test_load_orders_by_version_and_reads_directives(tmp_path):
+    write(
+        tmp_path, {
+            '0010_backfill.sql': '-- migrate: batch\nUPDATE t SET x = 1;\n',
+            '0002_index.sql': '-- Comment.\n-- migrate: no-transaction\n'
+            'CREATE INDEX CONCURRENTLY i ON t (x);\n',
+            '0001_initial.sql': 'CREATE TABLE t (x int);\n',
+            'README': 'not a migration',
+        })
+
+    loaded = migrations.load(str(tmp_path))
+
+    assert [(x.version, x.name, x.transactional, x.batched)
+            for x in loaded] == [(1, 'initial', True, False),
+                                 (2, 'index', False, False),
+                                 (10, 'backfill', False, True)]
+
+
+def test_load_refuses_ambiguous_migrations(tmp_path):
+    write(tmp_path, {'0001_a.sql': '', '1_b.sql': ''})
+    with pytest.raises(ValueError):
+        migrations.load(str(tmp_path))
+
+    (tmp_path / '1_b.sql').unlink()
+    write(tmp_path, {'0002_c.sql': '-- migrate: no-transactions\n'})
+    with pytest.raises(ValueError):
+        migrations.load(str(tmp_path))
+
+
+def test_statements_are_split_at_line_ends():
+    assert migrations.statements("""
+        -- First.
+        CREATE INDEX CONCURRENTLY a ON t (x);
+
+        UPDATE t SET y = ';' WHERE x IN (
+            SELECT x FROM t LIMIT 10
+        ); -- Trailing.
+        -- Nothing.
+    """) == [
+        'CREATE INDEX CONCURRENTLY a ON t (x)',
+        "UPDATE t SET y = ';' WHERE x IN (\n"
+        '            SELECT x FROM t LIMIT 10\n'
+        '        )',
+    ]
+
+
+@pytest.fixture
+def conn(monkeypatch) -> Iterator[psycopg.Connection]:
+    monkeypatch.setattr(migrations, 'MIGRATE_BATCH_SLEEP', 0)
+    schema = f'test_migrations_{os.getpid()}'
+
+    with psycopg.connect(os.environ['TEST_PSQL_URL'],
+                         autocommit=True) as conn:
+        conn.execute(f'CREATE SCHEMA {schema}')
+        conn.execute(f'SET search_path TO {schema}')
+
+        try:
+            yield conn
+        finally:
+            conn.execute(f'DROP SCHEMA {schema} CASCADE')
+
+
+@needs_psql
+def test_migrate_applies_each_once(conn, tmp_path):
+    write(
+        tmp_path, {
+            '0001_initial.sql': """
+                CREATE TABLE t (x int, y int) PARTITION BY RANGE (x);
+                CREATE TABLE t_low PARTITION OF t FOR VALUES FROM (0) TO (50);
+                CREATE TABLE t_high PARTITION OF t
+                    FOR VALUES FROM (50) TO (100);
+                INSERT INTO t SELECT generate_series(0, 99);
+            """,
+            '0002_index.sql': """-- migrate: no-transaction
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS t_x ON t (x);
+            """,
+            '0003_backfill.sql': """-- migrate: batch
+                UPDATE t SET y = x
+                WHERE x IN (SELECT x FROM t WHERE y IS NULL LIMIT 30);
+            """,
+        })
+    path = str(tmp_path)
+
+    assert [x.version for x in migrations.migrate(conn, path, to=2)] == [1, 2]
+    assert [x.version for x in migrations.migrate(conn, path)] == [3]
+    assert migrations.migrate(conn, path) == []
+    assert migrations.status(conn, path) == ([], [])
+
+    assert conn.execute('SELECT count(*) FROM t WHERE y = x').fetchone() \
+        == (100, )
+    # Valid only once every partition's is attached.
+    assert conn.execute("SELECT indisvalid FROM pg_index "
+                        "WHERE indexrelid = 't_x'::regclass").fetchone() \
+        == (True, )
+    assert conn.execute("SELECT count(*) FROM pg_inherits "
+                        "WHERE inhparent = 't_x'::regclass").fetchone() \
+        == (2, )
+
+    write(tmp_path, {'0002_index.sql': '-- migrate: no-transaction\n'})
+    assert [str(x) for x in migrations.status(conn, path)[1]] \
+        == ['0002 index']
+
+
+@needs_psql
+def test_failed_concurrent_build_is_retried(conn, tmp_path):
+    write(
+        tmp_path, {
+            '0001_initial.sql': """
+                CREATE TABLE t (x int);
+                INSERT INTO t VALUES (1), (1);
+            """,
+            '0002_index.sql': """-- migrate: no-transaction
+                CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS t_x ON t (x);
+            """,
+        })
+    path = str(tmp_path)
+
+    with pytest.raises(psycopg.errors.UniqueViolation):
+        migrations.migrate(conn, path)
+
+    # Left behind, `IF NOT EXISTS` alone would skip it.
+    assert conn.execute("SELECT indisvalid FROM pg_index "
+                        "WHERE indexrelid = 't_x'::regclass").fetchone() \
+        == (False, )
+
+    conn.execute('DELETE FROM t')
+    assert [x.version for x in migrations.migrate(conn, path)] == [2]
+    assert conn.execute("SELECT indisvalid FROM pg_index "
+                        "WHERE indexrelid = 't_x'::regclass").fetchone() \
+        == (True, )
+
+@needs_psql
+def test_batch_migrations_build_indexes_concurrently(conn, tmp_path):
+    write(
+        tmp_path, {
+            '0001_initial.sql': """
+                CREATE TABLE t (x int, y int) PARTITION BY RANGE (x);
+                CREATE TABLE t_all PARTITION OF t
+                    FOR VALUES FROM (0) TO (100);
+                INSERT INTO t SELECT generate_series(0, 99);
+            """,
+            '0002_backfill.sql': """-- migrate: batch
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS t_y ON t(x)
+                    WHERE y IS NULL;
+                UPDATE t SET y = x
+                WHERE x IN (SELECT x FROM t WHERE y IS NULL LIMIT 30);
+            """,
+        })
+
+    assert [x.version for x in migrations.migrate(conn, str(tmp_path))] \
+        == [1, 2]
+    assert conn.execute('SELECT count(*) FROM t WHERE y = x').fetchone() \
+        == (100, )
+    assert conn.execute("SELECT count(*) FROM pg_inherits "
+                        "WHERE inhparent = 't_y'::regclass").fetchone() \
+        == (1, )
+
+
+
+@needs_psql
+def test_values_become_numeric(conn):
+    insert = """
+        INSERT INTO txs (from_tx_hash, from_address, to_address, sent_value,
+                         received_value, from_chain_id, to_chain_id,
+                         sent_time, sent_token, kappa)
+        VALUES (%s, '', '', %s, %s, 1, 2, 1640000000, '', %s)
+    """
+
+    migrations.migrate(conn, to=1)
+    conn.execute(insert, (b'\x01', str(2**255), None, b'\x01'))
+    conn.execute(
+        "INSERT INTO lost_txs VALUES ('', '', '7', 1, 1640000000, '', null, "
+        "'')")
+
+    migrations.migrate(conn, to=2)
+    # By code which still writes strings, while it's backfilled.
+    conn.execute(insert, (b'\x02', '3', '2', b'\x02'))
+    conn.execute("UPDATE txs SET received_value = '1' "
+                 "WHERE from_tx_hash = '\\x01'")
+
+    migrations.migrate(conn)
+    assert conn.execute('SELECT sent_value, received_value FROM txs '
+                        'ORDER BY from_tx_hash').fetchall() \
+        == [(2**255, 1), (3, 2)]
+    assert conn.execute('SELECT sum(sent_value) FROM txs').fetchone() \
+        == (2**255 + 3, )
+    assert conn.execute('SELECT received_value FROM lost_txs').fetchone() \
+        == (7, )
+
+    with pytest.raises(psycopg.errors.NotNullViolation):
+        conn.execute(insert, (b'\x03', None, None, b'\x03'))
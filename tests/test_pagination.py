@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from explorer.utils.pagination import decode_cursor, encode_cursor, \
+    split_page
+
+
+def test_cursor_round_trip():
+    tx_hash = bytes(range(32))
+    cursor = encode_cursor(1640000000, tx_hash)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (1640000000, tx_hash)
+
+
+@pytest.mark.parametrize('cursor', ['', 'zzz', 'AAAA', 'é' * 54])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_split_page():
+    rows = [SimpleNamespace(sent_time=10 - i, from_tx_hash=bytes([i]) * 32)
+            for i in range(4)]
+
+    assert split_page(rows[:3], 3, 'sent_time') == (rows[:3], None)
+
+    page, cursor = split_page(rows, 3, 'sent_time')
+    assert page == rows[:3]
+    assert decode_cursor(cursor) == (8, bytes([2]) * 32)
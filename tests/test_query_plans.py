@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+Pin the plans of the hot statements to the indexes they're written for.
+
+These need a scratch database at `TEST_PSQL_URL`, everything is created in a
+throwaway schema and dropped afterwards.
+"""
+
+from typing import Any, Dict, Iterator, List, Set, Union
+import random
+import os
+
+from psycopg import sql
+import psycopg
+import pytest
+
+from explorer.utils.database import _filter_query
+from explorer.utils import migrations
+from explorer.utils.statements import STATEMENTS
+
+pytestmark = pytest.mark.skipif(not os.getenv('TEST_PSQL_URL'),
+                                reason='TEST_PSQL_URL is not set')
+
+ROWS = 8000
+
+
+@pytest.fixture(scope='module')
+def conn() -> Iterator[psycopg.Connection]:
+    schema = f'test_query_plans_{os.getpid()}'
+
+    with psycopg.connect(os.environ['TEST_PSQL_URL'],
+                         autocommit=True) as conn:
+        conn.execute(f'CREATE SCHEMA {schema}')
+        conn.execute(f'SET search_path TO {schema}')
+
+        try:
+            migrations.migrate(conn)
+
+            rand = random.Random(0)
+            addresses = [rand.randbytes(20) for _ in range(200)]
+            tokens = [rand.randbytes(20) for _ in range(50)]
+
+            with conn.cursor() as c:
+                c.executemany(
+                    'INSERT INTO txs (from_tx_hash, to_tx_hash, '
+                    'from_address, to_address, pending, from_chain_id, '
+                    'to_chain_id, sent_time, received_time, sent_token, '
+                    'received_token, swap_success, kappa, sent_value, '
+                    'received_value) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, '
+                    '%s, %s, %s, %s, %s, 1, 1)',
+                    [(rand.randbytes(32), None if pending else
+                      rand.randbytes(32), rand.choice(addresses),
+                      rand.choice(addresses), pending, rand.randint(1, 20),
+                      rand.randint(1, 20), 1640000000 + i * 900,
+                      None if pending else 1640000060 + i * 900,
+                      rand.choice(tokens), None if pending else bytes(20),
+                      None if pending else rand.random() > 0.01,
+                      rand.randbytes(32))
+                     for i in range(ROWS)
+                     for pending in [rand.random() < 0.1]])
+                c.executemany(
+                    'INSERT INTO lost_txs (to_tx_hash, to_address, '
+                    'to_chain_id, received_time, received_token, kappa, '
+                    'received_value) VALUES (%s, %s, 1, %s, %s, %s, 1)',
+                    [(rand.randbytes(32), rand.choice(addresses),
+                      1640000000 + i, bytes(20), rand.randbytes(32))
+                     for i in range(ROWS // 10)])
+
+            # Empty partitions are planned with whatever index, which says
+            # nothing about how the ones with rows are.
+            with conn.cursor() as c:
+                c.execute("""
+                    SELECT inhrelid::regclass::text FROM pg_inherits
+                    WHERE inhparent = 'txs'::regclass
+                """)
+                for (partition, ) in c.fetchall():
+                    c.execute(sql.SQL('SELECT 1 FROM {} LIMIT 1').format(
+                        sql.Identifier(partition)))
+                    if c.fetchone() is None:
+                        c.execute(sql.SQL('DROP TABLE {}').format(
+                            sql.Identifier(partition)))
+
+            conn.execute('ANALYZE')
+            # The tables are tiny, we care about which index is picked when
+            # one is, not whether a sequential scan is cheaper at this size.
+            conn.execute('SET enable_seqscan = off')
+
+            yield conn
+        finally:
+            conn.execute(f'DROP SCHEMA {schema} CASCADE')
+
+
+def plan(conn: psycopg.Connection, name: str,
+         params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ Every node of the plan of statement `name`. """
+
+    return explain(conn, STATEMENTS[name], params)
+
+
+def explain(conn: psycopg.Connection, query: Union[str, sql.Composable],
+            params: Dict[str, Any],
+            analyze: bool = False) -> List[Dict[str, Any]]:
+    """
+    Every node of the plan of `query`, the index of a partition named after
+    the index of `txs` it's a part of.
+    """
+
+    if isinstance(query, str):
+        query = sql.SQL(query)
+
+    options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+
+    with psycopg.ClientCursor(conn) as c:
+        c.execute(sql.SQL(f'EXPLAIN ({options}) ') + query, params)
+        row = c.fetchone()
+        assert row is not None
+
+        c.execute("""
+            SELECT c.relname, p.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind = 'i'
+        """)
+        parents = dict(c.fetchall())
+
+    nodes, stack = [], [row[0][0]['Plan']]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get('Plans', []))
+
+        if 'Index Name' in node:
+            node['Partition Index Name'] = node['Index Name']
+            node['Index Name'] = parents.get(node['Index Name'],
+                                             node['Index Name'])
+
+    return nodes
+
+
+def indexes(nodes: List[Dict[str, Any]]) -> Set[str]:
+    return {x['Index Name'] for x in nodes if 'Index Name' in x}
+
+
+def types(nodes: List[Dict[str, Any]]) -> Set[str]:
+    return {x['Node Type'] for x in nodes}
+
+
+# Halfway through the rows.
+MIDDLE = 1640000000 + ROWS // 2 * 900
+KEY = {'time': MIDDLE, 'tx_hash': bytes(32), 'limit': 20}
+
+
+# `txs` is found through `txs_keys`, then probed by its primary key or the
+# `(sent_time, from_tx_hash)` one, whichever the planner fancies.
+TXS_KEYS = {'txs_keys_pkey', 'txs_keys_to_tx_hash_key', 'txs_keys_kappa_key'}
+TXS_PROBES = {'txs_pkey', 'idx_sent_time'}
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('txs.search_with_tx_hash', TXS_KEYS),
+    ('lost_txs.search_with_tx_hash', {'lost_txs_pkey', 'lost_txs_kappa_key'}),
+])
+def test_hash_lookups_probe_unique_indexes(conn, name, expected):
+    nodes = plan(conn, name, {'tx_hash': bytes(32)})
+
+    assert expected <= indexes(nodes) <= expected | TXS_PROBES
+    assert 'BitmapOr' not in types(nodes)
+    assert types(nodes) <= {'Limit', 'Append', 'Index Scan', 'Nested Loop'}
+
+
+@pytest.mark.parametrize('name', [
+    'txs.search_with_tx_hash',
+    'txs.search_with_tx_hashes',
+    'txs.update_in',
+])
+def test_hash_lookups_scan_one_partition(conn, name):
+    with conn.cursor() as c:
+        c.execute('SELECT to_tx_hash, kappa FROM txs WHERE NOT pending '
+                  'LIMIT 1')
+        to_tx_hash, kappa = c.fetchone()
+
+    if name == 'txs.update_in':
+        params: Any = (to_tx_hash, '1', 1640000060, bytes(20), True, kappa)
+    else:
+        params = {'tx_hash': kappa, 'tx_hashes': [kappa]}
+
+    # Rolled back, the table is shared by every test.
+    with conn.transaction(force_rollback=True):
+        nodes = explain(conn, STATEMENTS[name], params, analyze=True)
+
+    scanned = {x['Partition Index Name'] for x in nodes
+               if x.get('Index Name') in TXS_PROBES and x['Actual Loops']}
+    assert len(scanned) == 1
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('txs.search_with_tx_hashes', TXS_KEYS),
+    ('lost_txs.search_with_tx_hashes',
+     {'lost_txs_pkey', 'lost_txs_kappa_key'}),
+])
+def test_batched_hash_lookups_probe_unique_indexes(conn, name, expected):
+    nodes = plan(conn, name, {'tx_hashes': [bytes(32), b'\x01' * 32]})
+
+    assert expected <= indexes(nodes) <= expected | TXS_PROBES
+    assert 'Seq Scan' not in types(nodes)
+
+
+def test_batched_address_lookups_use_address_indexes(conn):
+    nodes = plan(conn, 'txs.search_with_addresses', {
+        'addresses': [bytes(20), b'\x01' * 20],
+        'limit': 20
+    })
+
+    assert indexes(nodes) == {'idx_from_address_sent_time',
+                              'idx_to_address_sent_time'}
+    assert 'Seq Scan' not in types(nodes)
+    assert 'BitmapOr' not in types(nodes)
+
+
+@pytest.mark.parametrize('name', [
+    'txs.search_with_address',
+    'txs.address_page',
+    'txs.address_page_after',
+])
+def test_address_lookups_use_address_indexes(conn, name):
+    nodes = plan(conn, name, {'address': bytes(20), **KEY})
+
+    assert indexes(nodes) == {'idx_from_address_sent_time',
+                              'idx_to_address_sent_time'}
+    assert 'BitmapOr' not in types(nodes)
+
+
+@pytest.mark.parametrize('name,expected', [
+    ('txs.recent', 'idx_received_time'),
+    ('txs.recent_after', 'idx_received_time'),
+    ('txs.recent_pending', 'idx_pending_sent_time'),
+    ('txs.recent_pending_after', 'idx_pending_sent_time'),
+    ('txs.recent_including_pending', 'idx_sent_time'),
+    ('txs.recent_including_pending_after', 'idx_sent_time'),
+])
+def test_recent_pages_are_index_range_scans(conn, name, expected):
+    nodes = plan(conn, name, KEY)
+
+    assert indexes(nodes) == {expected}
+    # Read in index order, a deep page costs the same as the first.
+    assert 'Sort' not in types(nodes)
+
+
+@pytest.mark.parametrize('filters,expected', [
+    ({}, 'idx_sent_time'),
+    ({'from_chain_id': 1}, 'idx_from_chain_id_sent_time'),
+    ({'to_chain_id': 1}, 'idx_to_chain_id_sent_time'),
+    ({'token': bytes(20)}, 'idx_sent_token_sent_time'),
+    ({'from_time': MIDDLE - 86400, 'to_time': MIDDLE}, 'idx_sent_time'),
+    ({'pending': True}, 'idx_pending_sent_time'),
+    ({'swap_success': False}, 'idx_failed_swap_sent_time'),
+])
+def test_filters_are_index_range_scans(conn, filters, expected):
+    for after in (None, (MIDDLE, bytes(32))):
+        query, params = _filter_query(filters, 21, after)
+        nodes = explain(conn, query, params)
+
+        assert expected in indexes(nodes)
+        assert 'Sort' not in types(nodes)
+
+
+def test_volume_is_summed_over_the_partitions_in_range(conn):
+    # The day before `MIDDLE`, all within one month.
+    nodes = explain(conn, STATEMENTS['txs.volume'],
+                    [MIDDLE - 86400, MIDDLE])
+
+    assert 'Aggregate' in types(nodes)
+    assert len({x['Relation Name']
+                for x in nodes if 'Relation Name' in x}) == 1
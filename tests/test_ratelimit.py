@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import time
+
+import gevent
+import pytest
+
+from explorer.utils.ratelimit import CircuitBreaker, CircuitOpenError, \
+    Endpoint, State, TokenBucket
+from explorer.utils.helpers import retry
+
+
+def test_bucket_throttles_after_burst() -> None:
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.monotonic()
+
+    for _ in range(4):
+        bucket.acquire()
+
+    # 2 tokens in the bucket, the other 2 need 1/20s each.
+    assert time.monotonic() - start >= 0.09
+
+
+def test_breaker_opens_and_half_opens() -> None:
+    breaker = CircuitBreaker('test', threshold=2, cooldown=0.05)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == State.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == State.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == State.HALF_OPEN
+
+    # Only a single probe is allowed through while half open.
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == State.CLOSED
+
+
+def test_endpoint_counts_throttled_responses() -> None:
+    endpoint = Endpoint('test', rps=0, threshold=1, cooldown=60)
+    throttled = {'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32005}}
+
+    assert endpoint.call(lambda: throttled) == throttled  # type: ignore
+    assert endpoint.breaker.state == State.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        endpoint.call(lambda: throttled)  # type: ignore
+
+
+def test_killed_probe_reopens_the_circuit() -> None:
+    endpoint = Endpoint('test', rps=0, threshold=1, cooldown=0)
+    endpoint.breaker.record_failure()
+
+    def killed():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        endpoint.call(killed)  # type: ignore
+
+    # Not stuck waiting on the probe, the next one goes through.
+    assert endpoint.breaker.state == State.OPEN
+    assert endpoint.call(lambda: {'result': 1}) == {'result': 1}
+    assert endpoint.breaker.state == State.CLOSED
+
+
+def test_probe_killed_waiting_for_a_token_is_not_stuck() -> None:
+    endpoint = Endpoint('test', rps=10, threshold=1, cooldown=0)
+    endpoint.breaker.record_failure()
+    endpoint.bucket.tokens = 0
+
+    probe = gevent.spawn(endpoint.call, lambda: {'result': 1})
+    gevent.sleep(0.05)
+    probe.kill()
+
+    # It never got to probe, the next call does.
+    assert not endpoint.breaker._probing
+    assert endpoint.call(lambda: {'result': 1}) == {'result': 1}
+    assert endpoint.breaker.state == State.CLOSED
+
+
+def test_retry_gives_up_on_an_open_circuit() -> None:
+    calls = []
+
+    def down():
+        calls.append(time.monotonic())
+        raise CircuitOpenError('test', 0.3)
+
+    start = time.monotonic()
+    # A single attempt backs off for a second.
+    assert retry(down, attempts=1) is None
+    assert 1 <= time.monotonic() - start < 1.5
+    # At 0, .3, .6, .9 and the last at the deadline.
+    assert len(calls) == 5
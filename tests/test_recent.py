@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+
+The ones going through Redis need the one of `REDIS_HOST`, they replace the
+views in it.
+"""
+
+from typing import Any, Dict, List
+import dataclasses
+import random
+import json
+
+import pytest
+import redis
+
+from explorer.utils.database import Transaction
+from explorer.utils.data import TOKEN_DECIMALS, CHAINS_REVERSED, RECENT_REDIS
+from explorer.utils.recent import VIEWS, _END, _KEY, _READY, _members
+from explorer.utils import pagination, recent
+
+
+def _redis_up() -> bool:
+    try:
+        return bool(RECENT_REDIS.ping())
+    except redis.RedisError:
+        return False
+
+
+needs_redis = pytest.mark.skipif(not _redis_up(),
+                                 reason='Redis is not reachable')
+
+
+def transaction(rand: random.Random, pending: bool) -> Transaction:
+    token = bytes.fromhex(next(iter(TOKEN_DECIMALS['ethereum']))[2:])
+    sent_time = rand.randrange(1640000000, 1640000100)
+
+    return Transaction(
+        from_tx_hash=rand.randbytes(32),
+        to_tx_hash=None if pending else rand.randbytes(32),
+        from_address=rand.randbytes(20),
+        to_address=rand.randbytes(20),
+        sent_value=str(10**18),
+        received_value=None if pending else str(10**18),
+        pending=pending,
+        from_chain_id=CHAINS_REVERSED['ethereum'],
+        to_chain_id=CHAINS_REVERSED['ethereum'],
+        sent_time=sent_time,
+        received_time=None if pending else sent_time + rand.randrange(100),
+        received_token=None if pending else token,
+        sent_token=token,
+        swap_success=None if pending else True,
+        kappa=rand.randbytes(32),
+    )
+
+
+def test_members_sort_in_keyset_order():
+    rand = random.Random(0)
+    # Plenty of rows sharing a timestamp, so `from_tx_hash` breaks ties.
+    txs = [transaction(rand, rand.random() < 0.3) for _ in range(500)]
+
+    for view, (_, attr) in VIEWS.items():
+        members = [(m, tx) for tx in txs
+                   if (m := _members(tx)[view]) is not None]
+        expected = sorted((getattr(tx, attr), bytes(tx.from_tx_hash))
+                          for _, tx in members)
+
+        assert [_KEY.unpack(m[:_KEY.size]) for m, _ in sorted(members)] \
+            == expected
+        if view != 'all':
+            assert {tx.pending for _, tx in members} == {view == 'pending'}
+
+
+def test_members_sort_below_the_end_of_their_key():
+    tx = transaction(random.Random(1), False)
+
+    for member in _members(tx).values():
+        if member is None:
+            continue
+
+        key = member[:_KEY.size]
+        assert key < member < key + _END
+
+
+def row(tx: Transaction) -> Dict[str, Any]:
+    """ The `txs` row of `tx`, as ingestion hands it to `recent.add`. """
+
+    return {
+        x.name: getattr(tx, x.name)
+        for x in dataclasses.fields(Transaction) if x.init
+    }
+
+
+def page(view: str, limit: int, cursor: str = None) -> Any:
+    after = None if cursor is None else pagination.decode_cursor(cursor)
+
+    if (ret := recent.page(view, limit, after)) is None:
+        return None
+
+    txs, cursor = ret
+    return [json.loads(x)['from_tx_hash'] for x in txs], cursor
+
+
+def newest_first(txs: List[Transaction], attr: str) -> List[str]:
+    return [
+        '0x' + bytes(x.from_tx_hash).hex() for x in sorted(
+            txs, key=lambda x: (getattr(x, attr), bytes(x.from_tx_hash)),
+            reverse=True)
+    ]
+
+
+@pytest.fixture
+def views(monkeypatch):
+    monkeypatch.setattr(recent, 'RECENT_SIZE', 4)
+    keys = [f'recent:{x}{y}' for x in VIEWS for y in ('', ':floor')]
+
+    RECENT_REDIS.delete(*keys)
+    RECENT_REDIS.set(_READY, 1)
+    yield
+    RECENT_REDIS.delete(_READY, *keys)
+
+
+@needs_redis
+def test_pages_follow_their_cursor(views):
+    rand = random.Random(2)
+    txs = [transaction(rand, False) for _ in range(3)]
+    for tx in txs:
+        recent.add(row(tx))
+
+    expected = newest_first(txs, 'received_time')
+    first, cursor = page('completed', 2)
+    assert first == expected[:2]
+    assert page('completed', 2, cursor) == (expected[2:], None)
+
+    RECENT_REDIS.delete(_READY)
+    assert page('completed', 2) is None
+
+
+@needs_redis
+def test_trimmed_views_leave_the_rest_to_postgres(views):
+    rand = random.Random(3)
+    txs = [transaction(rand, False) for _ in range(6)]
+    for tx in txs:
+        recent.add(row(tx))
+
+    expected = newest_first(txs, 'received_time')
+    assert RECENT_REDIS.zcard('recent:completed') == 4
+
+    first, cursor = page('completed', 2)
+    assert first == expected[:2]
+    second, cursor = page('completed', 1, cursor)
+    assert second == expected[2:3]
+    # Only the 4th is left, what's after it may be missing.
+    assert page('completed', 1, cursor) is None
+
+
+@needs_redis
+def test_completed_transactions_replace_pending_ones(views):
+    rand = random.Random(4)
+    pending = transaction(rand, True)
+    completed = dataclasses.replace(
+        transaction(rand, False),
+        from_tx_hash=pending.from_tx_hash,
+        sent_time=pending.sent_time,
+        received_time=pending.sent_time + 60,
+    )
+
+    recent.add(row(pending))
+    assert page('pending', 10) == (newest_first([pending], 'sent_time'), None)
+
+    recent.add(row(completed))
+    # An OUT event racing the IN event is too late.
+    recent.add(row(pending))
+
+    assert page('pending', 10) == ([], None)
+    for view in ('completed', 'all'):
+        members = RECENT_REDIS.zrange(f'recent:{view}', 0, -1)
+        assert [json.loads(x[_KEY.size:])['pending'] for x in members] \
+            == [False]
+
+
+def test_rows_which_cant_be_decoded_are_skipped():
+    unknown = row(transaction(random.Random(5), False))
+    unknown['sent_token'] = b'\x01' * 20
+
+    assert recent._transaction(unknown) is None
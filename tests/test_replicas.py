@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from collections import deque
+import math
+
+import pytest
+
+from explorer.utils.database import Transaction
+from explorer.utils.data import PSQL_API
+from explorer.utils import database, replicas
+
+REPLICA = object()
+
+
+def transaction(pending: bool) -> Transaction:
+    # `_stale` only looks at `pending`.
+    tx = object.__new__(Transaction)
+    tx.pending = pending
+
+    return tx
+
+
+def test_lag_is_since_the_primary_was_where_the_replica_is():
+    samples = deque([(100.0, 10), (101.0, 20), (102.0, 20), (103.0, 30)])
+
+    assert replicas.lag(samples, 30, 103.5) == 0.5
+    assert replicas.lag(samples, 35, 103.5) == 0.5
+    # An idle primary, the replica is as far as it'll go.
+    assert replicas.lag(samples, 20, 103.5) == 1.5
+    assert replicas.lag(samples, 15, 103.5) == 3.5
+    # Further behind than we remember.
+    assert math.isinf(replicas.lag(samples, 5, 103.5))
+    assert math.isinf(replicas.lag(deque(), 5, 103.5))
+
+
+def test_reads_go_to_the_primary_without_a_replica(monkeypatch):
+    monkeypatch.setattr(replicas, '_healthy', [])
+    assert replicas.pool() is PSQL_API
+
+    monkeypatch.setattr(replicas, '_healthy', [REPLICA])
+    assert replicas.pool() is REPLICA
+    assert replicas.pool(fresh=True) is PSQL_API
+
+
+@pytest.mark.parametrize('on_replica,asks_primary', [
+    (None, True),
+    (transaction(pending=True), True),
+    (transaction(pending=False), False),
+])
+def test_hash_lookups_fall_back_to_the_primary(monkeypatch, on_replica,
+                                               asks_primary):
+    found = {REPLICA: on_replica, PSQL_API: transaction(pending=False)}
+    asked = []
+
+    def search(pool, tx_hash):
+        asked.append(pool)
+        return None if found[pool] is None else (found[pool], 'from')
+
+    monkeypatch.setattr(database, '_search_with_tx_hash', search)
+    monkeypatch.setattr(replicas, '_healthy', [REPLICA])
+
+    ret = Transaction.search_with_tx_hash(b'\x01' * 32)
+
+    assert asked == ([REPLICA, PSQL_API] if asks_primary else [REPLICA])
+    assert ret[0] is found[asked[-1]]
+
+    # Without replicas there's nothing to fall back to.
+    monkeypatch.setattr(replicas, '_healthy', [])
+    asked.clear()
+    Transaction.search_with_tx_hash(b'\x01' * 32)
+    assert asked == [PSQL_API]
+
+
+def test_batched_lookups_fall_back_for_the_stale_only(monkeypatch):
+    hashes = [b'\x01', b'\x02', b'\x03']
+    fresh, pending = transaction(pending=False), transaction(pending=True)
+    asked = []
+
+    def search(pool, tx_hashes):
+        asked.append((pool, tx_hashes))
+
+        if pool is REPLICA:
+            return {b'\x01': fresh, b'\x02': pending}
+        return {b'\x02': fresh}
+
+    monkeypatch.setattr(database, '_search_with_tx_hashes', search)
+    monkeypatch.setattr(replicas, '_healthy', [REPLICA])
+
+    assert Transaction.search_with_tx_hashes(hashes) \
+        == {b'\x01': fresh, b'\x02': fresh}
+    assert asked == [(REPLICA, hashes), (PSQL_API, [b'\x02', b'\x03'])]
+
+
+class Asked(Exception):
+    pass
+
+
+@pytest.mark.parametrize('read', [
+    lambda: Transaction.search_with_address(b'\x01' * 20),
+    lambda: next(Transaction.stream_with_address(b'\x01' * 20)),
+    lambda: Transaction.page_with_address(b'\x01' * 20, 10),
+])
+def test_address_reads_go_to_the_primary(monkeypatch, read):
+    asked = []
+
+    def pool(fresh=False):
+        asked.append(fresh)
+        raise Asked
+
+    monkeypatch.setattr(replicas, 'pool', pool)
+
+    with pytest.raises(Asked):
+        read()
+
+    assert asked == [True]
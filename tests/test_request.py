@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import threading
+import json
+
+from explorer.patches import request
+
+
+def test_only_results_deep_enough_are_cached(tmp_path, monkeypatch):
+    head = 100
+    blocks = {'0xa': 90, '0xb': 95}
+    posts = []
+
+    def post(endpoint_uri, data, *args, **kwargs):
+        body = json.loads(data)
+        method, params = body['method'], body['params']
+        posts.append(method)
+
+        if method == 'eth_chainId':
+            result = '0x1'
+        elif method == 'eth_blockNumber':
+            result = hex(head)
+        else:
+            result = {'blockNumber': hex(blocks[params[0]])}
+
+        return json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': result})
+
+    monkeypatch.setattr(request, '_post', post)
+    monkeypatch.setattr(request, '_disk_cache',
+                        request.DiskCache(str(tmp_path / 'rpc.db'), 2**20))
+    monkeypatch.setattr(request, '_disk_cache_init', True)
+    monkeypatch.setattr(request, '_confirmations', 10)
+    monkeypatch.setattr(request, '_head_interval', 60)
+    monkeypatch.setattr(request, '_chain_ids', {})
+    monkeypatch.setattr(request, '_heads', {})
+
+    def receipts(tx_hash):
+        posts.clear()
+        for _ in range(2):
+            request.make_post_request(
+                'http://node',
+                json.dumps({
+                    'jsonrpc': '2.0',
+                    'id': 1,
+                    'method': 'eth_getTransactionReceipt',
+                    'params': [tx_hash],
+                }).encode())
+
+        return posts.count('eth_getTransactionReceipt')
+
+    assert receipts('0xa') == 1
+    assert posts.count('eth_blockNumber') == 1
+    # Could still be reorged, and the head isn't asked for again that soon.
+    assert receipts('0xb') == 2
+    assert posts.count('eth_blockNumber') == 0
+
+    head = 105
+    assert receipts('0xb') == 2
+
+    monkeypatch.setattr(request, '_head_interval', 0)
+    assert receipts('0xb') == 1
+    assert posts.count('eth_blockNumber') == 1
+
+
+def test_disk_cache_runs_off_the_hub(tmp_path):
+    cache = request.DiskCache(str(tmp_path / 'rpc.db'), 100)
+
+    assert cache._pool.apply(threading.get_ident) != threading.get_ident()
+
+    for i in range(20):
+        cache.set(bytes([i]), b'x' * 10)
+
+    # The oldest are evicted down to 90% of `max_bytes`.
+    assert cache.size <= 90
+    assert cache.get(bytes([0])) is None
+    assert cache.get(bytes([19])) == b'x' * 10
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from typing import Any, Dict
+from decimal import Decimal
+
+import pytest
+
+from explorer.utils.database import Transaction, LostTransaction, fast_row
+from explorer.utils.postgres import IntNumericLoader
+from explorer.utils.data import TOKEN_DECIMALS, CHAINS_REVERSED
+
+
+class Column:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class Cursor:
+    def __init__(self, row: Dict[str, Any]) -> None:
+        self.description = [Column(x) for x in row]
+
+
+def token(chain: str) -> bytes:
+    return bytes.fromhex(next(iter(TOKEN_DECIMALS[chain]))[2:])
+
+
+# What `numeric` loads as with `numerics_as_ints` and without.
+@pytest.mark.parametrize('numeric', [int, Decimal])
+@pytest.mark.parametrize('pending', [True, False])
+def test_transaction(pending: bool, numeric: type) -> None:
+    # Column order of `txs`, not of the dataclass.
+    row = {
+        'from_tx_hash': b'\x01' * 32,
+        'to_tx_hash': None if pending else b'\x02' * 32,
+        'from_address': b'\x03' * 20,
+        'to_address': b'\x04' * 20,
+        'pending': pending,
+        'from_chain_id': CHAINS_REVERSED['ethereum'],
+        'to_chain_id': CHAINS_REVERSED['bsc'],
+        'sent_time': 1640000000,
+        'received_time': None if pending else 1640000100,
+        'sent_token': token('ethereum'),
+        'received_token': None if pending else token('bsc'),
+        'swap_success': None if pending else True,
+        'kappa': b'\x05' * 32,
+        'sent_value': numeric(2**70),
+        'received_value': None if pending else numeric(2**69),
+    }
+
+    expected = Transaction(**row)
+    got = fast_row(Transaction)(Cursor(row))(tuple(row.values()))
+
+    assert got == expected
+    assert list(got.__dict__) == list(expected.__dict__)
+    assert got.sent_value.__class__ is int
+
+
+@pytest.mark.parametrize('numeric', [int, Decimal])
+def test_lost_transaction(numeric: type) -> None:
+    row = {
+        'to_tx_hash': b'\x02' * 32,
+        'to_address': b'\x04' * 20,
+        'received_value': numeric(1000),
+        'to_chain_id': CHAINS_REVERSED['bsc'],
+        'received_time': 1640000100,
+        'received_token': token('bsc'),
+        'swap_success': None,
+        'kappa': b'\x05' * 32,
+    }
+
+    expected = LostTransaction(**row)
+    got = fast_row(LostTransaction)(Cursor(row))(tuple(row.values()))
+
+    assert got == expected
+    assert list(got.__dict__) == list(expected.__dict__)
+
+
+def test_numerics_load_as_ints() -> None:
+    loader = IntNumericLoader(0)
+
+    assert loader.load(b'1' * 78).__class__ is int
+    assert loader.load(memoryview(b'-42')) == -42
+    # Sums are whole, averages aren't.
+    assert loader.load(b'2.50') == Decimal('2.50')
+    assert loader.load(b'NaN').is_nan()
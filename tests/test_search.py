@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import random
+
+import pytest
+
+from explorer.routes.api.v1 import search
+from explorer.utils.database import Transaction
+from explorer.utils.data import CHAINS_REVERSED, TOKEN_DECIMALS
+from explorer.utils import bloom
+import explorer
+
+rand = random.Random(0)
+TOKEN = bytes.fromhex(next(iter(TOKEN_DECIMALS['ethereum']))[2:])
+TX = Transaction(
+    from_tx_hash=rand.randbytes(32),
+    to_tx_hash=rand.randbytes(32),
+    from_address=rand.randbytes(20),
+    to_address=rand.randbytes(20),
+    sent_value=10**18,
+    received_value=10**18,
+    pending=False,
+    from_chain_id=CHAINS_REVERSED['ethereum'],
+    to_chain_id=CHAINS_REVERSED['ethereum'],
+    sent_time=1640000000,
+    received_time=1640000060,
+    received_token=TOKEN,
+    sent_token=TOKEN,
+    swap_success=True,
+    kappa=rand.randbytes(32),
+)
+# Indexed, but nothing's there.
+GONE_HASH = rand.randbytes(32)
+# Never indexed.
+UNKNOWN_ADDRESS = rand.randbytes(20)
+
+
+def hex_(value: bytes, upper: bool = False) -> str:
+    value = bytes(value).hex()
+    return '0x' + (value.upper() if upper else value)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    asked = {}
+    indexed = {GONE_HASH}
+    indexed.update(bytes(x) for x in (TX.from_tx_hash, TX.kappa,
+                                      TX.from_address))
+
+    def search_with_tx_hashes(tx_hashes):
+        asked['tx_hashes'] = list(tx_hashes)
+        return {
+            x: TX
+            for x in tx_hashes if x in (TX.from_tx_hash, TX.kappa)
+        }
+
+    def search_with_addresses(addresses, limit):
+        asked['addresses'] = list(addresses)
+        asked['limit'] = limit
+        return {x: [TX] for x in addresses if x == TX.from_address}
+
+    monkeypatch.setattr(bloom, 'might_contain', lambda x: x in indexed)
+    monkeypatch.setattr(Transaction, 'search_with_tx_hashes',
+                        staticmethod(search_with_tx_hashes))
+    monkeypatch.setattr(Transaction, 'search_with_addresses',
+                        staticmethod(search_with_addresses))
+
+    client = explorer.init().test_client()
+    client.asked = asked
+
+    yield client
+
+
+def test_batch_maps_every_input_as_given(client):
+    queries = [
+        hex_(TX.from_tx_hash),
+        hex_(TX.kappa, upper=True),
+        hex_(TX.from_address),
+        hex_(TX.from_address, upper=True),
+        hex_(GONE_HASH),
+        hex_(UNKNOWN_ADDRESS),
+    ]
+
+    res = client.post('/api/v1/search/batch', json=queries)
+
+    assert res.status_code == 200
+    assert set(res.json) == set(queries)
+    assert res.json[queries[0]]['kappa'] == hex_(TX.kappa)
+    assert res.json[queries[1]] == res.json[queries[0]]
+    assert [x['kappa'] for x in res.json[queries[2]]] \
+        == [hex_(TX.kappa)]
+    assert res.json[queries[3]] == res.json[queries[2]]
+    assert res.json[queries[4]] is None
+    assert res.json[queries[5]] is None
+
+    # Once per value, the one the Bloom filter rules out not at all.
+    assert client.asked == {
+        'tx_hashes': [TX.from_tx_hash, TX.kappa, GONE_HASH],
+        'addresses': [TX.from_address],
+        'limit': search.BATCH_ADDRESS_LIMIT,
+    }
+
+
+def test_batch_skips_queries_it_has_nothing_to_ask(client):
+    res = client.post('/api/v1/search/batch',
+                      json=[hex_(UNKNOWN_ADDRESS)])
+
+    assert res.json == {hex_(UNKNOWN_ADDRESS): None}
+    assert client.asked == {}
+
+
+@pytest.mark.parametrize('body', [
+    {'a': 1},
+    [1],
+    '0x' + '11' * 32,
+])
+def test_batch_refuses_anything_but_an_array_of_strings(client, body):
+    res = client.post('/api/v1/search/batch', json=body)
+
+    assert res.status_code == 400
+    assert 'error' in res.json
+
+
+def test_batch_lists_the_invalid_queries(client):
+    res = client.post('/api/v1/search/batch',
+                      json=['0x' + '11' * 32, '0x12', '11' * 20])
+
+    assert res.status_code == 400
+    assert res.json['invalid'] == ['0x12', '11' * 20]
+    assert client.asked == {}
+
+
+def test_batch_takes_at_most_batch_max(client, monkeypatch):
+    monkeypatch.setattr(search, 'BATCH_MAX', 2)
+
+    assert client.post('/api/v1/search/batch',
+                       json=['0x' + '11' * 32] * 2).status_code == 200
+    assert client.post('/api/v1/search/batch',
+                       json=['0x' + '11' * 32] * 3).status_code == 400
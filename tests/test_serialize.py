@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from hexbytes import HexBytes
+import simplejson as json
+import pytest
+
+from explorer.utils.serialize import CustomJSONEncoder, dumps
+from explorer.utils.data import TOKEN_DECIMALS, CHAINS_REVERSED
+from explorer.utils.database import Transaction, LostTransaction
+
+
+def token(chain: str) -> HexBytes:
+    return HexBytes(next(iter(TOKEN_DECIMALS[chain])))
+
+
+def expected(obj) -> str:
+    return json.dumps(obj,
+                      cls=CustomJSONEncoder,
+                      sort_keys=True,
+                      separators=(',', ':'))
+
+
+@pytest.mark.parametrize('value', [1, 2**53 - 1, 2**53, 2**200])
+def test_transaction(value: int) -> None:
+    txs = [
+        Transaction(HexBytes(b'\x01' * 32), None, HexBytes(b'\x03' * 20),
+                    HexBytes(b'\x04' * 20), value, None, True,
+                    CHAINS_REVERSED['ethereum'], CHAINS_REVERSED['bsc'],
+                    1640000000, None, None, token('ethereum'), None,
+                    HexBytes(b'\x05' * 32)),
+        Transaction(HexBytes(b'\x01' * 32), HexBytes(b'\x02' * 32),
+                    HexBytes(b'\x03' * 20), HexBytes(b'\x04' * 20), value,
+                    value - 1, False, CHAINS_REVERSED['ethereum'],
+                    CHAINS_REVERSED['bsc'], 1640000000, 1640000100,
+                    token('bsc'), token('ethereum'), False,
+                    HexBytes(b'\x05' * 32)),
+    ]
+
+    assert dumps(txs[0]) == expected(txs[0])
+    assert dumps(txs) == expected(txs)
+
+    batch = {'0xb': txs, '0xa': txs[1], '0xc': None}
+    assert dumps(batch) == expected(batch)
+
+
+def test_lost_transaction() -> None:
+    tx = LostTransaction(HexBytes(b'\x02' * 32), HexBytes(b'\x04' * 20),
+                         2**60, CHAINS_REVERSED['bsc'], 1640000100,
+                         token('bsc'), None, HexBytes(b'\x05' * 32))
+
+    assert dumps(tx) == expected(tx)
+
+
+@pytest.mark.parametrize('obj', [None, [], {'error': 'x'}, {}, {1: 'x'}, 12])
+def test_fallback(obj) -> None:
+    assert dumps(obj) == expected(obj)
+
+
+def test_fallback_stringifies_unsafe_ints() -> None:
+    obj = [{'count': 2**53 - 1, 'volume': 2**53}, -2**60]
+
+    assert dumps(obj) == ('[{"count":9007199254740991,'
+                          '"volume":"9007199254740992"},'
+                          '"-1152921504606846976"]')
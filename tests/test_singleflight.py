@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+from flask import Flask
+from flask.wrappers import Response
+import gevent
+import pytest
+
+from explorer.utils.singleflight import share
+
+app = Flask(__name__)
+
+
+def burst(render, n=10):
+    def request():
+        with app.test_request_context('/'):
+            return share('key', render)
+
+    jobs = [gevent.spawn(request) for _ in range(n)]
+    gevent.joinall(jobs)
+
+    return jobs
+
+
+def test_concurrent_requests_share_one_render():
+    calls = []
+
+    def render():
+        calls.append(None)
+        gevent.sleep(0.05)
+        return Response('[]', 200, {'Link': '<next>; rel="next"'})
+
+    jobs = burst(render)
+
+    assert len(calls) == 1
+    for job in jobs:
+        assert job.value.get_data() == b'[]'
+        assert job.value.headers['Link'] == '<next>; rel="next"'
+
+    # Nothing is kept once it's done.
+    burst(render)
+    assert len(calls) == 2
+
+
+def test_exception_is_shared():
+    calls = []
+
+    def render():
+        calls.append(None)
+        gevent.sleep(0.05)
+        raise RuntimeError('boom')
+
+    jobs = burst(render)
+
+    assert len(calls) == 1
+    for job in jobs:
+        with pytest.raises(RuntimeError):
+            job.get()
+
+
+def test_streamed_responses_are_not_shared():
+    calls = []
+
+    def render():
+        calls.append(None)
+        gevent.sleep(0.05)
+        return Response(iter(['[]']))
+
+    burst(render, 3)
+    assert len(calls) == 3
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import json
+
+import pytest
+
+from explorer.utils import tracing
+
+
+@pytest.fixture
+def traces(monkeypatch, tmp_path):
+    path = tmp_path / 'traces.jsonl'
+
+    monkeypatch.setattr(tracing, 'TRACING', 'file')
+    monkeypatch.setattr(tracing, 'TRACING_SAMPLE_RATE', 1)
+    monkeypatch.setattr(tracing, '_exporter',
+                        tracing.FileExporter(str(path)))
+
+    def read():
+        return [json.loads(x) for x in path.read_text().splitlines()]
+
+    return read
+
+
+def test_spans_recorded(traces) -> None:
+    @tracing.traced('callback')
+    def callback(chain: str) -> None:
+        tracing.tag(event='TokenDeposit')
+
+        with tracing.span('get_block'):
+            pass
+        with tracing.span('sql'):
+            pass
+
+    callback('ethereum')
+
+    trace, = traces()
+    assert trace['name'] == 'callback'
+    assert trace['tags'] == {'chain': 'ethereum', 'event': 'TokenDeposit'}
+    assert [x['stage'] for x in trace['spans']] == ['get_block', 'sql']
+    assert tracing.current() is None
+
+
+def test_error_tagged(traces) -> None:
+    with pytest.raises(ValueError):
+        with tracing.trace('callback', chain='bsc'):
+            with tracing.span('decode'):
+                raise ValueError('bad log')
+
+    trace, = traces()
+    assert 'bad log' in trace['tags']['error']
+    assert trace['spans'][0]['stage'] == 'decode'
+
+
+def test_unsampled(traces, monkeypatch) -> None:
+    monkeypatch.setattr(tracing, 'TRACING_SAMPLE_RATE', 0)
+
+    with tracing.trace('callback', chain='bsc') as trace:
+        with tracing.span('decode'):
+            pass
+
+    assert trace is None
+    assert traces() == []
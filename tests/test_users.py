@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+          Copyright Blaze 2021.
+ Distributed under the Boost Software License, Version 1.0.
+    (See accompanying file LICENSE_1_0.txt or copy at
+          https://www.boost.org/LICENSE_1_0.txt)
+"""
+
+import pytest
+import redis
+
+from explorer.utils.analytics.users import DAY, _query, _sketch, days
+from explorer.utils.analytics import users
+
+
+@pytest.mark.parametrize('from_time,to_time,expected', [
+    # Bounds are exclusive, a day starting at `from_time + 1` is in.
+    (DAY - 1, 3 * DAY, (1, 3)),
+    (DAY, 3 * DAY, (2, 3)),
+    (DAY - 1, 3 * DAY + 1, (1, 3)),
+    (-1, DAY, (0, 1)),
+    # Within a single day.
+    (DAY + 10, DAY + 20, (2, 1)),
+])
+def test_days_are_those_entirely_in_range(from_time, to_time, expected):
+    first, last = days(from_time, to_time)
+
+    assert (first, last) == expected
+    for day in range(first, last):
+        assert from_time < day * DAY and (day + 1) * DAY - 1 < to_time
+
+
+def test_sketches_of_rows():
+    keys, sketched = _sketch([
+        (b'\x01', 1, None),
+        (b'\x01', 1, 5 * DAY),
+        (memoryview(b'\x02'), 56, 5 * DAY + 1),
+        (b'\x03', 56, 6 * DAY - 1),
+        (b'\x03', 56, 6 * DAY),
+    ])
+
+    assert sketched == {5, 6}
+    assert keys == {
+        'users:all': {b'\x01', b'\x02', b'\x03'},
+        'users:all:1': {b'\x01'},
+        'users:all:56': {b'\x02', b'\x03'},
+        'users:day:5': {b'\x01', b'\x02', b'\x03'},
+        'users:day:5:1': {b'\x01'},
+        'users:day:5:56': {b'\x02', b'\x03'},
+        'users:day:6': {b'\x03'},
+        'users:day:6:56': {b'\x03'},
+    }
+
+
+def test_exact_query_only_has_the_filters_set():
+    query, params = _query('COUNT(DISTINCT from_address)', None, 10, 56)
+
+    assert query.as_string(None) == (
+        'SELECT COUNT(DISTINCT from_address) FROM txs '
+        'WHERE received_time < %(to_time)s AND from_chain_id = %(chain_id)s')
+    assert params == {'from_time': None, 'to_time': 10, 'chain_id': 56}
+
+    query, _ = _query('DISTINCT from_address', None, None, None)
+    assert query.as_string(None) == 'SELECT DISTINCT from_address FROM txs'
+
+
+class DownPipeline:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def execute(self):
+        raise redis.ConnectionError('down')
+
+
+def test_ingestion_goes_on_without_redis(monkeypatch, capsys):
+    monkeypatch.setattr(users.USERS_REDIS, 'pipeline',
+                        lambda **kwargs: DownPipeline())
+
+    users.add({'from_address': b'\x01', 'from_chain_id': 1,
+               'received_time': 5 * DAY})
+
+    assert 'users: failed to add 01: down' in capsys.readouterr().out